@@ -0,0 +1,315 @@
+"""Load generator for the order placement path.
+
+Examples::
+
+    python benchmarks/loadtest.py --scenario orders --concurrency 32 --duration 30
+    python benchmarks/loadtest.py --scenario mixed --rate 200 --save benchmarks/baselines/mixed.json
+    python benchmarks/loadtest.py --target urls --order-url http://localhost:8081 \\
+        --restaurant-url http://localhost:8082 --payment-url http://localhost:8083 \\
+        --compare benchmarks/baselines/mixed.json
+
+Without ``--rate`` the run is closed-loop (``--concurrency`` workers send back
+to back). With ``--rate`` requests arrive on a fixed schedule (open loop) and
+latency is measured from the scheduled start, so a stalled server shows up as
+latency instead of silently lowering the offered load.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import uuid
+from collections import defaultdict
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from stack import Catalogue, StackURLs, local_stack
+else:
+    from .stack import Catalogue, StackURLs, local_stack
+
+# Relative weights of the operations in the ``mixed`` scenario.
+MIXED_WEIGHTS = {"create_order": 5, "get_menu": 3, "list_restaurants": 1, "create_payment": 1}
+SCENARIOS = {
+    "orders": {"create_order": 1},
+    "menu": {"get_menu": 3, "list_restaurants": 1},
+    "payments": {"create_payment": 1},
+    "mixed": MIXED_WEIGHTS,
+}
+# Metrics compared against a baseline; ``higher`` means bigger is better.
+COMPARED = {"p50_ms": "lower", "p95_ms": "lower", "p99_ms": "lower", "throughput_rps": "higher"}
+
+
+@dataclass
+class Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: dict[str, dict[str, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+
+    def record(self, operation: str, latency: float, status: str) -> None:
+        self.latencies[operation].append(latency)
+        self.statuses[operation][status] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        operations = {
+            name: _stats(values, self.statuses[name], elapsed) for name, values in sorted(self.latencies.items())
+        }
+        every = [value for values in self.latencies.values() for value in values]
+        totals: dict[str, int] = defaultdict(int)
+        for statuses in self.statuses.values():
+            for status, count in statuses.items():
+                totals[status] += count
+        return {"total": _stats(every, totals, elapsed), "operations": operations}
+
+
+class Workload:
+    """Builds requests for one operation at a time from the seeded catalogue."""
+
+    def __init__(self, client: httpx.AsyncClient, urls: StackURLs, weights: dict[str, int], seed: int):
+        self._client = client
+        self._urls = urls
+        self._rng = random.Random(seed)
+        self._operations = list(weights)
+        self._weights = list(weights.values())
+        self._menus: dict[str, list[str]] = {}
+
+    async def load_catalogue(self) -> None:
+        self._menus = await fetch_menus(self._client, self._urls.restaurant)
+
+    def next(self) -> tuple[str, Callable[[], Awaitable[httpx.Response]]]:
+        operation = self._rng.choices(self._operations, self._weights)[0]
+        return operation, getattr(self, f"_{operation}")()
+
+    def _create_order(self):
+        restaurant_id = self._rng.choice(list(self._menus))
+        items = [
+            {"menu_item_id": menu_item_id, "quantity": self._rng.randint(1, 3)}
+            for menu_item_id in self._rng.sample(self._menus[restaurant_id], k=min(2, len(self._menus[restaurant_id])))
+        ]
+        payload = {"restaurant_id": restaurant_id, "items": items, "customer_reference": "benchmark"}
+        return lambda: self._client.post(f"{self._urls.order}/orders", json=payload)
+
+    def _get_menu(self):
+        restaurant_id = self._rng.choice(list(self._menus))
+        return lambda: self._client.get(f"{self._urls.restaurant}/restaurants/{restaurant_id}/menu")
+
+    def _list_restaurants(self):
+        return lambda: self._client.get(f"{self._urls.restaurant}/restaurants")
+
+    def _create_payment(self):
+        payload = {"order_id": f"bench-{uuid.uuid4()}", "amount": round(self._rng.uniform(5, 80), 2)}
+        return lambda: self._client.post(f"{self._urls.payment}/payments", json=payload)
+
+
+async def fetch_menus(client: httpx.AsyncClient, restaurant_url: str) -> dict[str, list[str]]:
+    """Menu item ids per restaurant, as served by the restaurant-service."""
+    response = await client.get(f"{restaurant_url}/restaurants")
+    response.raise_for_status()
+    menus = {}
+    for restaurant in response.json():
+        menu = await client.get(f"{restaurant_url}/restaurants/{restaurant['id']}/menu")
+        menu.raise_for_status()
+        menus[restaurant["id"]] = [item["id"] for item in menu.json()]
+    if not menus:
+        raise RuntimeError("Der Restaurant-Service liefert keine Restaurants.")
+    return menus
+
+
+async def run_load(
+    urls: StackURLs,
+    weights: dict[str, int],
+    concurrency: int,
+    duration: float,
+    rate: float | None = None,
+    warmup: float = 0.0,
+    seed: int = 1,
+    timeout: float = 30.0,
+) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        workload = Workload(client, urls, weights, seed)
+        await workload.load_catalogue()
+        if warmup > 0:
+            await _drive(workload, Recorder(), concurrency, warmup, rate)
+        recorder = Recorder()
+        elapsed = await _drive(workload, recorder, concurrency, duration, rate)
+    return recorder.summary(elapsed)
+
+
+async def _drive(workload: Workload, recorder: Recorder, concurrency: int, duration: float, rate: float | None) -> float:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + duration
+
+    async def issue(operation: str, send, scheduled: float) -> None:
+        try:
+            response = await send()
+            status = str(response.status_code)
+        except httpx.HTTPError as exc:
+            status = type(exc).__name__
+        recorder.record(operation, loop.time() - scheduled, status)
+
+    if rate is None:
+
+        async def worker() -> None:
+            while loop.time() < deadline:
+                operation, send = workload.next()
+                await issue(operation, send, loop.time())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return loop.time() - started
+
+    # Open loop: one arrival every 1/rate seconds, at most ``concurrency`` requests in flight.
+    in_flight = asyncio.Semaphore(concurrency)
+    tasks: set[asyncio.Task] = set()
+    interval = 1.0 / rate
+    next_arrival = started
+    while next_arrival < deadline:
+        await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+        operation, send = workload.next()
+        scheduled = next_arrival
+
+        async def bounded(operation=operation, send=send, scheduled=scheduled) -> None:
+            async with in_flight:
+                await issue(operation, send, scheduled)
+
+        task = asyncio.create_task(bounded())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        next_arrival += interval
+    await asyncio.gather(*tasks)
+    return loop.time() - started
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Return human-readable regressions of ``result`` against ``baseline``."""
+    regressions = []
+    for operation, current in [("total", result["total"]), *result["operations"].items()]:
+        reference = baseline["total"] if operation == "total" else baseline["operations"].get(operation)
+        if reference is None:
+            continue
+        for metric, better in COMPARED.items():
+            old, new = reference[metric], current[metric]
+            if not old:
+                continue
+            change = (new - old) / old if better == "lower" else (old - new) / old
+            if change > max_regression:
+                regressions.append(f"{operation}.{metric}: {old} -> {new} ({change:+.0%})")
+        if current["error_rate"] > reference["error_rate"] + 0.01:
+            regressions.append(f"{operation}.error_rate: {reference['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def _stats(latencies: list[float], statuses: dict[str, int], elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    errors = sum(n for status, n in statuses.items() if not (status.isdigit() and int(status) < 400))
+    return {
+        "requests": count,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": _percentile_ms(ordered, 0.50),
+        "p95_ms": _percentile_ms(ordered, 0.95),
+        "p99_ms": _percentile_ms(ordered, 0.99),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def _percentile_ms(ordered: list[float], quantile: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(quantile * len(ordered))) - 1))
+    return round(ordered[index] * 1000, 3)
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "commit": commit}
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="orders")
+    parser.add_argument("--target", choices=("local", "urls"), default="local",
+                        help="local: Services mit sqlite starten; urls: laufenden Stack (z. B. Compose) nutzen")
+    parser.add_argument("--order-url", default="http://localhost:8081")
+    parser.add_argument("--restaurant-url", default="http://localhost:8082")
+    parser.add_argument("--payment-url", default="http://localhost:8083")
+    parser.add_argument("--payment-mode", choices=("http", "mock"), default="http",
+                        help="PAYMENT_MODE des lokal gestarteten Order-Service")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=None, help="Ankünfte pro Sekunde (Open Loop)")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--restaurants", type=int, default=20)
+    parser.add_argument("--menu-items", type=int, default=10)
+    parser.add_argument("--save", type=Path, help="Ergebnis als JSON-Baseline speichern")
+    parser.add_argument("--compare", type=Path, help="Mit einer gespeicherten Baseline vergleichen")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="erlaubte relative Verschlechterung je Kennzahl (default 0.25)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    if args.target == "local":
+        stack = local_stack(Catalogue(args.restaurants, args.menu_items), payment_mode=args.payment_mode)
+    else:
+        stack = nullcontext(StackURLs(args.order_url, args.restaurant_url, args.payment_url))
+
+    with stack as urls:
+        summary = asyncio.run(
+            run_load(urls, SCENARIOS[args.scenario], args.concurrency, args.duration, args.rate, args.warmup, args.seed)
+        )
+    result = {
+        "scenario": args.scenario,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "parameters": {
+            "target": args.target,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "payment_mode": args.payment_mode,
+            "restaurants": args.restaurants,
+            "menu_items": args.menu_items,
+        },
+        "environment": environment(),
+        **summary,
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("parameters") != result["parameters"]:
+            print("WARNUNG: Baseline wurde mit anderen Parametern aufgenommen.", file=sys.stderr)
+        regressions = compare(result, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
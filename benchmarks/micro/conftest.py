@@ -0,0 +1,15 @@
+"""Make the three service packages and the shared libs importable side by side for the microbenchmarks."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+SERVICES_DIR = ROOT_DIR / "services"
+
+for path in [ROOT_DIR / "libs" / "mifos-db", ROOT_DIR / "libs" / "mifos-observability"] + [
+    SERVICES_DIR / service for service in ("order-service", "restaurant-service", "payment-service")
+]:
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
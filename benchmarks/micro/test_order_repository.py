@@ -0,0 +1,311 @@
+"""Per-call cost of every OrderRepository / AsyncOrderRepository method on sqlite.
+
+Each repository runs on a one-connection pool like in the services, so the
+numbers include pool checkout, SQL formatting, row conversion, the metrics
+wrapper and (unsampled) tracing, but no network round trip.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import sqlite3
+
+import pytest
+from mifos_db.sql import placeholder
+
+from order_service import schemas
+from order_service.database import (
+    AsyncConnectionPool,
+    AsyncSQLiteConnection,
+    ConnectionPool,
+    PoolSettings,
+    apply_schema,
+)
+from order_service.repository import (
+    _SELECT_ORDER_SQL,
+    AsyncOrderRepository,
+    Compensation,
+    OrderFilter,
+    OrderRepository,
+    OrderUpdate,
+    _row_to_record,
+    _sql,
+    _update_params,
+)
+
+SEEDED_ORDERS = 500
+ITEMS = [
+    {
+        "menu_item_id": f"item-{index}",
+        "name": f"Gericht {index}",
+        "unit_price": 9.5 + index,
+        "quantity": 2,
+        "line_total": 19.0 + 2 * index,
+    }
+    for index in range(3)
+]
+ITEMS_JSON = json.dumps(ITEMS)
+
+_ids = itertools.count()
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{next(_ids)}"
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = tmp_path / "orders.db"
+    with sqlite3.connect(path) as conn:
+        apply_schema(conn)
+        conn.executemany(
+            """
+            INSERT INTO orders (
+                id, customer_reference, restaurant_id, status, total_amount,
+                items_json, payment_reference, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            [
+                (
+                    f"order-{index:04d}",
+                    "bench",
+                    f"resto-{index % 10}",
+                    "CONFIRMED",
+                    67.5,
+                    ITEMS_JSON,
+                    f"pay-{index}",
+                    "2024-05-01T10:00:00+00:00",
+                    f"2024-05-01T10:{index // 60:02d}:{index % 60:02d}+00:00",
+                )
+                for index in range(SEEDED_ORDERS)
+            ],
+        )
+    return path
+
+
+@pytest.fixture()
+def repo(db_path):
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    pool = ConnectionPool(connect, PoolSettings(min_size=1, max_size=1))
+    pool.open()
+    yield OrderRepository(pool=pool)
+    pool.close()
+
+
+@pytest.fixture()
+def async_repo(db_path):
+    async def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return AsyncSQLiteConnection(conn)
+
+    loop = asyncio.new_event_loop()
+    pool = AsyncConnectionPool(connect, PoolSettings(min_size=1, max_size=1))
+    loop.run_until_complete(pool.open())
+    yield _AsyncRepo(loop, AsyncOrderRepository(pool))
+    loop.run_until_complete(pool.close())
+    loop.close()
+
+
+def _enqueue(repo: OrderRepository) -> str:
+    order_id = _new_id("job")
+    repo.enqueue_order(order_id, "resto-1", "bench", {"items": ITEMS})
+    return order_id
+
+
+def _claimed_job(repo: OrderRepository) -> str:
+    order_id = _enqueue(repo)
+    repo.claim_job(30)
+    return order_id
+
+
+def _job_ready(repo: OrderRepository) -> tuple:
+    _enqueue(repo)
+    return (30,)
+
+
+def _pending_outbox(repo: OrderRepository, count: int) -> None:
+    compensation = Compensation.cancel_restaurant("order-0001", "resto-1", "bench")
+    repo.update_order("order-0001", status="CANCELED", compensations=[compensation] * count)
+
+
+def _claimed_outbox(repo: OrderRepository, count: int) -> list[str]:
+    _pending_outbox(repo, count)
+    # A zero lease keeps the messages claimable for the next round.
+    return [message.id for message in repo.claim_outbox(count, 0)]
+
+
+def _outbox_ready(repo: OrderRepository) -> tuple:
+    _pending_outbox(repo, 10)
+    return (10, 30)
+
+
+def _batch_updates() -> list[OrderUpdate]:
+    return [OrderUpdate(f"order-{index:04d}", "CONFIRMED", 67.5, ITEMS, f"pay-{index}") for index in range(20)]
+
+
+def _per_round(benchmark, function, setup):
+    """Time ``function(*setup())`` with fresh state per round (jobs and messages are consumed)."""
+    benchmark.pedantic(function, setup=lambda: (setup(), {}), rounds=200)
+
+
+# Each case receives the benchmark fixture and the repository and times one call.
+SYNC_CASES = {
+    "create_order": lambda benchmark, repo: benchmark(
+        lambda: repo.create_order(_new_id("new"), "resto-1", "bench")
+    ),
+    "create_orders": lambda benchmark, repo: benchmark(
+        lambda: repo.create_orders([(_new_id("new"), "resto-1", "bench") for _ in range(20)])
+    ),
+    "enqueue_order": lambda benchmark, repo: benchmark(_enqueue, repo),
+    "claim_job": lambda benchmark, repo: _per_round(benchmark, repo.claim_job, lambda: _job_ready(repo)),
+    "complete_job": lambda benchmark, repo: _per_round(
+        benchmark, repo.complete_job, lambda: (_claimed_job(repo),)
+    ),
+    "retry_job": lambda benchmark, repo: _per_round(
+        benchmark, repo.retry_job, lambda: (_claimed_job(repo), "timeout", 1.0)
+    ),
+    "fail_job": lambda benchmark, repo: _per_round(benchmark, repo.fail_job, lambda: (_claimed_job(repo), "boom")),
+    "update_order": lambda benchmark, repo: benchmark(
+        lambda: repo.update_order(
+            "order-0001", status="CONFIRMED", total_amount=67.5, items=ITEMS, payment_reference="pay-1"
+        )
+    ),
+    "update_orders": lambda benchmark, repo: benchmark(lambda: repo.update_orders(_batch_updates())),
+    "enqueue_compensations": lambda benchmark, repo: benchmark(
+        repo.enqueue_compensations, [Compensation.cancel_restaurant("order-0001", "resto-1", "bench")] * 10
+    ),
+    "claim_outbox": lambda benchmark, repo: _per_round(benchmark, repo.claim_outbox, lambda: _outbox_ready(repo)),
+    "complete_outbox": lambda benchmark, repo: _per_round(
+        benchmark, repo.complete_outbox, lambda: (_claimed_outbox(repo, 10),)
+    ),
+    "retry_outbox": lambda benchmark, repo: _per_round(
+        benchmark,
+        repo.retry_outbox,
+        lambda: ([(message_id, "timeout", 1.0) for message_id in _claimed_outbox(repo, 10)],),
+    ),
+    "fail_outbox": lambda benchmark, repo: _per_round(
+        benchmark, repo.fail_outbox, lambda: (_claimed_outbox(repo, 1)[0], "boom")
+    ),
+    "get_order": lambda benchmark, repo: benchmark(repo.get_order, "order-0042"),
+    "get_orders": lambda benchmark, repo: benchmark(
+        repo.get_orders, [f"order-{index:04d}" for index in range(0, SEEDED_ORDERS, 25)]
+    ),
+    "list_orders": lambda benchmark, repo: benchmark(repo.list_orders, 50),
+    "list_orders_page": lambda benchmark, repo: benchmark(
+        repo.list_orders_page, 50, filters=OrderFilter(status="CONFIRMED", restaurant_id="resto-3")
+    ),
+    "iter_orders": lambda benchmark, repo: benchmark(lambda: sum(1 for _ in repo.iter_orders())),
+}
+
+
+class _AsyncRepo:
+    """Runs :class:`AsyncOrderRepository` calls to completion on one long-lived event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, repo: AsyncOrderRepository):
+        self._loop = loop
+        self._repo = repo
+
+    def __getattr__(self, name):
+        method = getattr(self._repo, name)
+        return lambda *args, **kwargs: self._loop.run_until_complete(method(*args, **kwargs))
+
+    def iter_orders(self) -> int:
+        async def drain():
+            return sum([1 async for _ in self._repo.iter_orders()])
+
+        return self._loop.run_until_complete(drain())
+
+
+# The async cases reuse SYNC_CASES through _AsyncRepo; loop overhead per call is included.
+ASYNC_CASES = {
+    **SYNC_CASES,
+    "iter_orders": lambda benchmark, repo: benchmark(repo.iter_orders),
+}
+
+
+def _public_methods(cls) -> set[str]:
+    return {name for name, value in vars(cls).items() if not name.startswith("_") and callable(value)}
+
+
+def test_every_repository_method_has_a_benchmark():
+    assert set(SYNC_CASES) == _public_methods(OrderRepository)
+    assert set(ASYNC_CASES) == _public_methods(AsyncOrderRepository)
+
+
+@pytest.mark.benchmark(group="order-repository")
+@pytest.mark.parametrize("method", sorted(SYNC_CASES))
+def test_order_repository(benchmark, repo, method):
+    SYNC_CASES[method](benchmark, repo)
+
+
+@pytest.mark.benchmark(group="order-repository-async")
+@pytest.mark.parametrize("method", sorted(ASYNC_CASES))
+def test_async_order_repository(benchmark, async_repo, method):
+    ASYNC_CASES[method](benchmark, async_repo)
+
+
+@pytest.fixture()
+def order_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        return conn.execute(
+            """
+            SELECT id, restaurant_id, status, total_amount, items_json,
+                   payment_reference, failure_reason, customer_reference,
+                   created_at, updated_at
+            FROM orders ORDER BY id LIMIT 50;
+            """
+        ).fetchall()
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_row_to_record(benchmark, order_rows):
+    benchmark(lambda: [_row_to_record(row) for row in order_rows])
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_record_to_summary(benchmark, order_rows):
+    # Mirrors GET /orders: OrderRecord -> OrderSummary -> JSON-ready dict.
+    records = [_row_to_record(row) for row in order_rows]
+    benchmark(lambda: [schemas.OrderSummary(**record.__dict__).model_dump() for record in records])
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_row_to_summary(benchmark, order_rows):
+    benchmark(
+        lambda: [schemas.OrderSummary(**_row_to_record(row).__dict__).model_dump(mode="json") for row in order_rows]
+    )
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_items_json_dumps(benchmark):
+    benchmark(json.dumps, ITEMS)
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_items_json_loads(benchmark):
+    benchmark(json.loads, ITEMS_JSON)
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_update_params(benchmark):
+    benchmark(_update_params, "order-0001", "CONFIRMED", 67.5, ITEMS, "pay-1", None)
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_placeholder(benchmark, db_path):
+    with sqlite3.connect(db_path) as conn:
+        benchmark(placeholder, conn)
+
+
+@pytest.mark.benchmark(group="order-serialization")
+def test_sql(benchmark, db_path):
+    with sqlite3.connect(db_path) as conn:
+        benchmark(_sql, conn, _SELECT_ORDER_SQL)
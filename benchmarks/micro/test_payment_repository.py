@@ -0,0 +1,66 @@
+"""Per-call cost of every PaymentRepository method on sqlite."""
+
+from __future__ import annotations
+
+import itertools
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+from mifos_db.sql import placeholder
+
+from payment_service.database import ConnectionPool, PoolSettings, apply_schema
+from payment_service.repository import PaymentRecord, PaymentRepository
+
+_ids = itertools.count()
+
+
+def _record() -> PaymentRecord:
+    number = next(_ids)
+    now = datetime.now(timezone.utc).isoformat()
+    return PaymentRecord(f"pay-{number}", f"order-{number}", 42.5, "CAPTURED", None, now, now)
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "payment.db"
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    pool = ConnectionPool(connect, PoolSettings(min_size=1, max_size=1))
+    pool.open()
+    repo = PaymentRepository(pool=pool)
+    repo.insert_payments([_record() for _ in range(500)])
+    yield repo
+    pool.close()
+
+
+CASES = {
+    "insert_payment": lambda benchmark, repo: benchmark(lambda: repo.insert_payment(_record())),
+    "insert_payments": lambda benchmark, repo: benchmark(lambda: repo.insert_payments([_record() for _ in range(20)])),
+    "update_status": lambda benchmark, repo: benchmark(repo.update_status, "pay-42", "REFUNDED", "Saga compensation"),
+    "get_payment": lambda benchmark, repo: benchmark(repo.get_payment, "pay-42"),
+    "list_payments": lambda benchmark, repo: benchmark(repo.list_payments, "order-42"),
+}
+
+
+def test_every_repository_method_has_a_benchmark():
+    public = {name for name, value in vars(PaymentRepository).items() if not name.startswith("_") and callable(value)}
+    assert set(CASES) == public
+
+
+@pytest.mark.benchmark(group="payment-repository")
+@pytest.mark.parametrize("method", sorted(CASES))
+def test_payment_repository(benchmark, repo, method):
+    CASES[method](benchmark, repo)
+
+
+@pytest.mark.benchmark(group="payment-repository")
+def test_placeholder(benchmark):
+    with sqlite3.connect(":memory:") as conn:
+        benchmark(placeholder, conn)
@@ -0,0 +1,116 @@
+"""Per-call cost of every RestaurantRepository method on sqlite, with and without the catalogue cache."""
+
+from __future__ import annotations
+
+import itertools
+import sqlite3
+
+import pytest
+from mifos_db.sql import placeholder
+
+from restaurant_service.cache import CatalogueCache
+from restaurant_service.database import ConnectionPool, PoolSettings, apply_schema
+from restaurant_service.repository import (
+    OrderItem,
+    RestaurantRepository,
+    _normalize_items,
+    _price_items,
+)
+
+RESTAURANTS = 50
+MENU_ITEMS = 25
+ORDER = [OrderItem(menu_item_id=f"resto-07-item-{index:02d}", quantity=index % 3 + 1) for index in range(0, 10, 2)]
+
+_ids = itertools.count()
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = tmp_path / "restaurant.db"
+    with sqlite3.connect(path) as conn:
+        apply_schema(conn)
+        conn.executemany(
+            "INSERT INTO restaurants (id, name, status) VALUES (?, ?, ?);",
+            [(f"resto-{r:02d}", f"Restaurant {r}", "ONLINE") for r in range(RESTAURANTS)],
+        )
+        conn.executemany(
+            """
+            INSERT INTO menu_items (id, restaurant_id, name, description, price, available)
+            VALUES (?, ?, ?, ?, ?, ?);
+            """,
+            [
+                (f"resto-{r:02d}-item-{i:02d}", f"resto-{r:02d}", f"Gericht {i}", "Beschreibung", 6.5 + i, 1)
+                for r in range(RESTAURANTS)
+                for i in range(MENU_ITEMS)
+            ],
+        )
+    return path
+
+
+@pytest.fixture(params=["uncached", "cached"])
+def repo(request, db_path):
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    pool = ConnectionPool(connect, PoolSettings(min_size=1, max_size=1))
+    pool.open()
+    cache = CatalogueCache(ttl=300) if request.param == "cached" else None
+    yield RestaurantRepository(pool=pool, cache=cache)
+    pool.close()
+
+
+def _confirmed_order(repo: RestaurantRepository) -> tuple:
+    order_id = f"order-{next(_ids)}"
+    repo.confirm_order("resto-07", order_id, ORDER)
+    return ("resto-07", order_id, "Saga compensation")
+
+
+CASES = {
+    "list_restaurants": lambda benchmark, repo: benchmark(repo.list_restaurants),
+    "get_menu": lambda benchmark, repo: benchmark(repo.get_menu, "resto-07"),
+    "invalidate_catalogue": lambda benchmark, repo: benchmark(repo.invalidate_catalogue, "resto-07"),
+    "catalogue_generations": lambda benchmark, repo: benchmark(repo.catalogue_generations),
+    "confirm_order": lambda benchmark, repo: benchmark(
+        lambda: repo.confirm_order("resto-07", f"order-{next(_ids)}", ORDER)
+    ),
+    "confirm_orders": lambda benchmark, repo: benchmark(
+        lambda: repo.confirm_orders("resto-07", [(f"order-{next(_ids)}", ORDER) for _ in range(20)])
+    ),
+    "cancel_order": lambda benchmark, repo: benchmark.pedantic(
+        repo.cancel_order, setup=lambda: (_confirmed_order(repo), {}), rounds=200
+    ),
+}
+
+
+def test_every_repository_method_has_a_benchmark():
+    public = {name for name, value in vars(RestaurantRepository).items() if not name.startswith("_") and callable(value)}
+    assert set(CASES) == public
+
+
+@pytest.mark.benchmark(group="restaurant-repository")
+@pytest.mark.parametrize("method", sorted(CASES))
+def test_restaurant_repository(benchmark, repo, method):
+    CASES[method](benchmark, repo)
+
+
+@pytest.mark.benchmark(group="restaurant-pricing")
+def test_price_items(benchmark, db_path):
+    # The pure-Python part of confirm_order: quantity merge and line totals.
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT id, name, price, available FROM menu_items WHERE restaurant_id = 'resto-07';")
+        menu = {row["id"]: row for row in rows}
+
+    def price():
+        normalized = _normalize_items(ORDER)
+        return _price_items(normalized, [menu[item_id] for item_id in normalized])
+
+    benchmark(price)
+
+
+@pytest.mark.benchmark(group="restaurant-pricing")
+def test_placeholder(benchmark, db_path):
+    with sqlite3.connect(db_path) as conn:
+        benchmark(placeholder, conn)
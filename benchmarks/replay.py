@@ -0,0 +1,430 @@
+"""Replay recorded traffic against the services.
+
+Sources:
+
+* ``--access-log``: nginx access logs in the ``main`` format written by the WAF
+  into the ``waf-logs`` volume (``/var/log/nginx/access.log``, rotated and
+  ``.gz`` files included). They carry no request bodies; bodies for POST
+  requests are generated from the seeded catalogue.
+* ``--capture``: JSON lines with ``timestamp`` (epoch seconds or ISO 8601),
+  ``method``, ``path`` and optionally ``body``. Lines without ``method`` and
+  ``path`` are skipped.
+
+Paths are routed like the Kong gateway does (``/api/orders/...`` and
+``/orders/...`` go to the order-service and so on). Restaurant, order and
+payment ids from the recording are mapped onto the seeded catalogue and onto
+orders and payments created during the replay, so lookups hit real rows.
+
+Examples::
+
+    python benchmarks/replay.py --access-log /var/lib/docker/volumes/waf-logs/_data/access.log --speed 10
+    python benchmarks/replay.py --capture traffic.jsonl --speed 0 --concurrency 64 --save replay.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import re
+import sys
+import uuid
+import zlib
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import httpx
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from loadtest import Recorder, compare, environment, fetch_menus
+    from stack import Catalogue, StackURLs, local_stack
+else:
+    from .loadtest import Recorder, compare, environment, fetch_menus
+    from .stack import Catalogue, StackURLs, local_stack
+
+# nginx ``log_format main`` from deploy/waf/nginx.conf.
+_ACCESS_LOG_LINE = re.compile(
+    r'^(?P<remote_addr>\S+) - (?P<remote_user>\S+) \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<target>\S+) [^"]*" (?P<status>\d{3}) (?P<bytes>\d+|-)'
+)
+# (gateway prefix, service, strip_path) as in deploy/gateway/kong.yaml.
+_GATEWAY_ROUTES = (
+    ("/api/restaurants", "restaurant", True),
+    ("/restaurants", "restaurant", False),
+    ("/api/orders", "order", True),
+    ("/orders", "order", False),
+    ("/api/payments", "payment", True),
+    ("/payments", "payment", False),
+)
+# Endpoint templates per service; ``{name}`` segments are ids that get remapped.
+_ENDPOINTS = {
+    "restaurant": (
+        "/restaurants",
+        "/restaurants/{restaurant_id}/menu",
+        "/restaurants/{restaurant_id}/orders",
+        "/restaurants/{restaurant_id}/orders/batch",
+        "/restaurants/{restaurant_id}/orders/{order_id}/cancel",
+    ),
+    "order": (
+        "/orders",
+        "/orders/batch",
+        "/orders/export",
+        "/orders/{order_id}",
+        "/orders/{order_id}/cancel",
+    ),
+    "payment": (
+        "/payments",
+        "/payments/batch",
+        "/payments/{payment_id}",
+        "/payments/{payment_id}/refund",
+    ),
+}
+# WAF redirects (port 80), Kong auth failures and ModSecurity blocks never reached a service.
+DEFAULT_EXCLUDED_STATUS = "301,401,403"
+
+
+@dataclass(frozen=True)
+class RecordedRequest:
+    offset: float
+    method: str
+    path: str
+    body: dict | None = None
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    service: str
+    template: str
+    params: dict[str, str]
+    query: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.service} {self.template}"
+
+
+def read_access_log(paths: Iterable[Path], excluded_status: set[int]) -> tuple[list[RecordedRequest], Counter]:
+    skipped: Counter = Counter()
+    entries: list[tuple[datetime, str, str]] = []
+    for path in paths:
+        for line in _lines(path):
+            match = _ACCESS_LOG_LINE.match(line)
+            if match is None:
+                skipped["unparsable"] += 1
+                continue
+            if int(match["status"]) in excluded_status:
+                skipped[f"status {match['status']}"] += 1
+                continue
+            timestamp = datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z")
+            entries.append((timestamp, match["method"], match["target"]))
+    return _relative(entries), skipped
+
+
+def read_capture(path: Path) -> tuple[list[RecordedRequest], Counter]:
+    skipped: Counter = Counter()
+    entries: list[tuple[datetime, str, str, dict | None]] = []
+    for line in _lines(path):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            skipped["unparsable"] += 1
+            continue
+        if not isinstance(record, dict) or "method" not in record or "path" not in record:
+            skipped["no method/path"] += 1
+            continue
+        timestamp = record.get("timestamp")
+        if isinstance(timestamp, (int, float)):
+            moment = datetime.fromtimestamp(timestamp, timezone.utc)
+        elif isinstance(timestamp, str):
+            moment = datetime.fromisoformat(timestamp)
+        else:
+            # Without timestamps the capture is replayed as one burst in file order.
+            moment = datetime.fromtimestamp(0, timezone.utc)
+        entries.append((moment, record["method"].upper(), record["path"], record.get("body")))
+    return _relative(entries), skipped
+
+
+def route(path: str) -> Endpoint | None:
+    """Map a gateway path onto the service endpoint it reaches, ``None`` for anything else."""
+    path, _, query = path.partition("?")
+    for prefix, service, strip in _GATEWAY_ROUTES:
+        if path != prefix and not path.startswith(prefix + "/"):
+            continue
+        service_path = (path[len(prefix):] or "/") if strip else path
+        for template in _ENDPOINTS[service]:
+            params = _match(template, service_path)
+            if params is not None:
+                return Endpoint(service, template, params, query)
+        return None
+    return None
+
+
+class Remapper:
+    """Turns recorded ids and missing bodies into requests the local data can answer."""
+
+    def __init__(self, menus: dict[str, list[str]]):
+        self._menus = menus
+        self._restaurants = sorted(menus)
+        self._restaurant_ids: dict[str, str] = {}
+        self._orders: list[str] = []
+        self._payments: list[str] = []
+        self._served = Counter()
+
+    def request(self, endpoint: Endpoint, method: str, body: dict | None) -> tuple[str, dict | None]:
+        params = {name: self._map(name, value) for name, value in endpoint.params.items()}
+        path = endpoint.template.format(**params)
+        if endpoint.query:
+            path = f"{path}?{endpoint.query}"
+        if method not in {"POST", "PUT", "PATCH"}:
+            return path, None
+        return path, self._body(endpoint, params, body)
+
+    def observe(self, endpoint: Endpoint, method: str, response: httpx.Response) -> None:
+        """Remember orders and payments the replay created so later lookups can target them."""
+        if method != "POST" or response.status_code >= 300:
+            return
+        try:
+            payload = response.json()
+        except ValueError:
+            return
+        if endpoint.template in {"/orders", "/orders/batch"}:
+            for order in payload if isinstance(payload, list) else [payload]:
+                # Batch responses wrap each order as {"order_id", "succeeded", "order"}.
+                self._orders.append(order.get("order", order)["id"])
+        elif endpoint.template in {"/payments", "/payments/batch"}:
+            for payment in payload if isinstance(payload, list) else [payload]:
+                self._payments.append(payment["payment_id"])
+        del self._orders[:-1000], self._payments[:-1000]
+
+    def _map(self, name: str, value: str) -> str:
+        if name == "restaurant_id":
+            if value not in self._menus:
+                value = self._restaurant_ids.setdefault(
+                    value, self._restaurants[zlib.crc32(value.encode()) % len(self._restaurants)]
+                )
+            return value
+        pool = self._orders if name == "order_id" else self._payments
+        if not pool:
+            return value
+        self._served[name] += 1
+        return pool[-1 - self._served[name] % len(pool)]
+
+    def _body(self, endpoint: Endpoint, params: dict[str, str], body: dict | None) -> dict:
+        template = endpoint.template
+        if body is not None:
+            # Recorded ids would collide with the previous replay run.
+            body = dict(body)
+            if template == "/orders":
+                body.pop("order_id", None)
+            elif template == "/payments":
+                body["order_id"] = f"replay-{uuid.uuid4()}"
+            return body
+        if template == "/orders":
+            return self._order()
+        if template == "/orders/batch":
+            return {"orders": [self._order() for _ in range(5)]}
+        if template == "/payments":
+            return self._payment()
+        if template == "/payments/batch":
+            return {"payments": [self._payment() for _ in range(5)]}
+        if template == "/restaurants/{restaurant_id}/orders":
+            return self._restaurant_order(params["restaurant_id"])
+        if template == "/restaurants/{restaurant_id}/orders/batch":
+            return {"orders": [self._restaurant_order(params["restaurant_id"]) for _ in range(5)]}
+        return {"reason": "replay"}
+
+    def _order(self) -> dict:
+        restaurant_id = self._restaurants[len(self._orders) % len(self._restaurants)]
+        return {
+            "restaurant_id": restaurant_id,
+            "items": self._items(restaurant_id),
+            "customer_reference": "replay",
+        }
+
+    def _restaurant_order(self, restaurant_id: str) -> dict:
+        return {"order_id": f"replay-{uuid.uuid4()}", "items": self._items(restaurant_id)}
+
+    def _payment(self) -> dict:
+        return {"order_id": f"replay-{uuid.uuid4()}", "amount": 24.5}
+
+    def _items(self, restaurant_id: str) -> list[dict]:
+        return [{"menu_item_id": item_id, "quantity": 1} for item_id in self._menus[restaurant_id][:2]]
+
+
+async def replay(
+    requests: list[RecordedRequest],
+    urls: StackURLs,
+    speed: float,
+    concurrency: int,
+    timeout: float = 30.0,
+) -> dict:
+    """Send ``requests`` at ``offset / speed`` (``speed`` 0: as fast as ``concurrency`` allows)."""
+    bases = {"order": urls.order, "restaurant": urls.restaurant, "payment": urls.payment}
+    recorder = Recorder()
+    unrouted: Counter = Counter()
+    lag: list[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        remapper = Remapper(await fetch_menus(client, urls.restaurant))
+        in_flight = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def send(recorded: RecordedRequest, endpoint: Endpoint, scheduled: float) -> None:
+            async with in_flight:
+                path, body = remapper.request(endpoint, recorded.method, recorded.body)
+                sent = loop.time()
+                lag.append(sent - scheduled)
+                try:
+                    response = await client.request(recorded.method, bases[endpoint.service] + path, json=body)
+                    status = str(response.status_code)
+                    remapper.observe(endpoint, recorded.method, response)
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                recorder.record(f"{recorded.method} {endpoint.name}", loop.time() - sent, status)
+
+        tasks: set[asyncio.Task] = set()
+        for recorded in requests:
+            endpoint = route(recorded.path)
+            if endpoint is None:
+                unrouted[recorded.path.partition("?")[0]] += 1
+                continue
+            scheduled = started + (recorded.offset / speed if speed > 0 else 0.0)
+            if speed > 0:
+                await asyncio.sleep(max(0.0, scheduled - loop.time()))
+            else:
+                # Keep the backlog of pending tasks bounded when replaying flat out.
+                await in_flight.acquire()
+                in_flight.release()
+                scheduled = loop.time()
+            task = asyncio.create_task(send(recorded, endpoint, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    summary = recorder.summary(elapsed)
+    lag.sort()
+    summary["schedule_lag_ms"] = {
+        "p50": round(lag[len(lag) // 2] * 1000, 3) if lag else 0.0,
+        "p99": round(lag[min(len(lag) - 1, int(len(lag) * 0.99))] * 1000, 3) if lag else 0.0,
+        "max": round(lag[-1] * 1000, 3) if lag else 0.0,
+    }
+    summary["unrouted"] = dict(unrouted.most_common(20))
+    return summary
+
+
+def _match(template: str, path: str) -> dict[str, str] | None:
+    expected, actual = template.strip("/").split("/"), path.strip("/").split("/")
+    if len(expected) != len(actual):
+        return None
+    params = {}
+    for pattern, segment in zip(expected, actual):
+        if pattern.startswith("{"):
+            params[pattern[1:-1]] = segment
+        elif pattern != segment:
+            return None
+    # Fixed segments win over ids: "/orders/batch" must not match "/orders/{order_id}".
+    if any(segment in {"batch", "export"} for segment in params.values()):
+        return None
+    return params
+
+
+def _relative(entries: list[tuple]) -> list[RecordedRequest]:
+    entries.sort(key=lambda entry: entry[0])
+    if not entries:
+        return []
+    first = entries[0][0]
+    return [RecordedRequest((moment - first).total_seconds(), *rest) for moment, *rest in entries]
+
+
+def _lines(path: Path) -> Iterator[str]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as handle:
+        yield from handle
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--access-log", type=Path, nargs="+", help="nginx-Access-Logs der WAF (auch .gz)")
+    source.add_argument("--capture", type=Path, help="JSONL-Mitschnitt mit timestamp, method, path, body")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Zeitraffer-Faktor für die Original-Abstände; 0 = so schnell wie möglich")
+    parser.add_argument("--concurrency", type=int, default=32, help="maximal gleichzeitige Requests")
+    parser.add_argument("--limit", type=int, help="nur die ersten N Requests abspielen")
+    parser.add_argument("--exclude-status", default=DEFAULT_EXCLUDED_STATUS,
+                        help=f"Statuscodes aus dem Access-Log ignorieren (default {DEFAULT_EXCLUDED_STATUS})")
+    parser.add_argument("--target", choices=("local", "urls"), default="local")
+    parser.add_argument("--order-url", default="http://localhost:8081")
+    parser.add_argument("--restaurant-url", default="http://localhost:8082")
+    parser.add_argument("--payment-url", default="http://localhost:8083")
+    parser.add_argument("--payment-mode", choices=("http", "mock"), default="http")
+    parser.add_argument("--restaurants", type=int, default=20)
+    parser.add_argument("--menu-items", type=int, default=10)
+    parser.add_argument("--save", type=Path, help="Ergebnis als JSON-Baseline speichern")
+    parser.add_argument("--compare", type=Path, help="Mit einer gespeicherten Baseline vergleichen")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    if args.access_log:
+        excluded = {int(code) for code in args.exclude_status.split(",") if code.strip()}
+        requests, skipped = read_access_log(args.access_log, excluded)
+        source = [str(path) for path in args.access_log]
+    else:
+        requests, skipped = read_capture(args.capture)
+        source = [str(args.capture)]
+    if args.limit is not None:
+        requests = requests[: args.limit]
+    if not requests:
+        print(f"Keine abspielbaren Requests gefunden (übersprungen: {dict(skipped)}).", file=sys.stderr)
+        return 2
+
+    if args.target == "local":
+        stack = local_stack(Catalogue(args.restaurants, args.menu_items), payment_mode=args.payment_mode)
+    else:
+        stack = nullcontext(StackURLs(args.order_url, args.restaurant_url, args.payment_url))
+    with stack as urls:
+        summary = asyncio.run(replay(requests, urls, args.speed, args.concurrency))
+
+    result = {
+        "scenario": "replay",
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "parameters": {
+            "source": source,
+            "target": args.target,
+            "speed": args.speed,
+            "concurrency": args.concurrency,
+            "requests": len(requests),
+            "recorded_span_s": round(requests[-1].offset, 3),
+        },
+        "environment": environment(),
+        "skipped": dict(skipped),
+        **summary,
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text(encoding="utf-8")), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Start restaurant-, payment- and order-service locally on sqlite for a benchmark run."""
+
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import httpx
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / "services"
+
+
+@dataclass(frozen=True)
+class StackURLs:
+    order: str
+    restaurant: str
+    payment: str
+
+
+@dataclass(frozen=True)
+class Catalogue:
+    restaurants: int = 20
+    menu_items: int = 10
+
+    def rows(self):
+        restaurants = [(f"bench-resto-{r:03d}", f"Benchmark Restaurant {r}", "ONLINE") for r in range(self.restaurants)]
+        items = [
+            (f"bench-resto-{r:03d}-item-{i:02d}", f"bench-resto-{r:03d}", f"Gericht {i}", None, 5.0 + i, 1)
+            for r in range(self.restaurants)
+            for i in range(self.menu_items)
+        ]
+        return restaurants, items
+
+
+@contextmanager
+def local_stack(
+    catalogue: Catalogue = Catalogue(),
+    payment_mode: str = "http",
+    env: dict[str, str] | None = None,
+) -> Iterator[StackURLs]:
+    """Run each service as its own uvicorn process so the load generator does not share their GIL."""
+    with tempfile.TemporaryDirectory(prefix="mifos-bench-") as workdir:
+        ports = {name: _free_port() for name in ("restaurant", "payment", "order")}
+        urls = StackURLs(**{name: f"http://127.0.0.1:{port}" for name, port in ports.items()})
+        _seed_restaurants(Path(workdir) / "restaurant.db", catalogue)
+
+        # SQLite allows one writer; more pooled connections per service only trade
+        # throughput for "database is locked" errors under load.
+        common = {"DATABASE_POOL_MAX_SIZE": "1", **os.environ, **(env or {})}
+        specs = [
+            ("restaurant", "restaurant-service", {}),
+            ("payment", "payment-service", {}),
+            (
+                "order",
+                "order-service",
+                {
+                    "RESTAURANT_SERVICE_URL": urls.restaurant,
+                    "PAYMENT_MODE": payment_mode,
+                    "PAYMENT_SERVICE_URL": urls.payment,
+                },
+            ),
+        ]
+        processes: list[subprocess.Popen] = []
+        try:
+            for name, directory, extra in specs:
+                service_env = {**common, "DATABASE_URL": f"sqlite:///{workdir}/{name}.db", **extra}
+                # Migrations run once up front, like the compose *-migrate services.
+                subprocess.run(
+                    [sys.executable, "-m", f"{name}_service.bootstrap"],
+                    cwd=SERVICES_DIR / directory,
+                    env=service_env,
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                processes.append(
+                    subprocess.Popen(
+                        [
+                            sys.executable, "-m", "uvicorn", "main:app",
+                            "--host", "127.0.0.1", "--port", str(ports[name]),
+                            "--log-level", "warning", "--no-access-log",
+                        ],
+                        cwd=SERVICES_DIR / directory,
+                        env=service_env,
+                    )
+                )
+            for url in (urls.restaurant, urls.payment, urls.order):
+                _wait_ready(url)
+            yield urls
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+def _seed_restaurants(db_path: Path, catalogue: Catalogue) -> None:
+    # Apply the service's own migrations, then load a catalogue large enough to spread the load.
+    sys.path.insert(0, str(SERVICES_DIR / "restaurant-service"))
+    try:
+        from restaurant_service.database import apply_schema
+    finally:
+        sys.path.pop(0)
+    restaurants, items = catalogue.rows()
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+        conn.executemany("INSERT INTO restaurants (id, name, status) VALUES (?, ?, ?)", restaurants)
+        conn.executemany(
+            "INSERT INTO menu_items (id, restaurant_id, name, description, price, available)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            items,
+        )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{base_url} wurde nicht rechtzeitig bereit.")
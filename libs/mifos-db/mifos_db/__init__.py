@@ -0,0 +1,15 @@
+from .pool import (
+    AsyncConnectionPool,
+    AsyncSQLiteConnection,
+    ConnectionPool,
+    PoolSettings,
+    PoolTimeout,
+)
+
+__all__ = [
+    "AsyncConnectionPool",
+    "AsyncSQLiteConnection",
+    "ConnectionPool",
+    "PoolSettings",
+    "PoolTimeout",
+]
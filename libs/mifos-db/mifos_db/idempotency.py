@@ -0,0 +1,185 @@
+"""``Idempotency-Key`` handling shared by the order and payment service.
+
+Each service keeps the keys in its own database through a repository with
+``claim_key``/``get_key``/``store_response``/``release_key``/``purge_expired``;
+the methods may be plain (run in the threadpool) or coroutines.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Expired keys are deleted at most this often per process.
+_PURGE_INTERVAL = 60.0
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Raised when a key is reused with a different request body."""
+
+
+@dataclass(frozen=True)
+class IdempotencySettings:
+    ttl: float = 86400.0
+    lock_timeout: float = 60.0
+    poll_interval: float = 0.1
+
+    @classmethod
+    def from_env(cls) -> "IdempotencySettings":
+        return cls(
+            ttl=float(os.environ.get("IDEMPOTENCY_TTL", "86400")),
+            lock_timeout=float(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", "60")),
+            poll_interval=float(os.environ.get("IDEMPOTENCY_POLL_INTERVAL", "0.1")),
+        )
+
+
+@dataclass(frozen=True)
+class IdempotencyRecord:
+    fingerprint: str
+    # None while the request that claimed the key is still running.
+    status_code: Optional[int]
+    body: bytes
+    headers: tuple[tuple[str, str], ...]
+    media_type: Optional[str]
+    # Epoch seconds: end of the claim while running, of the stored response afterwards.
+    expires_at: float
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: bytes
+    headers: tuple[tuple[str, str], ...]
+    media_type: str | None
+
+
+def fingerprint(*parts) -> str:
+    """Stable digest of the request parts a key is bound to."""
+    encoded = json.dumps(jsonable_encoder(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Key→response records in the service database, shared by every worker and replica.
+
+    A request looks its key up first. An unknown or lapsed key is claimed with
+    ``INSERT … ON CONFLICT`` and the handler runs; duplicates only read the
+    record until the response is stored and get it replayed, so a retry storm
+    costs lookups, not writes. 5xx responses and failed or cancelled handlers
+    release the claim, so a retry after an outage runs again. A claim left by a
+    crashed worker lapses after ``lock_timeout`` seconds.
+
+    ``replayed_headers`` names the response headers (lower case) that describe
+    the outcome and are replayed; framing headers are recomputed.
+    """
+
+    def __init__(
+        self,
+        repository,
+        settings: IdempotencySettings | None = None,
+        clock: Callable[[], float] = time.time,
+        replayed_headers: Sequence[str] = ("location",),
+    ):
+        self._repo = repository
+        self._settings = settings or IdempotencySettings.from_env()
+        self._clock = clock
+        self._replayed_headers = tuple(replayed_headers)
+        self._next_purge = 0.0
+
+    async def run(self, key: str, request_fingerprint: str, handler: Callable[[], Awaitable[Response]]) -> Response:
+        owner = uuid.uuid4().hex
+        while True:
+            now = self._clock()
+            record = await _call(self._repo.get_key, key)
+            if record is None or record.expires_at <= now:
+                claimed = await _call(
+                    self._repo.claim_key, key, request_fingerprint, owner, now + self._settings.lock_timeout, now
+                )
+                if claimed:
+                    break
+                continue  # another request claimed it first; read its record
+            self._check(key, request_fingerprint, record.fingerprint)
+            if record.status_code is not None:
+                return _replay(record)
+            await asyncio.sleep(self._settings.poll_interval)
+
+        try:
+            response = await _respond(handler)
+        except BaseException:
+            await _call(self._repo.release_key, key, owner)
+            raise
+        stored = self._store(request_fingerprint, response)
+        if stored.status_code < 500:
+            await _call(
+                self._repo.store_response,
+                key,
+                owner,
+                stored.status_code,
+                stored.body,
+                stored.headers,
+                stored.media_type,
+                self._clock() + self._settings.ttl,
+            )
+        else:
+            await _call(self._repo.release_key, key, owner)
+        await self._purge()
+        return response
+
+    async def _purge(self) -> None:
+        now = self._clock()
+        if now >= self._next_purge:
+            self._next_purge = now + _PURGE_INTERVAL
+            await _call(self._repo.purge_expired, now)
+
+    def _store(self, request_fingerprint: str, response: Response) -> StoredResponse:
+        headers = tuple(
+            (name, value) for name, value in response.headers.items() if name in self._replayed_headers
+        )
+        return StoredResponse(
+            request_fingerprint, response.status_code, bytes(response.body), headers, response.media_type
+        )
+
+    @staticmethod
+    def _check(key: str, request_fingerprint: str, stored_fingerprint: str) -> None:
+        if request_fingerprint != stored_fingerprint:
+            raise IdempotencyKeyMismatch(
+                f"{IDEMPOTENCY_HEADER} '{key}' wurde bereits für eine andere Anfrage verwendet."
+            )
+
+
+async def _call(method, *args):
+    """Await coroutine repository methods directly; push blocking ones onto the threadpool."""
+    if inspect.iscoroutinefunction(method):
+        return await method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+def _replay(record: IdempotencyRecord) -> Response:
+    return Response(
+        content=record.body,
+        status_code=record.status_code,
+        headers={**dict(record.headers), REPLAYED_HEADER: "true"},
+        media_type=record.media_type,
+    )
+
+
+async def _respond(handler: Callable[[], Awaitable[Response]]) -> Response:
+    try:
+        return await handler()
+    except HTTPException as exc:
+        return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
@@ -0,0 +1,492 @@
+"""Connection pools shared by the repositories of all miFOS services.
+
+Every service builds its own connect function (Postgres via psycopg or a local
+SQLite file) and hands it to :class:`ConnectionPool` or, in the asyncio data
+path of the order service, :class:`AsyncConnectionPool`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
+from psycopg.pq import TransactionStatus
+
+
+class AsyncSQLiteConnection:
+    """Awaitable facade over ``sqlite3`` so the async repository also runs against SQLite.
+
+    Statements are executed in a worker thread; the pool guarantees exclusive use.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    async def execute(self, sql: str, params=()) -> "_AsyncSQLiteCursor":
+        cursor = await asyncio.to_thread(self._conn.execute, sql, params)
+        return _AsyncSQLiteCursor(cursor)
+
+    async def executemany(self, sql: str, params_seq) -> None:
+        await asyncio.to_thread(self._conn.executemany, sql, params_seq)
+
+    async def commit(self) -> None:
+        await asyncio.to_thread(self._conn.commit)
+
+    async def rollback(self) -> None:
+        await asyncio.to_thread(self._conn.rollback)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._conn.close)
+
+
+class _AsyncSQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    async def fetchone(self):
+        return await asyncio.to_thread(self._cursor.fetchone)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+    async def fetchmany(self, size: int):
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the timeout."""
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    min_size: int = 1
+    max_size: int = 10
+    timeout: float = 30.0
+    max_lifetime: float = 1800.0
+    max_idle: float = 300.0
+    check_interval: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            min_size=int(os.environ.get("DATABASE_POOL_MIN_SIZE", "1")),
+            max_size=int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
+            timeout=float(os.environ.get("DATABASE_POOL_TIMEOUT", "30")),
+            max_lifetime=float(os.environ.get("DATABASE_POOL_MAX_LIFETIME", "1800")),
+            max_idle=float(os.environ.get("DATABASE_POOL_MAX_IDLE", "300")),
+            check_interval=float(os.environ.get("DATABASE_POOL_CHECK_INTERVAL", "30")),
+        )
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class _BasePool:
+    """Bookkeeping shared by the threaded and the asyncio pool."""
+
+    def __init__(self, settings: PoolSettings | None):
+        self.settings = settings or PoolSettings.from_env()
+        if self.settings.max_size < 1:
+            raise ValueError("DATABASE_POOL_MAX_SIZE muss mindestens 1 sein.")
+        self._idle: deque[_PooledConnection] = deque()
+        self._size = 0
+        self._closed = False
+        self._waiting = 0
+        self._requests = 0
+        self._requests_waited = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+    def _snapshot(self) -> dict:
+        idle = len(self._idle)
+        in_use = self._size - idle
+        return {
+            "min_size": self.settings.min_size,
+            "max_size": self.settings.max_size,
+            "size": self._size,
+            "idle": idle,
+            "in_use": in_use,
+            "waiting": self._waiting,
+            "utilisation": round(in_use / self.settings.max_size, 4),
+            "requests_total": self._requests,
+            "requests_waited": self._requests_waited,
+            "wait_time_total_ms": round(self._wait_time_total * 1000, 3),
+            "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            "timeouts": self._timeouts,
+            "connections_created": self._created,
+            "connections_discarded": self._discarded,
+        }
+
+    def _record_wait(self, waited: float) -> None:
+        self._wait_time_total += waited
+        self._wait_time_max = max(self._wait_time_max, waited)
+
+    def _pop_idle(self, now: float, expired: list[_PooledConnection]) -> _PooledConnection | None:
+        while self._idle:
+            slot = self._idle.pop()
+            if self._is_expired(slot, now):
+                self._size -= 1
+                self._discarded += 1
+                expired.append(slot)
+                continue
+            return slot
+        return None
+
+    def _timeout_error(self, timeout: float) -> PoolTimeout:
+        self._timeouts += 1
+        return PoolTimeout(f"Keine DB-Verbindung innerhalb von {timeout}s verfügbar.")
+
+    def _keep_on_release(self, slot: _PooledConnection, reusable: bool, now: float) -> bool:
+        keep = reusable and not self._closed and not self._lifetime_exceeded(slot, now)
+        if keep:
+            slot.last_used = now
+            self._idle.append(slot)
+        else:
+            self._size -= 1
+            self._discarded += 1
+        return keep
+
+    def _is_expired(self, slot: _PooledConnection, now: float) -> bool:
+        if self._lifetime_exceeded(slot, now):
+            return True
+        idle_for = now - slot.last_used
+        return (
+            self.settings.max_idle > 0
+            and idle_for > self.settings.max_idle
+            and self._size > self.settings.min_size
+        )
+
+    def _lifetime_exceeded(self, slot: _PooledConnection, now: float) -> bool:
+        return self.settings.max_lifetime > 0 and now - slot.created_at > self.settings.max_lifetime
+
+
+class ConnectionPool(_BasePool):
+    """Thread-safe pool that hands out long-lived connections to the repositories.
+
+    Idle connections are re-validated with ``SELECT 1`` once they have been
+    unused for ``check_interval`` seconds and are recycled after
+    ``max_lifetime`` seconds. ``stats()`` reports utilisation and wait times.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        settings: PoolSettings | None = None,
+    ):
+        super().__init__(settings)
+        self._connect = connect
+        self._cond = threading.Condition()
+
+    def open(self) -> None:
+        """Fill the pool up to ``min_size`` connections."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.settings.min_size:
+                    return
+                self._size += 1
+            slot = self._create()
+            self._release(slot)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._discarded += len(idle)
+            self._cond.notify_all()
+        for slot in idle:
+            _close_quietly(slot.conn)
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator:
+        """Borrow a connection, waiting at most ``timeout`` seconds (default: ``settings.timeout``).
+
+        ``timeout=0`` never waits: it raises :class:`PoolTimeout` at once when
+        every connection is in use.
+        """
+        slot = self._acquire(timeout)
+        try:
+            yield slot.conn
+        finally:
+            self._release(slot)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return self._snapshot()
+
+    def _acquire(self, timeout: float | None) -> _PooledConnection:
+        timeout = self.settings.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            self._requests += 1
+        while True:
+            slot = self._checkout(deadline, timeout)
+            if slot is None:
+                slot = self._create()
+            elif not self._is_healthy(slot):
+                self._discard(slot)
+                continue
+            with self._cond:
+                self._record_wait(time.monotonic() - started)
+            return slot
+
+    def _checkout(self, deadline: float, timeout: float) -> _PooledConnection | None:
+        """Pop an idle connection or reserve a slot for a new one (returns ``None``)."""
+        expired: list[_PooledConnection] = []
+        try:
+            with self._cond:
+                waited = False
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection-Pool ist bereits geschlossen.")
+                    now = time.monotonic()
+                    slot = self._pop_idle(now, expired)
+                    if slot is not None:
+                        return slot
+                    if self._size < self.settings.max_size:
+                        self._size += 1
+                        return None
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._timeout_error(timeout)
+                    if not waited:
+                        self._requests_waited += 1
+                        waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+        finally:
+            for slot in expired:
+                _close_quietly(slot.conn)
+
+    def _create(self) -> _PooledConnection:
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return _PooledConnection(conn)
+
+    def _release(self, slot: _PooledConnection) -> None:
+        reusable = _reset_connection(slot.conn)
+        now = time.monotonic()
+        with self._cond:
+            keep = self._keep_on_release(slot, reusable, now)
+            self._cond.notify()
+        if not keep:
+            _close_quietly(slot.conn)
+
+    def _discard(self, slot: _PooledConnection) -> None:
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+        _close_quietly(slot.conn)
+
+    def _is_healthy(self, slot: _PooledConnection) -> bool:
+        if time.monotonic() - slot.last_used < self.settings.check_interval:
+            return True
+        try:
+            slot.conn.execute("SELECT 1").fetchone()
+        except Exception:
+            return False
+        return True
+
+
+def _reset_connection(conn) -> bool:
+    """Roll back leftovers of a failed statement; ``False`` means the connection is unusable."""
+    try:
+        if isinstance(conn, sqlite3.Connection):
+            if conn.in_transaction:
+                conn.rollback()
+            return True
+        if conn.closed or conn.broken:
+            return False
+        if conn.info.transaction_status != TransactionStatus.IDLE:
+            conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception:  # pragma: no cover - best effort
+        pass
+
+
+class AsyncConnectionPool(_BasePool):
+    """asyncio counterpart of :class:`ConnectionPool`; must be used from a single event loop."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[object]],
+        settings: PoolSettings | None = None,
+    ):
+        super().__init__(settings)
+        self._connect = connect
+        self._cond = asyncio.Condition()
+
+    async def open(self) -> None:
+        while not self._closed and self._size < self.settings.min_size:
+            self._size += 1
+            slot = await self._create()
+            await self._release(slot)
+
+    async def close(self) -> None:
+        self._closed = True
+        idle = list(self._idle)
+        self._idle.clear()
+        self._size -= len(idle)
+        self._discarded += len(idle)
+        async with self._cond:
+            self._cond.notify_all()
+        for slot in idle:
+            await _close_quietly_async(slot.conn)
+
+    @asynccontextmanager
+    async def connection(self, timeout: float | None = None) -> AsyncIterator:
+        """See :meth:`ConnectionPool.connection`."""
+        slot = await self._acquire(timeout)
+        try:
+            yield slot.conn
+        finally:
+            await self._release(slot)
+
+    def stats(self) -> dict:
+        return self._snapshot()
+
+    async def _acquire(self, timeout: float | None) -> _PooledConnection:
+        timeout = self.settings.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        self._requests += 1
+        while True:
+            slot = await self._checkout(deadline, timeout)
+            if slot is None:
+                slot = await self._create()
+            elif not await self._is_healthy(slot):
+                await self._discard(slot)
+                continue
+            self._record_wait(time.monotonic() - started)
+            return slot
+
+    async def _checkout(self, deadline: float, timeout: float) -> _PooledConnection | None:
+        expired: list[_PooledConnection] = []
+        try:
+            async with self._cond:
+                waited = False
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection-Pool ist bereits geschlossen.")
+                    now = time.monotonic()
+                    slot = self._pop_idle(now, expired)
+                    if slot is not None:
+                        return slot
+                    if self._size < self.settings.max_size:
+                        self._size += 1
+                        return None
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._timeout_error(timeout)
+                    if not waited:
+                        self._requests_waited += 1
+                        waited = True
+                    self._waiting += 1
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    finally:
+                        self._waiting -= 1
+        finally:
+            for slot in expired:
+                await _close_quietly_async(slot.conn)
+
+    async def _create(self) -> _PooledConnection:
+        try:
+            conn = await self._connect()
+        except BaseException:
+            self._size -= 1
+            async with self._cond:
+                self._cond.notify()
+            raise
+        self._created += 1
+        return _PooledConnection(conn)
+
+    async def _release(self, slot: _PooledConnection) -> None:
+        reusable = await _reset_async_connection(slot.conn)
+        keep = self._keep_on_release(slot, reusable, time.monotonic())
+        async with self._cond:
+            self._cond.notify()
+        if not keep:
+            await _close_quietly_async(slot.conn)
+
+    async def _discard(self, slot: _PooledConnection) -> None:
+        self._size -= 1
+        self._discarded += 1
+        async with self._cond:
+            self._cond.notify()
+        await _close_quietly_async(slot.conn)
+
+    async def _is_healthy(self, slot: _PooledConnection) -> bool:
+        if time.monotonic() - slot.last_used < self.settings.check_interval:
+            return True
+        try:
+            cursor = await slot.conn.execute("SELECT 1")
+            await cursor.fetchone()
+        except Exception:
+            return False
+        return True
+
+
+async def _reset_async_connection(conn) -> bool:
+    try:
+        if isinstance(conn, AsyncSQLiteConnection):
+            if conn.in_transaction:
+                await conn.rollback()
+            return True
+        if conn.closed or conn.broken:
+            return False
+        if conn.info.transaction_status != TransactionStatus.IDLE:
+            await conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+async def _close_quietly_async(conn) -> None:
+    try:
+        await conn.close()
+    except Exception:  # pragma: no cover - best effort
+        pass
@@ -0,0 +1,53 @@
+"""SQL statement templates for Postgres (psycopg) and SQLite connections.
+
+Repositories write each statement once as a module-level template with
+``{p}`` for a bind placeholder, ``{in_ids}`` to match a column against a whole
+list bound as one parameter (see ``id_list``) and ``{lock}`` for row locking
+where the dialect has it. ``sql`` renders a template for the dialect of a
+connection once per process.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Sequence
+
+DIALECTS = {
+    "postgres": {"p": "%s", "lock": "FOR UPDATE SKIP LOCKED", "in_ids": "= ANY(%s)"},
+    "sqlite": {"p": "?", "lock": "", "in_ids": "IN (SELECT value FROM json_each(?))"},
+}
+_CONNECTION_DIALECTS: dict[type, str] = {}
+# (template, dialect) -> statement. Only module-level templates go in here, so
+# the registry is bounded by the number of statements of the repositories.
+_STATEMENTS: dict[tuple[str, str], str] = {}
+
+
+def dialect(conn) -> str:
+    """``postgres`` for psycopg connections, ``sqlite`` otherwise."""
+    cls = type(conn)
+    name = _CONNECTION_DIALECTS.get(cls)
+    if name is None:
+        name = _CONNECTION_DIALECTS[cls] = "postgres" if "psycopg" in cls.__module__ else "sqlite"
+    return name
+
+
+def sql(conn, template: str) -> str:
+    """``template`` rendered for the dialect of ``conn``, once per process.
+
+    Identical text per statement is also what lets psycopg reuse the server-side
+    prepared statement and sqlite3 its statement cache.
+    """
+    key = (template, dialect(conn))
+    statement = _STATEMENTS.get(key)
+    if statement is None:
+        statement = _STATEMENTS[key] = template.format(**DIALECTS[key[1]])
+    return statement
+
+
+def id_list(conn, ids: Sequence[str]):
+    """Bind value for ``{in_ids}``: a text array on Postgres, a JSON array on SQLite."""
+    return list(ids) if dialect(conn) == "postgres" else json.dumps(list(ids))
+
+
+def placeholder(conn) -> str:
+    return DIALECTS[dialect(conn)]["p"]
@@ -0,0 +1 @@
+"""Observability helpers shared by the miFOS services."""
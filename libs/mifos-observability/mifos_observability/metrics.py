@@ -0,0 +1,279 @@
+"""Minimal Prometheus text-format metrics without a client-library dependency.
+
+Shared by the miFOS services; each service defines its own metrics in a
+``Registry`` of its ``metrics`` module.
+
+Observations are written to per-thread shards, so the hot path takes no lock:
+the event loop and every threadpool worker own their cells and a scrape sums
+the shards. Only the first observation of a thread registers its shard; when
+the thread ends, its shard is folded into a retired total and dropped, so
+threadpool churn does not grow the registry.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import inspect
+import itertools
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .tracing import Tracer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shard:
+    """One thread's cells; lives in the thread's ``threading.local`` slot."""
+
+    __slots__ = ("key", "cells", "__weakref__")
+
+    def __init__(self, key: int):
+        self.key = key
+        self.cells: dict[tuple[str, ...], list[float]] = {}
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), width: int = 1):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._width = width
+        self._local = threading.local()
+        self._shards: dict[int, dict[tuple[str, ...], list[float]]] = {}
+        self._shards_lock = threading.Lock()
+        self._keys = itertools.count()
+        # Keys of shards whose thread has ended; deque.append needs no lock in the finalizer.
+        self._ended: deque[int] = deque()
+        self._retired: dict[tuple[str, ...], list[float]] = {}
+
+    def _cell(self, labels: tuple[str, ...]) -> list[float]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            with self._shards_lock:
+                self._retire_ended()
+                shard = self._local.shard = _Shard(next(self._keys))
+                self._shards[shard.key] = shard.cells
+            weakref.finalize(shard, self._ended.append, shard.key)
+        cell = shard.cells.get(labels)
+        if cell is None:
+            cell = shard.cells[labels] = [0.0] * self._width
+        return cell
+
+    def _retire_ended(self) -> None:
+        """Fold the shards of ended threads into ``_retired``; needs ``_shards_lock``."""
+        while self._ended:
+            cells = self._shards.pop(self._ended.popleft())
+            for labels, cell in cells.items():
+                total = self._retired.setdefault(labels, [0.0] * self._width)
+                for index, value in enumerate(cell):
+                    total[index] += value
+
+    def _merged(self) -> dict[tuple[str, ...], list[float]]:
+        with self._shards_lock:
+            self._retire_ended()
+            merged = {labels: list(cell) for labels, cell in self._retired.items()}
+            shards = list(self._shards.values())
+        for shard in shards:
+            for labels, cell in list(shard.items()):
+                total = merged.setdefault(labels, [0.0] * self._width)
+                for index, value in enumerate(list(cell)):
+                    total[index] += value
+        return merged
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def _labels(self, values: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._cell(labels)[0] += amount
+
+    def _samples(self) -> Iterator[str]:
+        for labels, (value,) in sorted(self._merged().items()):
+            yield f"{self.name}_total{self._labels(labels)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        # One cell per bucket plus +Inf, then sum and count.
+        super().__init__(name, documentation, labelnames, width=len(buckets) + 3)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        cell = self._cell(labels)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _samples(self) -> Iterator[str]:
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, cell in sorted(self._merged().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, cell):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{self._labels(labels, le)} {_number(cumulative)}"
+            yield f"{self.name}_sum{self._labels(labels)} {_number(cell[-2])}"
+            yield f"{self.name}_count{self._labels(labels)} {_number(cell[-1])}"
+
+
+class Gauge(_Metric):
+    """Read at scrape time from ``collect``, which yields ``(label values, value)`` pairs."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Callable[[], Iterable[tuple[tuple[str, ...], float]]] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def _samples(self) -> Iterator[str]:
+        if self.collect is None:
+            return
+        for labels, value in self.collect():
+            yield f"{self.name}{self._labels(labels)} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request under its route template."""
+
+    def __init__(self, app: ASGIApp, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up the series count.
+            template = getattr(route, "path", None) or "<unmatched>"
+            self.histogram.observe(
+                time.perf_counter() - started, scope["method"], template, str(status_code)
+            )
+
+
+def query_instrumentation(histogram: Histogram, tracer: Tracer) -> Callable[[type], type]:
+    """Class decorator timing every public repository method in ``histogram`` and in a span of ``tracer``.
+
+    ``histogram`` is labelled ``(repository, method)``. Generators and context
+    managers are left alone: their time is spent by the caller, not in one query.
+    """
+
+    def instrument_queries(cls: type) -> type:
+        for name, function in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(function) or hasattr(function, "__wrapped__"):
+                continue
+            if inspect.isgeneratorfunction(function) or inspect.isasyncgenfunction(function):
+                continue
+            setattr(cls, name, _timed(function, cls.__name__, name, histogram, tracer))
+        return cls
+
+    return instrument_queries
+
+
+def _timed(function, repository: str, method: str, histogram: Histogram, tracer: Tracer):
+    span_name = f"db {repository}.{method}"
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def timed_async(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracer.span(span_name, kind="client", **{"db.operation": method}):
+                    return await function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, repository, method)
+
+        return timed_async
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with tracer.span(span_name, kind="client", **{"db.operation": method}):
+                return function(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started, repository, method)
+
+    return timed
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,247 @@
+"""W3C Trace Context propagation and lightweight spans.
+
+Spans are only materialised for sampled traces; unsampled requests carry the
+incoming (or a fresh) trace id in a context variable so downstream calls keep
+the same ``traceparent`` and the sampling decision. Finished spans are handed
+to a pluggable exporter.
+
+Every service process traces through the module-level ``TRACER``; the service
+names itself at startup with ``TRACER.configure(service=...)``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import IO, Iterator, Protocol
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    kind: str
+    start_ns: int
+    end_ns: int = 0
+    status: str = "ok"
+    attributes: dict = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class NoopExporter:
+    def export(self, span: Span) -> None:
+        pass
+
+
+class StreamExporter:
+    """Writes one JSON object per finished span, e.g. to stdout."""
+
+    def __init__(self, stream: IO[str] | None = None):
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span), default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+class FileExporter(StreamExporter):
+    def __init__(self, path: str):
+        super().__init__(open(path, "a", encoding="utf-8", buffering=1))
+
+
+class InMemoryExporter:
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None or match.group(1) == _INVALID_TRACE_ID or match.group(2) == _INVALID_SPAN_ID:
+        return None
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 0x01))
+
+
+def exporter_from_env() -> SpanExporter:
+    """``TRACING_EXPORTER``: ``none`` (default), ``stdout``, ``file`` or ``package.module:factory``."""
+    name = os.environ.get("TRACING_EXPORTER", "none").strip()
+    if name in {"", "none"}:
+        return NoopExporter()
+    if name == "stdout":
+        return StreamExporter()
+    if name == "file":
+        return FileExporter(os.environ.get("TRACING_FILE", "traces.jsonl"))
+    module_name, _, factory = name.partition(":")
+    if not factory:
+        raise RuntimeError("TRACING_EXPORTER muss 'none', 'stdout', 'file' oder 'modul:factory' sein.")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+class Tracer:
+    def __init__(self, service: str, exporter: SpanExporter | None = None, sample_ratio: float = 0.1):
+        self.service = service
+        self.exporter = exporter or NoopExporter()
+        self.sample_ratio = sample_ratio
+        self._current: contextvars.ContextVar[SpanContext | None] = contextvars.ContextVar(
+            "current_span", default=None
+        )
+
+    @classmethod
+    def from_env(cls, service: str) -> "Tracer":
+        return cls(service, exporter_from_env(), float(os.environ.get("TRACE_SAMPLE_RATIO", "0.1")))
+
+    def configure(
+        self, exporter: SpanExporter | None = None, sample_ratio: float | None = None, service: str | None = None
+    ) -> None:
+        if service is not None:
+            self.service = service
+        if exporter is not None:
+            self.exporter = exporter
+        if sample_ratio is not None:
+            self.sample_ratio = sample_ratio
+
+    def current(self) -> SpanContext | None:
+        return self._current.get()
+
+    def traceparent(self) -> str | None:
+        context = self._current.get()
+        return context.traceparent if context is not None else None
+
+    @contextmanager
+    def span(
+        self, name: str, kind: str = "internal", parent: SpanContext | None = None, **attributes
+    ) -> Iterator[Span | None]:
+        """Open a child of ``parent`` (default: the current span); yields ``None`` when not sampled."""
+        explicit_parent = parent is not None
+        parent = parent or self._current.get()
+        if parent is not None and not parent.sampled:
+            # Keep propagating the trace and the decision, but record nothing.
+            if not explicit_parent:
+                yield None
+                return
+            token = self._current.set(parent)
+            try:
+                yield None
+            finally:
+                self._current.reset(token)
+            return
+        if parent is None:
+            if not (self.sample_ratio > 0 and random.random() < self.sample_ratio):
+                token = self._current.set(SpanContext(_new_id(128), _new_id(64), False))
+                try:
+                    yield None
+                finally:
+                    self._current.reset(token)
+                return
+            parent_id, trace_id = None, _new_id(128)
+        else:
+            parent_id, trace_id = parent.span_id, parent.trace_id
+
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=_new_id(64),
+            parent_id=parent_id,
+            kind=kind,
+            start_ns=time.time_ns(),
+            attributes={"service.name": self.service, **attributes},
+        )
+        token = self._current.set(SpanContext(span.trace_id, span.span_id, True))
+        try:
+            yield span
+        except BaseException as exc:
+            span.status = "error"
+            span.attributes.setdefault("error.type", type(exc).__name__)
+            raise
+        finally:
+            self._current.reset(token)
+            span.end_ns = time.time_ns()
+            self.exporter.export(span)
+
+
+class TracingMiddleware:
+    """Continues the caller's ``traceparent`` and wraps each request in a server span."""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        parent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        with self.tracer.span(scope["method"], kind="server", parent=parent) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.method", scope["method"])
+                span.set_attribute("http.route", route)
+
+
+def _new_id(bits: int) -> str:
+    # random is plenty for trace ids and much cheaper than os.urandom on the hot path.
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+TRACER = Tracer.from_env("mifos")
@@ -0,0 +1,59 @@
+"""Production server settings: ``gunicorn -c gunicorn.conf.py main:app``.
+
+Gunicorn supervises the uvicorn worker processes. Every setting can be
+overridden through the environment variables read below.
+"""
+
+from __future__ import annotations
+
+import os
+
+from order_service.database import reset_pool_after_fork
+
+
+def _available_cores() -> int:
+    """CPUs this process may use, honouring CPU affinity and a cgroup v2 quota (``docker --cpus``)."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as handle:
+            quota, period = handle.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def _workers() -> int:
+    value = os.environ.get("WEB_CONCURRENCY", "1").strip().lower()
+    return _available_cores() if value == "auto" else max(1, int(value))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8081')}"
+# One worker unless WEB_CONCURRENCY says otherwise: /metrics and the long-poll/SSE
+# waiters are per process. "auto" starts one worker per usable core.
+workers = _workers()
+# uvicorn picks uvloop and httptools automatically when they are installed (uvicorn[standard]).
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so workers share its memory copy-on-write.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() in {"1", "true", "yes"}
+
+# SIGTERM stops accepting connections and lets in-flight requests finish for
+# graceful_timeout seconds before the lifespan shutdown stops the job workers.
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+# Longer than Kong's upstream keep-alive (60 s), so the gateway closes idle connections first.
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "75"))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    reset_pool_after_fork()
@@ -1,15 +1,66 @@
 from __future__ import annotations
 
+import math
 import os
+import uuid
+from contextlib import aclosing, asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncGenerator, AsyncIterator, Generator, Literal, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from mifos_db.idempotency import IdempotencyKeyMismatch, IdempotencyStore, fingerprint
+from mifos_observability.tracing import TRACER, TracingMiddleware
 
-from .database import init_db
-from .payment_client import HTTPPaymentClient, MockPaymentClient, PaymentClient, PaymentServiceError
-from .repository import OrderRepository
-from .restaurant_client import RestaurantClient, RestaurantServiceError
-from .saga import CreateOrderCommand, OrderSaga
+from .concurrency import invoke
+from .database import close_pool, get_pool, new_async_pool, schema_version, schema_version_async
+from .export import MEDIA_TYPES, stream_export, stream_export_async
+from .http_clients import HTTPClientRegistry
+from .jobs import OrderJobWorkers, OrderWaiters, watch_order
+from .metrics import (
+    CONTENT_TYPE,
+    DB_POOL_CONNECTIONS,
+    DOWNSTREAM_CIRCUIT_STATE,
+    HTTP_REQUEST_DURATION,
+    REGISTRY,
+    MetricsMiddleware,
+)
+from .outbox import OutboxDispatcher
+from .readiness import (
+    DEGRADED,
+    OK,
+    UNAVAILABLE,
+    ReadinessProbe,
+    circuit_check,
+    database_check,
+    pool_check,
+    readiness_response,
+)
+from .payment_client import (
+    AsyncHTTPPaymentClient,
+    AsyncMockPaymentClient,
+    AsyncPaymentClient,
+    HTTPPaymentClient,
+    MockPaymentClient,
+    PaymentClient,
+    PaymentServiceError,
+)
+from .repository import (
+    AsyncIdempotencyRepository,
+    AsyncOrderRepository,
+    IdempotencyRepository,
+    InvalidCursorError,
+    OrderExistsError,
+    OrderFilter,
+    OrderRecord,
+    OrderRepository,
+)
+from .restaurant_client import AsyncRestaurantClient, RestaurantClient, RestaurantServiceError
+from .saga import AsyncOrderSaga, CreateOrderCommand, OrderSaga
 from . import schemas
 
 
@@ -17,28 +68,273 @@ def get_repository() -> OrderRepository:
     return OrderRepository()
 
 
-def build_restaurant_client() -> RestaurantClient:
-    base_url = os.environ.get("RESTAURANT_SERVICE_URL", "http://restaurant-service:8082")
-    return RestaurantClient(base_url)
+def get_async_repository(request: Request) -> AsyncOrderRepository:
+    return AsyncOrderRepository(request.app.state.async_pool)
 
 
-def build_payment_client() -> PaymentClient:
+def _restaurant_service_url() -> str:
+    return os.environ.get("RESTAURANT_SERVICE_URL", "http://restaurant-service:8082")
+
+
+def _payment_service_url() -> str | None:
+    """Return the payment-service URL, or ``None`` when the mock is configured."""
     mode = os.environ.get("PAYMENT_MODE", "mock").lower()
-    if mode == "http":
-        base_url = os.environ.get("PAYMENT_SERVICE_URL")
-        if not base_url:
-            raise RuntimeError("PAYMENT_SERVICE_URL muss gesetzt sein, wenn PAYMENT_MODE=http")
-        return HTTPPaymentClient(base_url)
+    if mode != "http":
+        return None
+    base_url = os.environ.get("PAYMENT_SERVICE_URL")
+    if not base_url:
+        raise RuntimeError("PAYMENT_SERVICE_URL muss gesetzt sein, wenn PAYMENT_MODE=http")
+    return base_url
+
+
+def get_http_clients(request: Request) -> HTTPClientRegistry:
+    return request.app.state.http_clients
+
+
+def build_restaurant_client(
+    clients: HTTPClientRegistry = Depends(get_http_clients),
+) -> RestaurantClient:
+    return RestaurantClient(
+        _restaurant_service_url(), client=clients.client("restaurant"), downstream=clients.downstream("restaurant")
+    )
+
+
+def build_payment_client(
+    clients: HTTPClientRegistry = Depends(get_http_clients),
+) -> PaymentClient:
+    base_url = _payment_service_url()
+    if base_url is not None:
+        return HTTPPaymentClient(base_url, client=clients.client("payment"), downstream=clients.downstream("payment"))
     return MockPaymentClient()
 
 
+def build_async_restaurant_client(
+    clients: HTTPClientRegistry = Depends(get_http_clients),
+) -> AsyncRestaurantClient:
+    return AsyncRestaurantClient(
+        _restaurant_service_url(),
+        client=clients.async_client("restaurant"),
+        downstream=clients.downstream("restaurant"),
+    )
+
+
+def build_async_payment_client(
+    clients: HTTPClientRegistry = Depends(get_http_clients),
+) -> AsyncPaymentClient:
+    base_url = _payment_service_url()
+    if base_url is not None:
+        return AsyncHTTPPaymentClient(
+            base_url, client=clients.async_client("payment"), downstream=clients.downstream("payment")
+        )
+    return AsyncMockPaymentClient()
+
+
+def _saga_downstreams() -> tuple[str, ...]:
+    return ("restaurant", "payment") if _payment_service_url() is not None else ("restaurant",)
+
+
+def shed_when_unavailable(clients: HTTPClientRegistry = Depends(get_http_clients)) -> None:
+    """Fail fast with 503 while a saga dependency's circuit is open instead of queueing timeouts."""
+    retry_after = clients.retry_after(*_saga_downstreams())
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Abhängiger Service derzeit nicht verfügbar, bitte später erneut versuchen.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def get_order_filter(
+    order_status: Optional[str] = Query(None, alias="status"),
+    restaurant_id: Optional[str] = None,
+    customer_reference: Optional[str] = None,
+    updated_from: Optional[datetime] = None,
+    updated_to: Optional[datetime] = None,
+) -> OrderFilter:
+    return OrderFilter(
+        status=order_status,
+        restaurant_id=restaurant_id,
+        customer_reference=customer_reference,
+        updated_from=_as_utc_iso(updated_from),
+        updated_to=_as_utc_iso(updated_to),
+    )
+
+
+async def _close_export(*generators: Generator | AsyncGenerator) -> None:
+    """Close the export generators once the response is over, finished or not.
+
+    Starlette drops the body of a disconnected client without closing it, which
+    would hold the pooled connection (and on Postgres the named cursor's
+    transaction) until garbage collection.
+    """
+    for generator in generators:
+        if isinstance(generator, AsyncGenerator):
+            await generator.aclose()
+        else:
+            await run_in_threadpool(generator.close)
+
+
+def _sse_event(record: OrderRecord) -> str:
+    summary = schemas.OrderSummary(**record.__dict__)
+    return f"id: {record.updated_at}\nevent: status\ndata: {summary.model_dump_json()}\n\n"
+
+
+def _as_utc_iso(value: datetime | None) -> str | None:
+    """Normalise to the UTC ISO format the repository stores, so string comparison is ordered."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+MAX_BATCH_SIZE = int(os.environ.get("ORDERS_MAX_BATCH_SIZE", "100"))
+MAX_LONG_POLL_SECONDS = float(os.environ.get("ORDERS_LONG_POLL_MAX", "30"))
+MAX_STREAM_SECONDS = float(os.environ.get("ORDERS_STREAM_MAX", "300"))
+# Watchers re-read the order after this many quiet seconds, so sagas finished by
+# other workers or replicas (which publish in their own process) are still seen.
+WATCH_RECHECK_SECONDS = float(os.environ.get("ORDERS_WATCH_RECHECK", "5"))
+FINAL_STATUSES = frozenset({"CONFIRMED", "CANCELED"})
+# EventSource clients reconnect after this delay once a stream ends early.
+SSE_RETRY_MILLISECONDS = 2000
+
+
+def _prefers_async(prefer: str | None) -> bool:
+    """RFC 7240 ``Prefer: respond-async``."""
+    if not prefer:
+        return False
+    return any(token.strip().lower() == "respond-async" for token in prefer.split(","))
+
+
+def execution_mode() -> str:
+    mode = os.environ.get("ORDER_EXECUTION_MODE", "async").lower()
+    if mode not in {"async", "sync"}:
+        raise RuntimeError("ORDER_EXECUTION_MODE muss 'async' oder 'sync' sein.")
+    return mode
+
+
+def _build_job_workers(app: FastAPI) -> OrderJobWorkers:
+    clients = app.state.http_clients
+    waiters = app.state.order_waiters
+    downstreams = _saga_downstreams()
+
+    def paused() -> float | None:
+        return clients.retry_after(*downstreams)
+
+    if app.state.execution_mode == "async":
+        repo = AsyncOrderRepository(app.state.async_pool)
+        return OrderJobWorkers(
+            repo,
+            lambda: AsyncOrderSaga(
+                repo,
+                build_async_restaurant_client(clients),
+                build_async_payment_client(clients),
+                on_transition=waiters.publish,
+            ),
+            waiters=waiters,
+            paused=paused,
+        )
+    repo = OrderRepository()
+    return OrderJobWorkers(
+        repo,
+        lambda: OrderSaga(
+            repo, build_restaurant_client(clients), build_payment_client(clients), on_transition=waiters.publish
+        ),
+        waiters=waiters,
+        paused=paused,
+    )
+
+
+def _build_outbox_dispatcher(app: FastAPI) -> OutboxDispatcher:
+    clients = app.state.http_clients
+    if app.state.execution_mode == "async":
+        return OutboxDispatcher(
+            AsyncOrderRepository(app.state.async_pool),
+            build_async_restaurant_client(clients),
+            build_async_payment_client(clients),
+        )
+    return OutboxDispatcher(OrderRepository(), build_restaurant_client(clients), build_payment_client(clients))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http_clients = HTTPClientRegistry()
+    # No connection is opened here: workers boot while the database is still
+    # unreachable and connect on first use; /readyz reports when they can serve.
+    if app.state.execution_mode == "async":
+        app.state.async_pool = new_async_pool()
+    app.state.readiness = ReadinessProbe(lambda: _check_readiness(app))
+    app.state.idempotency = IdempotencyStore(
+        AsyncIdempotencyRepository(app.state.async_pool)
+        if app.state.execution_mode == "async"
+        else IdempotencyRepository(),
+        # 202 responses carry the prefer-header outcome along with the Location.
+        replayed_headers=("location", "preference-applied"),
+    )
+    app.state.order_jobs = _build_job_workers(app)
+    app.state.order_jobs.start()
+    app.state.outbox = _build_outbox_dispatcher(app)
+    app.state.outbox.start()
+    try:
+        yield
+    finally:
+        await app.state.outbox.stop()
+        await app.state.order_jobs.stop()
+        await app.state.http_clients.aclose()
+        if app.state.execution_mode == "async":
+            await app.state.async_pool.close()
+        close_pool()
+
+
+def _circuit_samples(app: FastAPI):
+    clients = getattr(app.state, "http_clients", None)
+    if clients is None:
+        return []
+    return [((name,), float(entry["state"] != "closed")) for name, entry in clients.downstream_stats().items()]
+
+
+async def _schema_version(app: FastAPI) -> int:
+    if app.state.execution_mode == "async":
+        async with app.state.async_pool.connection(timeout=0) as conn:
+            return await schema_version_async(conn)
+
+    def read() -> int:
+        with get_pool().connection(timeout=0) as conn:
+            return schema_version(conn)
+
+    return await run_in_threadpool(read)
+
+
+async def _check_readiness(app: FastAPI) -> schemas.ReadinessResponse:
+    pool = app.state.async_pool if app.state.execution_mode == "async" else get_pool()
+    checks = {"db_pool": pool_check(pool.stats())}
+    schema_version = None
+    if checks["db_pool"].status != OK:
+        # Every connection is in use; the check must not take one from a request.
+        checks["database"] = schemas.ReadinessCheck(status=DEGRADED, detail="Nicht geprüft: Pool ausgelastet")
+    else:
+        checks["database"], schema_version = await database_check(lambda: _schema_version(app))
+    downstreams = {name: circuit_check(app.state.http_clients.downstream(name)) for name in _saga_downstreams()}
+    return readiness_response(checks, schema_version, downstreams)
+
+
+def _pool_samples(app: FastAPI):
+    pool = getattr(app.state, "async_pool", None) if app.state.execution_mode == "async" else get_pool()
+    if pool is None:
+        return []
+    stats = pool.stats()
+    return [((state,), stats[state]) for state in ("idle", "in_use", "waiting")]
+
+
 def create_app() -> FastAPI:
-    init_db()
     app = FastAPI(
         title="Order Service",
         version="0.1.0",
         description="Koordiniert Bestellungen via Saga-Muster.",
+        lifespan=lifespan,
     )
+    app.state.execution_mode = execution_mode()
+    app.state.order_waiters = OrderWaiters()
     allowed_origins = [
         origin.strip() for origin in os.environ.get("ALLOWED_ORIGINS", "*").split(",")
     ]
@@ -48,75 +344,297 @@ def create_app() -> FastAPI:
         allow_credentials=False,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Link", "Location", "Preference-Applied"],
     )
+    app.add_middleware(MetricsMiddleware, histogram=HTTP_REQUEST_DURATION)
+    TRACER.configure(service="order-service")
+    # Added last so it is outermost and the server span covers the whole request.
+    app.add_middleware(TracingMiddleware, tracer=TRACER)
+    DOWNSTREAM_CIRCUIT_STATE.collect = lambda: _circuit_samples(app)
+    DB_POOL_CONNECTIONS.collect = lambda: _pool_samples(app)
 
-    def get_saga(
+    def get_sync_saga(
         repo: OrderRepository = Depends(get_repository),
         restaurant_client: RestaurantClient = Depends(build_restaurant_client),
         payment_client: PaymentClient = Depends(build_payment_client),
     ) -> OrderSaga:
-        return OrderSaga(repo, restaurant_client, payment_client)
+        return OrderSaga(repo, restaurant_client, payment_client, on_transition=app.state.order_waiters.publish)
+
+    def get_async_saga(
+        repo: AsyncOrderRepository = Depends(get_async_repository),
+        restaurant_client: AsyncRestaurantClient = Depends(build_async_restaurant_client),
+        payment_client: AsyncPaymentClient = Depends(build_async_payment_client),
+    ) -> AsyncOrderSaga:
+        return AsyncOrderSaga(
+            repo, restaurant_client, payment_client, on_transition=app.state.order_waiters.publish
+        )
+
+    if app.state.execution_mode == "async":
+        get_repo, get_saga = get_async_repository, get_async_saga
+    else:
+        get_repo, get_saga = get_repository, get_sync_saga
 
     @app.get("/healthz", response_model=schemas.HealthResponse)
     async def healthz() -> schemas.HealthResponse:
         return schemas.HealthResponse(status="ok")
 
+    @app.get(
+        "/readyz",
+        response_model=schemas.ReadinessResponse,
+        responses={503: {"model": schemas.ReadinessResponse}},
+    )
+    async def readyz(response: Response) -> schemas.ReadinessResponse:
+        """``503`` when this instance cannot serve (DB unreachable, schema behind).
+
+        A busy pool reports ``degraded`` with ``200``; open downstream circuits
+        are listed under ``downstreams`` without affecting the status.
+        """
+        readiness = await app.state.readiness.result()
+        if readiness.status == UNAVAILABLE:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return readiness
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    @app.get("/internal/db-pool", response_model=schemas.PoolStats)
+    async def db_pool_stats() -> schemas.PoolStats:
+        if app.state.execution_mode == "async":
+            return schemas.PoolStats(**app.state.async_pool.stats())
+        return schemas.PoolStats(**get_pool().stats())
+
+    @app.get("/internal/http-clients", response_model=dict[str, schemas.HTTPClientStats])
+    async def http_client_stats() -> dict[str, schemas.HTTPClientStats]:
+        return {
+            name: schemas.HTTPClientStats(**entry)
+            for name, entry in app.state.http_clients.stats().items()
+        }
+
+    @app.get("/internal/downstreams", response_model=dict[str, schemas.DownstreamStats])
+    async def downstream_stats() -> dict[str, schemas.DownstreamStats]:
+        return {
+            name: schemas.DownstreamStats(**entry)
+            for name, entry in app.state.http_clients.downstream_stats().items()
+        }
+
     @app.post(
         "/orders",
         response_model=schemas.OrderSummary,
         status_code=status.HTTP_201_CREATED,
+        responses={202: {"model": schemas.OrderAccepted, "description": "Bei `Prefer: respond-async`"}},
     )
     async def create_order(
         payload: schemas.CreateOrderRequest,
-        saga: OrderSaga = Depends(get_saga),
-    ) -> schemas.OrderSummary:
+        prefer: Optional[str] = Header(None),
+        idempotency_key: Optional[str] = Header(None),
+        clients: HTTPClientRegistry = Depends(get_http_clients),
+        repo: OrderRepository | AsyncOrderRepository = Depends(get_repo),
+        saga: OrderSaga | AsyncOrderSaga = Depends(get_saga),
+    ) -> Response:
         if not payload.items:
             raise HTTPException(status_code=400, detail="Mindestens ein Menüeintrag ist erforderlich.")
+        command = CreateOrderCommand(
+            restaurant_id=payload.restaurant_id,
+            items=[item.model_dump() for item in payload.items],
+            customer_reference=payload.customer_reference,
+            order_id=payload.order_id,
+            simulation_mode=payload.simulation_mode,
+        )
+        respond_async = _prefers_async(prefer)
+
+        async def handle() -> Response:
+            # No lookup first: the primary key decides, so concurrent requests cannot both insert.
+            try:
+                if respond_async:
+                    # Queued jobs wait out an open circuit, so only the synchronous path sheds load.
+                    return await _accept_order(command, repo)
+                shed_when_unavailable(clients)
+                record = await invoke(saga.place_order, command)
+            except OrderExistsError as exc:
+                raise HTTPException(status_code=409, detail=str(exc))
+            except RestaurantServiceError as exc:
+                raise HTTPException(status_code=502, detail=str(exc))
+            except PaymentServiceError as exc:
+                raise HTTPException(status_code=502, detail=str(exc))
+            return JSONResponse(
+                status_code=status.HTTP_201_CREATED,
+                content=jsonable_encoder(schemas.OrderSummary(**record.__dict__)),
+            )
+
+        if idempotency_key is None:
+            return await handle()
         try:
-            record = saga.place_order(
-                CreateOrderCommand(
-                    restaurant_id=payload.restaurant_id,
-                    items=[item.model_dump() for item in payload.items],
-                    customer_reference=payload.customer_reference,
-                    order_id=payload.order_id,
-                    simulation_mode=payload.simulation_mode,
-                )
+            return await app.state.idempotency.run(
+                f"POST /orders {idempotency_key}", fingerprint(payload, respond_async), handle
             )
-        except RestaurantServiceError as exc:
-            raise HTTPException(status_code=502, detail=str(exc))
-        except PaymentServiceError as exc:
-            raise HTTPException(status_code=502, detail=str(exc))
+        except IdempotencyKeyMismatch as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
 
-        return schemas.OrderSummary(**record.__dict__)
+    async def _accept_order(
+        command: CreateOrderCommand, repo: OrderRepository | AsyncOrderRepository
+    ) -> JSONResponse:
+        order_id = command.order_id or str(uuid.uuid4())
+        record = await invoke(
+            repo.enqueue_order,
+            order_id,
+            command.restaurant_id,
+            command.customer_reference,
+            command.to_payload(),
+        )
+        app.state.order_jobs.wake()
+        accepted = schemas.OrderAccepted(order_id=record.id, status=record.status)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=accepted.model_dump(),
+            headers={"Location": f"/orders/{record.id}", "Preference-Applied": "respond-async"},
+        )
+
+    @app.post(
+        "/orders/batch",
+        response_model=list[schemas.BatchOrderResult],
+        dependencies=[Depends(shed_when_unavailable)],
+    )
+    async def create_orders_batch(
+        payload: schemas.BatchCreateOrderRequest,
+        saga: OrderSaga | AsyncOrderSaga = Depends(get_saga),
+    ) -> list[schemas.BatchOrderResult]:
+        if len(payload.orders) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Maximal {MAX_BATCH_SIZE} Bestellungen pro Batch erlaubt.",
+            )
+        if any(not order.items for order in payload.orders):
+            raise HTTPException(status_code=400, detail="Mindestens ein Menüeintrag ist erforderlich.")
+        try:
+            results = await invoke(
+                saga.place_orders,
+                [
+                    CreateOrderCommand(
+                        restaurant_id=order.restaurant_id,
+                        items=[item.model_dump() for item in order.items],
+                        customer_reference=order.customer_reference,
+                        order_id=order.order_id,
+                        simulation_mode=order.simulation_mode,
+                    )
+                    for order in payload.orders
+                ],
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return [
+            schemas.BatchOrderResult(
+                order_id=result.order.id,
+                succeeded=result.succeeded,
+                error=result.error,
+                order=schemas.OrderSummary(**result.order.__dict__),
+            )
+            for result in results
+        ]
 
     @app.get("/orders", response_model=list[schemas.OrderSummary])
     async def list_orders(
-        limit: int = 50, repo: OrderRepository = Depends(get_repository)
+        request: Request,
+        response: Response,
+        limit: int = Query(50, ge=1),
+        cursor: Optional[str] = None,
+        filters: OrderFilter = Depends(get_order_filter),
+        repo: OrderRepository | AsyncOrderRepository = Depends(get_repo),
     ) -> list[schemas.OrderSummary]:
-        records = repo.list_orders(limit=limit)
-        return [schemas.OrderSummary(**record.__dict__) for record in records]
+        try:
+            page = await invoke(repo.list_orders_page, limit, filters=filters, cursor=cursor)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if page.next_cursor is not None:
+            next_url = request.url.include_query_params(cursor=page.next_cursor)
+            response.headers["X-Next-Cursor"] = page.next_cursor
+            response.headers["Link"] = f'<{next_url}>; rel="next"'
+        return [schemas.OrderSummary(**record.__dict__) for record in page.records]
+
+    @app.get("/orders/export", response_class=StreamingResponse)
+    async def export_orders(
+        export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+        filters: OrderFilter = Depends(get_order_filter),
+        repo: OrderRepository | AsyncOrderRepository = Depends(get_repo),
+    ) -> StreamingResponse:
+        records = repo.iter_orders(filters)
+        if isinstance(repo, AsyncOrderRepository):
+            body = stream_export_async(records, export_format)
+        else:
+            body = stream_export(records, export_format)
+        return StreamingResponse(
+            body,
+            media_type=MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="orders.{export_format}"'},
+            # Runs after the stream ends or the client disconnects; the body is closed before its rows.
+            background=BackgroundTask(_close_export, body, records),
+        )
 
     @app.get("/orders/{order_id}", response_model=schemas.OrderSummary)
     async def get_order(
         order_id: str,
-        repo: OrderRepository = Depends(get_repository),
+        wait: float = Query(0, ge=0, description="Long-Poll: Sekunden warten, solange die Order PENDING ist"),
+        repo: OrderRepository | AsyncOrderRepository = Depends(get_repo),
     ) -> schemas.OrderSummary:
-        record = repo.get_order(order_id)
+        record = await invoke(repo.get_order, order_id)
         if record is None:
             raise HTTPException(status_code=404, detail="Order nicht gefunden")
+        if record.status == "PENDING" and wait > 0:
+            timeout = min(wait, MAX_LONG_POLL_SECONDS)
+            async with aclosing(
+                watch_order(app.state.order_waiters, repo, order_id, timeout, WATCH_RECHECK_SECONDS)
+            ) as updates:
+                async for update in updates:
+                    if update is not None:
+                        record = update
+                        if record.status != "PENDING":
+                            break
         return schemas.OrderSummary(**record.__dict__)
 
+    @app.get(
+        "/orders/{order_id}/events",
+        response_class=StreamingResponse,
+        responses={200: {"content": {"text/event-stream": {}}}},
+    )
+    async def stream_order_events(
+        order_id: str,
+        repo: OrderRepository | AsyncOrderRepository = Depends(get_repo),
+    ) -> StreamingResponse:
+        """Server-Sent Events: the current state, then every status transition until the order settles."""
+        if await invoke(repo.get_order, order_id) is None:
+            raise HTTPException(status_code=404, detail="Order nicht gefunden")
+
+        async def events() -> AsyncIterator[str]:
+            yield f"retry: {SSE_RETRY_MILLISECONDS}\n\n"
+            async with aclosing(
+                watch_order(app.state.order_waiters, repo, order_id, MAX_STREAM_SECONDS, WATCH_RECHECK_SECONDS)
+            ) as updates:
+                async for record in updates:
+                    if record is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield _sse_event(record)
+                    if record.status in FINAL_STATUSES:
+                        return
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            # nginx (WAF) would otherwise buffer the stream until it ends.
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @app.post("/orders/{order_id}/cancel", response_model=schemas.OrderSummary)
     async def cancel_order(
         order_id: str,
         payload: schemas.CancelOrderRequest,
-        repo: OrderRepository = Depends(get_repository),
-        saga: OrderSaga = Depends(get_saga),
+        repo: OrderRepository | AsyncOrderRepository = Depends(get_repo),
+        saga: OrderSaga | AsyncOrderSaga = Depends(get_saga),
     ) -> schemas.OrderSummary:
-        record = repo.get_order(order_id)
+        record = await invoke(repo.get_order, order_id)
         if record is None:
             raise HTTPException(status_code=404, detail="Order nicht gefunden")
-        updated = saga.cancel(record, payload.reason)
+        updated = await invoke(saga.cancel, record, payload.reason)
         return schemas.OrderSummary(**updated.__dict__)
 
     return app
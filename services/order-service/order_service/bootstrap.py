@@ -0,0 +1,19 @@
+"""One-shot database setup: ``python -m order_service.bootstrap``.
+
+Applies pending migrations and
+exits. Run it once per deployment before the workers start; they only check
+the schema version (``GET /readyz``) instead of running DDL on every boot.
+"""
+
+from __future__ import annotations
+
+from .database import LATEST_SCHEMA_VERSION, init_db
+
+
+def main() -> None:
+    init_db()
+    print(f"Datenbank bereit (Schema-Version {LATEST_SCHEMA_VERSION})", flush=True)
+
+
+if __name__ == "__main__":
+    main()
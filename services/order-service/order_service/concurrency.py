@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import inspect
+
+from fastapi.concurrency import run_in_threadpool
+
+
+async def invoke(method, *args, **kwargs):
+    """Await coroutine methods directly; push blocking ones onto the threadpool."""
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await run_in_threadpool(method, *args, **kwargs)
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sqlite3
+import threading
 import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Iterable
 
 import psycopg
+# The pools live in the shared mifos_db package; re-exported for the repositories and tests.
+from mifos_db import (  # noqa: F401
+    AsyncConnectionPool,
+    AsyncSQLiteConnection,
+    ConnectionPool,
+    PoolSettings,
+    PoolTimeout,
+)
 from psycopg.rows import dict_row
 
 SCHEMA_SQL = """
@@ -24,6 +36,106 @@ CREATE TABLE IF NOT EXISTS orders (
 """
 
 
+@dataclass(frozen=True)
+class Migration:
+    """One schema step. Statements must be idempotent (``IF NOT EXISTS``)."""
+
+    version: int
+    description: str
+    sql: str
+
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+);
+"""
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "create orders table", SCHEMA_SQL),
+    Migration(
+        2,
+        "index orders for listing by updated_at",
+        """
+        CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders (updated_at DESC, id DESC);
+        """,
+    ),
+    Migration(
+        3,
+        "index order filters for keyset pagination",
+        """
+        CREATE INDEX IF NOT EXISTS idx_orders_status_updated_at
+            ON orders (status, updated_at DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_orders_restaurant_updated_at
+            ON orders (restaurant_id, updated_at DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_orders_customer_updated_at
+            ON orders (customer_reference, updated_at DESC, id DESC);
+        """,
+    ),
+    Migration(
+        4,
+        "create order_jobs work queue",
+        """
+        CREATE TABLE IF NOT EXISTS order_jobs (
+            order_id TEXT PRIMARY KEY,
+            payload_json TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at TEXT NOT NULL,
+            locked_until TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_order_jobs_ready ON order_jobs (status, available_at);
+        """,
+    ),
+    Migration(
+        5,
+        "create order_outbox for saga compensations",
+        """
+        CREATE TABLE IF NOT EXISTS order_outbox (
+            id TEXT PRIMARY KEY,
+            order_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            payload_json TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at TEXT NOT NULL,
+            locked_until TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_order_outbox_ready ON order_outbox (status, available_at);
+        """,
+    ),
+    Migration(
+        6,
+        "create idempotency_keys shared by all workers",
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            idempotency_key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            status_code INTEGER,
+            body TEXT,
+            headers_json TEXT,
+            media_type TEXT,
+            expires_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+        """,
+    ),
+)
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# pg_advisory_lock key serialising migrations of concurrently starting workers
+_MIGRATION_LOCK_KEY = 0x4F524452
+
+
 def _build_database_url() -> str:
     if url := os.environ.get("DATABASE_URL"):
         return url
@@ -38,6 +150,23 @@ def _build_database_url() -> str:
 DATABASE_URL = _build_database_url()
 
 
+# Seconds a single connection attempt may take; pooled connections fail fast after
+# one attempt, only get_connection() (bootstrap) keeps retrying until the database is up.
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "5"))
+
+
+def _prepare_threshold() -> int | None:
+    value = os.environ.get("DB_PREPARE_THRESHOLD", "0").strip().lower()
+    return None if value in {"", "none", "off"} else int(value)
+
+
+# psycopg prepares a statement server-side once it ran this many times on a
+# connection (0: on first use). The repositories keep their SQL text stable, so
+# pooled connections parse and plan each statement once. "none" switches it off,
+# which PgBouncer in transaction mode requires.
+DB_PREPARE_THRESHOLD = _prepare_threshold()
+
+
 def get_connection():
     retries = int(os.environ.get("DB_CONNECT_MAX_RETRIES", "30"))
     delay = float(os.environ.get("DB_CONNECT_RETRY_DELAY", "2"))
@@ -56,30 +185,164 @@ def get_connection():
 def _connect_once():
     if DATABASE_URL.startswith("sqlite://"):
         path = DATABASE_URL.replace("sqlite:///", "")
-        conn = sqlite3.connect(path)
+        conn = sqlite3.connect(path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
         return conn
 
-    return psycopg.connect(DATABASE_URL, autocommit=True, row_factory=dict_row)
+    return psycopg.connect(
+        DATABASE_URL,
+        autocommit=True,
+        row_factory=dict_row,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        prepare_threshold=DB_PREPARE_THRESHOLD,
+    )
+
+
+async def get_async_connection():
+    retries = int(os.environ.get("DB_CONNECT_MAX_RETRIES", "30"))
+    delay = float(os.environ.get("DB_CONNECT_RETRY_DELAY", "2"))
+    last_exc: Exception | None = None
+    for attempt in range(retries):
+        try:
+            return await _connect_once_async()
+        except Exception as exc:  # pragma: no cover
+            last_exc = exc
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(delay)
+    raise last_exc  # pragma: no cover
+
+
+async def _connect_once_async():
+    if DATABASE_URL.startswith("sqlite://"):
+        return AsyncSQLiteConnection(await asyncio.to_thread(_connect_once))
+
+    return await psycopg.AsyncConnection.connect(
+        DATABASE_URL,
+        autocommit=True,
+        row_factory=dict_row,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        prepare_threshold=DB_PREPARE_THRESHOLD,
+    )
+
+
+def new_async_pool() -> AsyncConnectionPool:
+    """Pool for the asyncio data path; bound to the event loop that uses it first."""
+    return AsyncConnectionPool(_connect_once_async)
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_connect_once)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def reset_pool_after_fork() -> None:
+    """Drop a pool inherited from the parent process without closing its connections.
+
+    The sockets are shared with the parent; closing them here would end the
+    parent's sessions, so the child just starts over with fresh state.
+    """
+    global _pool, _pool_lock
+    _pool_lock = threading.Lock()
+    _pool = None
 
 
 def init_db() -> None:
+    """Apply pending migrations; run once per deployment via the bootstrap command."""
     with get_connection() as conn:
         apply_schema(conn)
 
 
 def apply_schema(conn) -> None:
+    """Apply all pending migrations; safe to call concurrently from several processes."""
     if hasattr(conn, "executescript"):
-        conn.executescript(SCHEMA_SQL)
-        conn.commit()
+        _migrate_sqlite(conn)
         return
+    _migrate_postgres(conn)
+
+
+def schema_version(conn) -> int:
+    """Return the highest applied migration version (``0`` for an empty database)."""
+    try:
+        row = conn.execute("SELECT MAX(version) AS version FROM schema_migrations;").fetchone()
+    except (sqlite3.Error, psycopg.Error):
+        return 0
+    return (_first_column(row) or 0) if row is not None else 0
+
+
+async def schema_version_async(conn) -> int:
+    """:func:`schema_version` for connections from :class:`AsyncConnectionPool`."""
+    try:
+        cursor = await conn.execute("SELECT MAX(version) AS version FROM schema_migrations;")
+        row = await cursor.fetchone()
+    except (sqlite3.Error, psycopg.Error):
+        return 0
+    return (_first_column(row) or 0) if row is not None else 0
 
+
+def _migrate_sqlite(conn) -> None:
+    conn.executescript(SCHEMA_MIGRATIONS_SQL)
+    applied = {_first_column(row) for row in conn.execute("SELECT version FROM schema_migrations;")}
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            continue
+        description = migration.description.replace("'", "''")
+        now = datetime.now(timezone.utc).isoformat()
+        # executescript() cannot bind parameters; version/description are module constants.
+        conn.executescript(
+            "BEGIN IMMEDIATE;\n"
+            f"{migration.sql}\n"
+            "INSERT OR IGNORE INTO schema_migrations (version, description, applied_at)"
+            f" VALUES ({migration.version}, '{description}', '{now}');\n"
+            "COMMIT;"
+        )
+
+
+def _migrate_postgres(conn) -> None:
     with conn.cursor() as cur:
-        for statement in _split_statements(SCHEMA_SQL):
-            cur.execute(statement)
+        cur.execute("SELECT pg_advisory_lock(%s);", (_MIGRATION_LOCK_KEY,))
+        try:
+            cur.execute(SCHEMA_MIGRATIONS_SQL)
+            cur.execute("SELECT version FROM schema_migrations;")
+            applied = {_first_column(row) for row in cur.fetchall()}
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+                with conn.transaction():
+                    for statement in _split_statements(migration.sql):
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, description, applied_at)"
+                        " VALUES (%s, %s, %s);",
+                        (migration.version, migration.description, datetime.now(timezone.utc).isoformat()),
+                    )
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (_MIGRATION_LOCK_KEY,))
     conn.commit()
 
 
+def _first_column(row):
+    if isinstance(row, dict):
+        return next(iter(row.values()))
+    return row[0]
+
+
 def _split_statements(sql_blob: str) -> Iterable[str]:
     for statement in sql_blob.split(";"):
         stmt = statement.strip()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+
+from .repository import OrderRecord
+
+EXPORT_COLUMNS = (
+    "id",
+    "restaurant_id",
+    "status",
+    "total_amount",
+    "items",
+    "payment_reference",
+    "failure_reason",
+    "customer_reference",
+    "created_at",
+    "updated_at",
+)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Rows are flushed in chunks so the response neither buffers the export nor emits a frame per row.
+CHUNK_ROWS = 200
+
+
+def format_ndjson(record: OrderRecord) -> str:
+    return json.dumps({column: getattr(record, column) for column in EXPORT_COLUMNS}, ensure_ascii=False) + "\n"
+
+
+def format_csv(record: OrderRecord) -> str:
+    values = [getattr(record, column) for column in EXPORT_COLUMNS]
+    values[EXPORT_COLUMNS.index("items")] = json.dumps(record.items) if record.items is not None else ""
+    return _csv_line(values)
+
+
+def csv_header() -> str:
+    return _csv_line(EXPORT_COLUMNS)
+
+
+def formatter_for(export_format: str) -> tuple[str, Callable[[OrderRecord], str]]:
+    """Return the preamble and per-row formatter for ``ndjson`` or ``csv``."""
+    if export_format == "csv":
+        return csv_header(), format_csv
+    return "", format_ndjson
+
+
+def stream_export(records: Iterable[OrderRecord], export_format: str) -> Iterator[str]:
+    preamble, formatter = formatter_for(export_format)
+    chunk = [preamble] if preamble else []
+    for record in records:
+        chunk.append(formatter(record))
+        if len(chunk) >= CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if any(chunk):
+        yield "".join(chunk)
+
+
+async def stream_export_async(records: AsyncIterable[OrderRecord], export_format: str) -> AsyncIterator[str]:
+    preamble, formatter = formatter_for(export_format)
+    chunk = [preamble] if preamble else []
+    async for record in records:
+        chunk.append(formatter(record))
+        if len(chunk) >= CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if any(chunk):
+        yield "".join(chunk)
+
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+
+import httpx
+from mifos_observability.tracing import TRACEPARENT_HEADER, TRACER
+
+from .resilience import Downstream, ResilienceSettings
+
+
+@dataclass(frozen=True)
+class HTTPClientSettings:
+    """Connection-pool limits applied to every downstream client.
+
+    The registry keeps one client per downstream service, so the connection
+    limits below are effectively per-host caps.
+    """
+
+    max_connections_per_host: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 5.0
+    connect_timeout: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientSettings":
+        return cls(
+            max_connections_per_host=int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS_PER_HOST", "50")),
+            max_keepalive_connections=int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.environ.get("HTTP_POOL_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.environ.get("HTTP_CLIENT_TIMEOUT", "5")),
+            connect_timeout=float(os.environ.get("HTTP_CLIENT_CONNECT_TIMEOUT", "2")),
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections_per_host,
+            max_keepalive_connections=min(self.max_keepalive_connections, self.max_connections_per_host),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+class HTTPClientRegistry:
+    """Process-lifetime ``httpx`` clients per downstream service.
+
+    Created in the app lifespan and shared by all requests so that keep-alive
+    connections are reused instead of opening a socket per saga step.
+    """
+
+    def __init__(
+        self,
+        settings: HTTPClientSettings | None = None,
+        resilience: ResilienceSettings | None = None,
+    ):
+        self.settings = settings or HTTPClientSettings.from_env()
+        self.resilience = resilience or ResilienceSettings.from_env()
+        self._downstreams: dict[str, Downstream] = {}
+        self._clients: dict[str, httpx.Client] = {}
+        self._async_clients: dict[str, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def client(self, name: str) -> httpx.Client:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                self._ensure_open()
+                client = self._clients.get(name)
+                if client is None:
+                    client = httpx.Client(
+                        limits=self.settings.limits,
+                        timeout=self.settings.timeouts,
+                        event_hooks={"request": [_inject_traceparent]},
+                    )
+                    self._clients[name] = client
+        return client
+
+    def async_client(self, name: str) -> httpx.AsyncClient:
+        client = self._async_clients.get(name)
+        if client is None:
+            with self._lock:
+                self._ensure_open()
+                client = self._async_clients.get(name)
+                if client is None:
+                    client = httpx.AsyncClient(
+                        limits=self.settings.limits,
+                        timeout=self.settings.timeouts,
+                        event_hooks={"request": [_ainject_traceparent]},
+                    )
+                    self._async_clients[name] = client
+        return client
+
+    def downstream(self, name: str) -> Downstream:
+        """Breaker and latency state for ``name``, shared by its sync and async clients."""
+        downstream = self._downstreams.get(name)
+        if downstream is None:
+            with self._lock:
+                downstream = self._downstreams.setdefault(name, Downstream(name, self.resilience))
+        return downstream
+
+    def retry_after(self, *names: str) -> float | None:
+        """Longest wait until all named downstreams admit calls again, ``None`` if they all do."""
+        waits = [wait for name in names if (wait := self.downstream(name).retry_after()) is not None]
+        return max(waits, default=None)
+
+    def downstream_stats(self) -> dict[str, dict]:
+        with self._lock:
+            downstreams = list(self._downstreams.values())
+        return {downstream.name: downstream.stats() for downstream in downstreams}
+
+    async def aclose(self) -> None:
+        with self._lock:
+            self._closed = True
+            clients = list(self._clients.values())
+            async_clients = list(self._async_clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
+        for async_client in async_clients:
+            await async_client.aclose()
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            entries = [(name, "sync", client) for name, client in self._clients.items()]
+            entries += [(name, "async", client) for name, client in self._async_clients.items()]
+        return {f"{name}:{kind}": self._client_stats(client) for name, kind, client in entries}
+
+    def _client_stats(self, client: httpx.Client | httpx.AsyncClient) -> dict:
+        # httpcore exposes the live connections; queued requests are only available privately.
+        pool = getattr(client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "max_connections": self.settings.limits.max_connections,
+            "max_keepalive_connections": self.settings.limits.max_keepalive_connections,
+            "keepalive_expiry": self.settings.keepalive_expiry,
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "requests_in_flight": len(getattr(pool, "_requests", [])),
+        }
+
+    def _ensure_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("HTTP-Client-Registry ist bereits geschlossen.")
+
+
+def _inject_traceparent(request: httpx.Request) -> None:
+    traceparent = TRACER.traceparent()
+    if traceparent is not None:
+        request.headers[TRACEPARENT_HEADER] = traceparent
+
+
+async def _ainject_traceparent(request: httpx.Request) -> None:
+    _inject_traceparent(request)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable
+
+from mifos_observability.tracing import TRACER
+
+from .concurrency import invoke
+from .payment_client import PaymentServiceError
+from .repository import AsyncOrderRepository, OrderJob, OrderRecord, OrderRepository
+from .restaurant_client import RestaurantServiceError
+from .saga import AsyncOrderSaga, CreateOrderCommand, OrderSaga
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JobSettings:
+    workers: int = 4
+    poll_interval: float = 0.5
+    lease: float = 60.0
+    max_attempts: int = 5
+    retry_delay: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "JobSettings":
+        return cls(
+            workers=int(os.environ.get("ORDER_JOB_WORKERS", "4")),
+            poll_interval=float(os.environ.get("ORDER_JOB_POLL_INTERVAL", "0.5")),
+            lease=float(os.environ.get("ORDER_JOB_LEASE", "60")),
+            max_attempts=int(os.environ.get("ORDER_JOB_MAX_ATTEMPTS", "5")),
+            retry_delay=float(os.environ.get("ORDER_JOB_RETRY_DELAY", "2")),
+        )
+
+
+class OrderWaiters:
+    """In-process pub/sub of order status transitions for long-polls and SSE streams.
+
+    Sagas publish every record they write; subscribers get the new record, or
+    ``None`` from :meth:`notify` when they should re-read the order. Publishing
+    is safe from threadpool workers (sync execution mode).
+    """
+
+    def __init__(self):
+        self._queues: dict[str, set[asyncio.Queue]] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @asynccontextmanager
+    async def subscribe(self, order_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue of ``OrderRecord | None`` updates for ``order_id`` while the block runs."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._queues.setdefault(order_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                queues = self._queues.get(order_id)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self._queues[order_id]
+
+    async def wait(self, order_id: str, timeout: float) -> None:
+        async with self.subscribe(order_id) as queue:
+            try:
+                await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def publish(self, record: OrderRecord) -> None:
+        self._deliver(record.id, record)
+
+    def notify(self, order_id: str) -> None:
+        self._deliver(order_id, None)
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return sum(len(queues) for queues in self._queues.values())
+
+    def _deliver(self, order_id: str, record: OrderRecord | None) -> None:
+        with self._lock:
+            queues = list(self._queues.get(order_id, ()))
+        if not queues or self._loop is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        for queue in queues:
+            if on_loop:
+                queue.put_nowait(record)
+            else:
+                self._loop.call_soon_threadsafe(queue.put_nowait, record)
+
+
+async def watch_order(
+    waiters: OrderWaiters,
+    repository: OrderRepository | AsyncOrderRepository,
+    order_id: str,
+    timeout: float,
+    recheck: float,
+) -> AsyncIterator[OrderRecord | None]:
+    """Yield the stored order, then every newer state until ``timeout`` runs out.
+
+    Updates come from :class:`OrderWaiters`; the database is only read again
+    when a subscriber is woken without a record or ``recheck`` seconds pass
+    quietly, which covers sagas run by other processes. ``None`` is yielded
+    after such a quiet recheck so callers can send keep-alives.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    async with waiters.subscribe(order_id) as updates:
+        # Subscribed before reading, so a transition in between is not lost.
+        last = await invoke(repository.get_order, order_id)
+        if last is None:
+            return
+        yield last
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                record = await asyncio.wait_for(updates.get(), min(remaining, recheck))
+            except asyncio.TimeoutError:
+                record = None
+            if record is None:
+                record = await invoke(repository.get_order, order_id)
+            if record is not None and record.updated_at > last.updated_at:
+                last = record
+                yield record
+            else:
+                yield None
+
+
+class OrderJobWorkers:
+    """Runs queued sagas from the ``order_jobs`` table.
+
+    Jobs are leased, so a job whose worker died is picked up again once the
+    lease expires. Saga failures (restaurant or payment declined) are final;
+    any other error is retried with exponential backoff until
+    ``max_attempts``, then the order is canceled with its compensations. While ``paused`` reports an
+    open downstream circuit the workers leave jobs queued instead of failing them.
+    """
+
+    def __init__(
+        self,
+        repository: OrderRepository | AsyncOrderRepository,
+        saga_factory: Callable[[], OrderSaga | AsyncOrderSaga],
+        settings: JobSettings | None = None,
+        waiters: OrderWaiters | None = None,
+        paused: Callable[[], float | None] | None = None,
+    ):
+        self.settings = settings or JobSettings.from_env()
+        self.waiters = waiters or OrderWaiters()
+        self._repo = repository
+        self._saga_factory = saga_factory
+        self._paused = paused
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"order-job-worker-{index}")
+            for index in range(self.settings.workers)
+        ]
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Signal that a job was enqueued so idle workers do not wait for the next poll."""
+        self._wakeup.set()
+
+    async def run_once(self) -> bool:
+        """Claim and process a single job; returns ``False`` when the queue is empty."""
+        job = await invoke(self._repo.claim_job, self.settings.lease)
+        if job is None:
+            return False
+        await self._process(job)
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            if self._paused is not None and (retry_after := self._paused()) is not None:
+                await asyncio.sleep(retry_after)
+                continue
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:  # pragma: no cover - keep the worker alive on DB hiccups
+                logger.exception("Order-Job konnte nicht abgeholt werden")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.settings.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process(self, job: OrderJob) -> None:
+        with TRACER.span("order_job", order_id=job.order_id, attempt=job.attempts):
+            await self._process_job(job)
+
+    async def _process_job(self, job: OrderJob) -> None:
+        saga = self._saga_factory()
+        try:
+            await invoke(saga.resume, job.order_id, CreateOrderCommand.from_payload(job.order_id, job.payload))
+        except (RestaurantServiceError, PaymentServiceError):
+            pass  # the saga already stored the CANCELED state
+        except Exception as exc:
+            if job.attempts < self.settings.max_attempts:
+                delay = self.settings.retry_delay * 2 ** (job.attempts - 1)
+                await invoke(self._repo.retry_job, job.order_id, str(exc), delay)
+                return
+            logger.exception("Order-Job %s endgültig fehlgeschlagen", job.order_id)
+            order = await invoke(self._repo.get_order, job.order_id)
+            if order is not None and order.status == "PENDING":
+                # The restaurant may already have confirmed, so cancel through the saga: the
+                # CANCELED update and its outbox compensations are written in one transaction.
+                await invoke(saga.cancel, order, f"Verarbeitung fehlgeschlagen: {exc}")
+            await invoke(self._repo.fail_job, job.order_id, str(exc))
+            return
+        # The saga publishes its own transitions to the waiters.
+        await invoke(self._repo.complete_job, job.order_id)
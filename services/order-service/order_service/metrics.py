@@ -0,0 +1,71 @@
+"""Prometheus metrics of the order service; the metric types live in ``mifos_observability``."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# The metric types and middleware are shared; re-exported for the app and tests.
+from mifos_observability.metrics import (  # noqa: F401
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    query_instrumentation,
+)
+from mifos_observability.tracing import TRACER
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION: Histogram = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Dauer der HTTP-Anfragen je Route",
+        ("method", "route", "status"),
+    )
+)
+DB_QUERY_DURATION: Histogram = REGISTRY.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Dauer der Repository-Aufrufe inklusive Verbindungsbezug",
+        ("repository", "method"),
+    )
+)
+DOWNSTREAM_REQUEST_DURATION: Histogram = REGISTRY.register(
+    Histogram(
+        "downstream_request_duration_seconds",
+        "Dauer der Aufrufe an Downstream-Services",
+        ("downstream", "outcome"),
+    )
+)
+DOWNSTREAM_CIRCUIT_STATE: Gauge = REGISTRY.register(
+    Gauge("downstream_circuit_open", "1, solange der Circuit des Downstreams nicht geschlossen ist", ("downstream",))
+)
+DB_POOL_CONNECTIONS: Gauge = REGISTRY.register(
+    Gauge("db_pool_connections", "Verbindungen bzw. Wartende im DB-Connection-Pool", ("state",))
+)
+SAGA_STEP_DURATION: Histogram = REGISTRY.register(
+    Histogram("saga_step_duration_seconds", "Dauer der Saga-Schritte", ("step", "outcome"))
+)
+SAGA_OUTCOMES: Counter = REGISTRY.register(
+    Counter("saga_outcomes", "Abgeschlossene Sagas nach Ergebnis", ("outcome",))
+)
+
+# Times every public repository method under ``db_query_duration_seconds`` and in a span.
+instrument_queries = query_instrumentation(DB_QUERY_DURATION, TRACER)
+
+
+@contextmanager
+def saga_step(step: str) -> Iterator[None]:
+    """Time a saga step, labelled ``ok`` or ``error`` by whether it raised, and trace it."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with TRACER.span(f"saga {step}"):
+            yield
+        outcome = "ok"
+    finally:
+        SAGA_STEP_DURATION.observe(time.perf_counter() - started, step, outcome)
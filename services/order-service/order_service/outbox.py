@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+
+from .concurrency import invoke
+from .payment_client import AsyncPaymentClient, PaymentClient, PaymentServiceError
+from .repository import (
+    PAYMENT_REFUND,
+    PAYMENT_REFUND_ORDER,
+    RESTAURANT_CANCEL,
+    AsyncOrderRepository,
+    OrderRepository,
+    OutboxMessage,
+)
+from .restaurant_client import AsyncRestaurantClient, RestaurantClient, RestaurantServiceError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutboxSettings:
+    batch_size: int = 50
+    poll_interval: float = 1.0
+    lease: float = 60.0
+    retry_delay: float = 1.0
+    max_retry_delay: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "OutboxSettings":
+        return cls(
+            batch_size=int(os.environ.get("ORDER_OUTBOX_BATCH_SIZE", "50")),
+            poll_interval=float(os.environ.get("ORDER_OUTBOX_POLL_INTERVAL", "1")),
+            lease=float(os.environ.get("ORDER_OUTBOX_LEASE", "60")),
+            retry_delay=float(os.environ.get("ORDER_OUTBOX_RETRY_DELAY", "1")),
+            max_retry_delay=float(os.environ.get("ORDER_OUTBOX_MAX_RETRY_DELAY", "300")),
+        )
+
+
+class OutboxDispatcher:
+    """Delivers compensations recorded in ``order_outbox``.
+
+    Messages are claimed in batches and sent concurrently. Transient failures
+    are retried with capped exponential backoff until they succeed; a 4xx
+    answer means retrying cannot help, so the message is parked as FAILED.
+    """
+
+    def __init__(
+        self,
+        repository: OrderRepository | AsyncOrderRepository,
+        restaurant_client: RestaurantClient | AsyncRestaurantClient,
+        payment_client: PaymentClient | AsyncPaymentClient,
+        settings: OutboxSettings | None = None,
+    ):
+        self.settings = settings or OutboxSettings.from_env()
+        self._repo = repository
+        self._restaurant = restaurant_client
+        self._payment = payment_client
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="order-outbox-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch; returns the number of claimed messages."""
+        messages = await invoke(self._repo.claim_outbox, self.settings.batch_size, self.settings.lease)
+        if not messages:
+            return 0
+        outcomes = await asyncio.gather(*(self._deliver(message) for message in messages), return_exceptions=True)
+
+        delivered: list[str] = []
+        retries: list[tuple[str, str, float]] = []
+        for message, outcome in zip(messages, outcomes):
+            if outcome is None:
+                delivered.append(message.id)
+            elif _is_permanent(outcome):
+                logger.error("Kompensation %s (%s) endgültig fehlgeschlagen: %s", message.id, message.kind, outcome)
+                await invoke(self._repo.fail_outbox, message.id, str(outcome))
+            else:
+                retries.append((message.id, str(outcome), self._backoff(message.attempts)))
+        await invoke(self._repo.complete_outbox, delivered)
+        await invoke(self._repo.retry_outbox, retries)
+        return len(messages)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self.dispatch_once() >= self.settings.batch_size:
+                    continue
+            except Exception:  # pragma: no cover - keep dispatching after DB hiccups
+                logger.exception("Outbox konnte nicht abgearbeitet werden")
+            await asyncio.sleep(self.settings.poll_interval)
+
+    async def _deliver(self, message: OutboxMessage) -> None:
+        payload = message.payload
+        if message.kind == RESTAURANT_CANCEL:
+            await invoke(self._restaurant.cancel_order, payload["restaurant_id"], message.order_id, payload["reason"])
+        elif message.kind == PAYMENT_REFUND:
+            await invoke(self._payment.refund, payload["reference"], payload["amount"])
+        elif message.kind == PAYMENT_REFUND_ORDER:
+            await invoke(self._payment.refund_order, message.order_id)
+        else:
+            raise ValueError(f"Unbekannter Outbox-Typ: {message.kind}")
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.settings.retry_delay * 2 ** (attempts - 1), self.settings.max_retry_delay)
+
+
+def _is_permanent(error: BaseException) -> bool:
+    if isinstance(error, (RestaurantServiceError, PaymentServiceError)):
+        return error.status_code is not None and 400 <= error.status_code < 500
+    return isinstance(error, (ValueError, KeyError))
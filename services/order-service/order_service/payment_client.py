@@ -1,63 +1,183 @@
 from __future__ import annotations
 
+import hashlib
 import uuid
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Protocol, Sequence
 
 import httpx
 
+from .resilience import CircuitOpenError, Downstream
+
 
 @dataclass
 class PaymentResult:
     reference: str
     status: str
+    failure_reason: str | None = None
 
 
 class PaymentClient(Protocol):
     def authorize_and_capture(self, order_id: str, amount: float) -> PaymentResult: ...
 
+    def authorize_and_capture_many(self, charges: Sequence[tuple[str, float]]) -> dict[str, PaymentResult]: ...
+
     def refund(self, reference: str, amount: float) -> PaymentResult: ...
 
+    def refund_order(self, order_id: str) -> list[PaymentResult]: ...
+
+
+class AsyncPaymentClient(Protocol):
+    async def authorize_and_capture(self, order_id: str, amount: float) -> PaymentResult: ...
+
+    async def authorize_and_capture_many(
+        self, charges: Sequence[tuple[str, float]]
+    ) -> dict[str, PaymentResult]: ...
+
+    async def refund(self, reference: str, amount: float) -> PaymentResult: ...
+
+    async def refund_order(self, order_id: str) -> list[PaymentResult]: ...
+
 
 class PaymentServiceError(Exception):
-    """Represents downstream payment failures."""
+    """Represents downstream payment failures.
+
+    ``outcome_unknown`` is set when a capture got no answer or a 5xx: the
+    payment service may still have committed it, so it has to be looked up.
+    """
+
+    def __init__(self, message: str, status_code: int | None = None, outcome_unknown: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.outcome_unknown = outcome_unknown
 
 
 class HTTPPaymentClient:
-    def __init__(self, base_url: str):
+    """Captures (single and batch) carry an ``Idempotency-Key`` and refunds are no-ops
+    when repeated, so all of them may be retried."""
+
+    def __init__(self, base_url: str, client: httpx.Client | None = None, downstream: Downstream | None = None):
         self._base_url = base_url.rstrip("/")
-        self._client = httpx.Client(timeout=5.0)
+        self._client = client or httpx.Client(timeout=5.0)
+        self._downstream = downstream or Downstream("payment")
 
     def authorize_and_capture(self, order_id: str, amount: float) -> PaymentResult:
+        url = f"{self._base_url}/payments"
+        payload = {"order_id": order_id, "amount": amount}
         try:
-            response = self._client.post(
-                f"{self._base_url}/payments",
-                json={"order_id": order_id, "amount": amount},
+            response = self._downstream.call(
+                lambda timeout: self._client.post(
+                    url, json=payload, headers=_capture_headers(order_id), timeout=timeout
+                ),
+                idempotent=True,
             )
         except httpx.HTTPError as exc:
-            raise PaymentServiceError(f"Payment-Service nicht erreichbar: {exc}") from exc
+            raise _unreachable(exc) from exc
+        return _capture_result(response)
 
-        if response.status_code >= 400:
-            raise PaymentServiceError(
-                f"Zahlung fehlgeschlagen ({response.status_code}): {response.text}"
+    def authorize_and_capture_many(self, charges: Sequence[tuple[str, float]]) -> dict[str, PaymentResult]:
+        """Capture several orders in one request; results are keyed by order id."""
+        url = f"{self._base_url}/payments/batch"
+        payload = _batch_payload(charges)
+        try:
+            response = self._downstream.call(
+                lambda timeout: self._client.post(
+                    url, json=payload, headers=_batch_capture_headers(charges), timeout=timeout
+                ),
+                idempotent=True,
             )
-        payload = response.json()
-        return PaymentResult(reference=payload.get("payment_id", ""), status=payload.get("status", "FAILED"))
+        except httpx.HTTPError as exc:
+            raise _unreachable(exc) from exc
+        return _batch_capture_results(response)
 
     def refund(self, reference: str, amount: float) -> PaymentResult:
+        url = f"{self._base_url}/payments/{reference}/refund"
+        try:
+            response = self._downstream.call(
+                lambda timeout: self._client.post(url, json={"amount": amount}, timeout=timeout), idempotent=True
+            )
+        except httpx.HTTPError as exc:
+            raise PaymentServiceError(f"Refund fehlgeschlagen: {exc}") from exc
+        return _refund_result(response, reference)
+
+    def refund_order(self, order_id: str) -> list[PaymentResult]:
+        """Refund every capture of ``order_id``; for captures whose answer never arrived."""
+        url = f"{self._base_url}/payments"
+        try:
+            response = self._downstream.call(
+                lambda timeout: self._client.get(url, params={"order_id": order_id}, timeout=timeout),
+                idempotent=True,
+            )
+        except httpx.HTTPError as exc:
+            raise PaymentServiceError(f"Zahlungen nicht abrufbar: {exc}") from exc
+        return [self.refund(reference, amount) for reference, amount in _captures(response)]
+
+
+class AsyncHTTPPaymentClient:
+    """Non-blocking variant of :class:`HTTPPaymentClient` on ``httpx.AsyncClient``."""
+
+    def __init__(
+        self, base_url: str, client: httpx.AsyncClient | None = None, downstream: Downstream | None = None
+    ):
+        self._base_url = base_url.rstrip("/")
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(timeout=5.0)
+        self._downstream = downstream or Downstream("payment")
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def authorize_and_capture(self, order_id: str, amount: float) -> PaymentResult:
+        url = f"{self._base_url}/payments"
+        payload = {"order_id": order_id, "amount": amount}
+        try:
+            response = await self._downstream.acall(
+                lambda timeout: self._client.post(
+                    url, json=payload, headers=_capture_headers(order_id), timeout=timeout
+                ),
+                idempotent=True,
+            )
+        except httpx.HTTPError as exc:
+            raise _unreachable(exc) from exc
+        return _capture_result(response)
+
+    async def authorize_and_capture_many(
+        self, charges: Sequence[tuple[str, float]]
+    ) -> dict[str, PaymentResult]:
+        url = f"{self._base_url}/payments/batch"
+        payload = _batch_payload(charges)
+        try:
+            response = await self._downstream.acall(
+                lambda timeout: self._client.post(
+                    url, json=payload, headers=_batch_capture_headers(charges), timeout=timeout
+                ),
+                idempotent=True,
+            )
+        except httpx.HTTPError as exc:
+            raise _unreachable(exc) from exc
+        return _batch_capture_results(response)
+
+    async def refund(self, reference: str, amount: float) -> PaymentResult:
+        url = f"{self._base_url}/payments/{reference}/refund"
         try:
-            response = self._client.post(
-                f"{self._base_url}/payments/{reference}/refund",
-                json={"amount": amount},
+            response = await self._downstream.acall(
+                lambda timeout: self._client.post(url, json={"amount": amount}, timeout=timeout), idempotent=True
             )
         except httpx.HTTPError as exc:
             raise PaymentServiceError(f"Refund fehlgeschlagen: {exc}") from exc
-        if response.status_code >= 400:
-            raise PaymentServiceError(
-                f"Refund fehlgeschlagen ({response.status_code}): {response.text}"
+        return _refund_result(response, reference)
+
+    async def refund_order(self, order_id: str) -> list[PaymentResult]:
+        url = f"{self._base_url}/payments"
+        try:
+            response = await self._downstream.acall(
+                lambda timeout: self._client.get(url, params={"order_id": order_id}, timeout=timeout),
+                idempotent=True,
             )
-        payload = response.json()
-        return PaymentResult(reference=payload.get("payment_id", reference), status=payload.get("status", "FAILED"))
+        except httpx.HTTPError as exc:
+            raise PaymentServiceError(f"Zahlungen nicht abrufbar: {exc}") from exc
+        return [await self.refund(reference, amount) for reference, amount in _captures(response)]
 
 
 class MockPaymentClient:
@@ -67,5 +187,99 @@ class MockPaymentClient:
         reference = f"mock-pay-{uuid.uuid4()}"
         return PaymentResult(reference=reference, status="CAPTURED")
 
+    def authorize_and_capture_many(self, charges: Sequence[tuple[str, float]]) -> dict[str, PaymentResult]:
+        return {order_id: self.authorize_and_capture(order_id, amount) for order_id, amount in charges}
+
     def refund(self, reference: str, amount: float) -> PaymentResult:
         return PaymentResult(reference=reference, status="REFUNDED")
+
+    def refund_order(self, order_id: str) -> list[PaymentResult]:
+        return []
+
+
+class AsyncMockPaymentClient:
+    async def authorize_and_capture(self, order_id: str, amount: float) -> PaymentResult:
+        reference = f"mock-pay-{uuid.uuid4()}"
+        return PaymentResult(reference=reference, status="CAPTURED")
+
+    async def authorize_and_capture_many(
+        self, charges: Sequence[tuple[str, float]]
+    ) -> dict[str, PaymentResult]:
+        return {order_id: await self.authorize_and_capture(order_id, amount) for order_id, amount in charges}
+
+    async def refund(self, reference: str, amount: float) -> PaymentResult:
+        return PaymentResult(reference=reference, status="REFUNDED")
+
+    async def refund_order(self, order_id: str) -> list[PaymentResult]:
+        return []
+
+
+def _unreachable(exc: httpx.HTTPError) -> PaymentServiceError:
+    # An open circuit sent nothing; any other transport error may have lost the answer only.
+    return PaymentServiceError(
+        f"Payment-Service nicht erreichbar: {exc}", outcome_unknown=not isinstance(exc, CircuitOpenError)
+    )
+
+
+def _capture_result(response: httpx.Response) -> PaymentResult:
+    if response.status_code >= 400:
+        raise PaymentServiceError(
+            f"Zahlung fehlgeschlagen ({response.status_code}): {response.text}",
+            response.status_code,
+            outcome_unknown=response.status_code >= 500,
+        )
+    payload = response.json()
+    return PaymentResult(reference=payload.get("payment_id", ""), status=payload.get("status", "FAILED"))
+
+
+def _capture_headers(order_id: str) -> dict[str, str]:
+    # One capture per order: a retried call is answered from the payment-service idempotency store.
+    return {"Idempotency-Key": f"capture-{order_id}"}
+
+
+def _batch_capture_headers(charges: Sequence[tuple[str, float]]) -> dict[str, str]:
+    # The same set of orders always gets the same key, so a retried batch is replayed, not re-run.
+    digest = hashlib.sha256(",".join(sorted(order_id for order_id, _ in charges)).encode("utf-8")).hexdigest()
+    return {"Idempotency-Key": f"capture-batch-{digest[:32]}"}
+
+
+def _batch_payload(charges: Sequence[tuple[str, float]]) -> dict:
+    return {"payments": [{"order_id": order_id, "amount": amount} for order_id, amount in charges]}
+
+
+def _batch_capture_results(response: httpx.Response) -> dict[str, PaymentResult]:
+    if response.status_code >= 400:
+        raise PaymentServiceError(
+            f"Zahlung fehlgeschlagen ({response.status_code}): {response.text}",
+            response.status_code,
+            outcome_unknown=response.status_code >= 500,
+        )
+    return {
+        payload["order_id"]: PaymentResult(
+            reference=payload.get("payment_id", ""),
+            status=payload.get("status", "FAILED"),
+            failure_reason=payload.get("failure_reason"),
+        )
+        for payload in response.json()
+    }
+
+
+def _captures(response: httpx.Response) -> list[tuple[str, float]]:
+    if response.status_code >= 400:
+        raise PaymentServiceError(
+            f"Zahlungen nicht abrufbar ({response.status_code}): {response.text}",
+            response.status_code,
+        )
+    return [
+        (payment["payment_id"], payment["amount"]) for payment in response.json() if payment["status"] == "CAPTURED"
+    ]
+
+
+def _refund_result(response: httpx.Response, reference: str) -> PaymentResult:
+    if response.status_code >= 400:
+        raise PaymentServiceError(
+            f"Refund fehlgeschlagen ({response.status_code}): {response.text}",
+            response.status_code,
+        )
+    payload = response.json()
+    return PaymentResult(reference=payload.get("payment_id", reference), status=payload.get("status", "FAILED"))
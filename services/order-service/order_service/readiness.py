@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from . import schemas
+from .database import LATEST_SCHEMA_VERSION, PoolTimeout
+from .resilience import Downstream
+
+OK = "ok"
+DEGRADED = "degraded"
+UNAVAILABLE = "unavailable"
+
+
+@dataclass(frozen=True)
+class ReadinessSettings:
+    cache_ttl: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "ReadinessSettings":
+        return cls(cache_ttl=float(os.environ.get("READINESS_CACHE_TTL", "2")))
+
+
+class ReadinessProbe:
+    """Serves the last readiness verdict for ``cache_ttl`` seconds.
+
+    At most one check runs at a time. Once a verdict exists, probes never wait
+    for a check: they get the last verdict while a newer one is being
+    computed, so a slow database cannot stall the probe endpoint itself.
+    """
+
+    def __init__(
+        self,
+        check: Callable[[], Awaitable[schemas.ReadinessResponse]],
+        settings: ReadinessSettings | None = None,
+    ):
+        self.settings = settings or ReadinessSettings.from_env()
+        self._check = check
+        self._running: asyncio.Task | None = None
+        self._result: schemas.ReadinessResponse | None = None
+        self._expires = 0.0
+
+    async def result(self) -> schemas.ReadinessResponse:
+        if self._result is not None and time.monotonic() < self._expires:
+            return self._result
+        if self._running is None:
+            self._running = asyncio.ensure_future(self._refresh())
+        if self._result is not None:
+            return self._result
+        # shield: a probe that disconnects must not cancel the check the others wait for.
+        return await asyncio.shield(self._running)
+
+    async def _refresh(self) -> schemas.ReadinessResponse:
+        try:
+            self._result = await self._check()
+            self._expires = time.monotonic() + self.settings.cache_ttl
+            return self._result
+        finally:
+            self._running = None
+
+
+def pool_check(stats: dict) -> schemas.ReadinessCheck:
+    """Degraded while every pooled connection is in use.
+
+    A busy pool is backpressure, not a fault: requests still complete, only
+    later. Reporting it as unavailable would take the instance out of rotation
+    exactly when it is loaded, so it never fails readiness on its own.
+    """
+    if stats["size"] < stats["max_size"] or stats["idle"] > 0:
+        return schemas.ReadinessCheck(status=OK)
+    if stats["waiting"] > 0:
+        return schemas.ReadinessCheck(
+            status=DEGRADED, detail=f"Connection-Pool ausgeschöpft, {stats['waiting']} Anfragen warten"
+        )
+    return schemas.ReadinessCheck(status=DEGRADED, detail="Alle Verbindungen des Pools sind belegt")
+
+
+async def database_check(read_version: Callable[[], Awaitable[int]]) -> tuple[schemas.ReadinessCheck, int | None]:
+    """``read_version`` must borrow its connection with ``timeout=0``; a busy pool only degrades."""
+    try:
+        version = await read_version()
+    except PoolTimeout:
+        return schemas.ReadinessCheck(status=DEGRADED, detail="Nicht geprüft: keine freie Verbindung"), None
+    except Exception as exc:
+        return schemas.ReadinessCheck(status=UNAVAILABLE, detail=f"Datenbank nicht erreichbar: {exc}"), None
+    if version < LATEST_SCHEMA_VERSION:
+        detail = f"Schema-Version {version}, erwartet {LATEST_SCHEMA_VERSION} (Bootstrap-Kommando ausführen)"
+        return schemas.ReadinessCheck(status=UNAVAILABLE, detail=detail), version
+    return schemas.ReadinessCheck(status=OK), version
+
+
+def circuit_check(downstream: Downstream) -> schemas.ReadinessCheck:
+    """Reports whether the downstream's circuit rejects calls.
+
+    Listed under ``downstreams`` only and never part of the verdict: an open
+    circuit affects every replica alike, and order placement sheds on its own.
+    """
+    retry_after = downstream.retry_after()
+    if retry_after is None:
+        return schemas.ReadinessCheck(status=OK)
+    return schemas.ReadinessCheck(status=DEGRADED, detail=f"Circuit offen, nächster Versuch in {retry_after:.1f}s")
+
+
+def readiness_response(
+    checks: dict[str, schemas.ReadinessCheck],
+    schema_version: int | None,
+    downstreams: dict[str, schemas.ReadinessCheck] | None = None,
+) -> schemas.ReadinessResponse:
+    statuses = {check.status for check in checks.values()}
+    if UNAVAILABLE in statuses:
+        status = "unavailable"
+    elif DEGRADED in statuses:
+        status = "degraded"
+    else:
+        status = "ready"
+    return schemas.ReadinessResponse(
+        status=status,
+        checks=checks,
+        downstreams=downstreams or {},
+        schema_version=schema_version,
+        expected_schema_version=LATEST_SCHEMA_VERSION,
+        checked_at=datetime.now(timezone.utc).isoformat(),
+    )
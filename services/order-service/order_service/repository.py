@@ -1,12 +1,26 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import functools
 import json
-from contextlib import contextmanager
+import os
+import sqlite3
+import uuid
+from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterator, Optional, Sequence
 
-from .database import get_connection
+import psycopg
+from mifos_db.idempotency import IdempotencyRecord
+from mifos_db.sql import DIALECTS as _DIALECTS
+from mifos_db.sql import dialect as _dialect
+from mifos_db.sql import id_list as _id_list
+from mifos_db.sql import sql as _sql
+
+from .database import AsyncConnectionPool, AsyncSQLiteConnection, ConnectionPool, get_pool
+from .metrics import instrument_queries
 
 
 @dataclass(frozen=True)
@@ -23,14 +37,349 @@ class OrderRecord:
     updated_at: str
 
 
+_ORDER_COLUMNS = """
+    id, restaurant_id, status, total_amount, items_json,
+    payment_reference, failure_reason, customer_reference,
+    created_at, updated_at
+"""
+
+_INSERT_ORDER_SQL = """
+INSERT INTO orders (
+    id, customer_reference, restaurant_id, status, total_amount,
+    items_json, payment_reference, failure_reason, created_at, updated_at
+) VALUES ({p}, {p}, {p}, {p}, {p},
+          {p}, {p}, {p}, {p}, {p});
+"""
+
+_UPDATE_ORDER_SQL = """
+UPDATE orders
+SET status = {p},
+    total_amount = COALESCE({p}, total_amount),
+    items_json = COALESCE({p}, items_json),
+    payment_reference = COALESCE({p}, payment_reference),
+    failure_reason = {p},
+    updated_at = {p}
+WHERE id = {p}
+"""
+
+# Saga transitions read the new state back in the same round trip.
+_UPDATE_ORDER_RETURNING_SQL = _UPDATE_ORDER_SQL + f"RETURNING {_ORDER_COLUMNS};"
+
+# The saga only moves orders that are still PENDING: a cancel that got in first
+# wins, and the saga sees no row instead of overwriting it.
+_ADVANCE_ORDER_SQL = _UPDATE_ORDER_SQL + "  AND status = 'PENDING'\n"
+_ADVANCE_ORDER_RETURNING_SQL = _ADVANCE_ORDER_SQL + f"RETURNING {_ORDER_COLUMNS};"
+
+_INSERT_ORDERS_SQL = """
+INSERT INTO orders (
+    id, customer_reference, restaurant_id, status, total_amount,
+    items_json, payment_reference, failure_reason, created_at, updated_at
+) VALUES {rows}
+ON CONFLICT (id) DO NOTHING
+RETURNING id;
+"""
+
+_INSERT_ORDER_ROW = "({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})"
+
+_SELECT_ORDER_SQL = f"""
+SELECT {_ORDER_COLUMNS}
+FROM orders
+WHERE id = {{p}};
+"""
+
+_SELECT_ORDERS_BY_ID_SQL = f"""
+SELECT {_ORDER_COLUMNS}
+FROM orders
+WHERE id {{in_ids}};
+"""
+
+_DELETE_OUTBOX_SQL = "DELETE FROM order_outbox WHERE id {in_ids};"
+
+_INSERT_JOB_SQL = """
+INSERT INTO order_jobs (
+    order_id, payload_json, status, attempts, available_at, created_at, updated_at
+) VALUES ({p}, {p}, 'QUEUED', 0, {p}, {p}, {p});
+"""
+
+# Picks the oldest ready job, or one whose worker lease ran out. Postgres adds
+# FOR UPDATE SKIP LOCKED so concurrent workers never wait on each other;
+# SQLite serialises writers, which makes the UPDATE atomic on its own.
+_CLAIM_JOB_SQL = """
+UPDATE order_jobs
+SET status = 'RUNNING',
+    attempts = attempts + 1,
+    locked_until = {p},
+    updated_at = {p}
+WHERE order_id = (
+    SELECT order_id
+    FROM order_jobs
+    WHERE (status = 'QUEUED' AND available_at <= {p})
+       OR (status = 'RUNNING' AND locked_until <= {p})
+    ORDER BY available_at
+    LIMIT 1
+    {lock}
+)
+RETURNING order_id, payload_json, attempts;
+"""
+
+_RETRY_JOB_SQL = """
+UPDATE order_jobs
+SET status = 'QUEUED', available_at = {p}, locked_until = NULL, last_error = {p}, updated_at = {p}
+WHERE order_id = {p};
+"""
+
+_FAIL_JOB_SQL = """
+UPDATE order_jobs
+SET status = 'FAILED', locked_until = NULL, last_error = {p}, updated_at = {p}
+WHERE order_id = {p};
+"""
+
+_DELETE_JOB_SQL = "DELETE FROM order_jobs WHERE order_id = {p};"
+
+_INSERT_OUTBOX_SQL = """
+INSERT INTO order_outbox (
+    id, order_id, kind, payload_json, status, attempts, available_at, created_at, updated_at
+) VALUES ({p}, {p}, {p}, {p}, 'PENDING', 0, {p}, {p}, {p});
+"""
+
+_CLAIM_OUTBOX_SQL = """
+UPDATE order_outbox
+SET attempts = attempts + 1,
+    locked_until = {p},
+    updated_at = {p}
+WHERE id IN (
+    SELECT id
+    FROM order_outbox
+    WHERE status = 'PENDING'
+      AND available_at <= {p}
+      AND (locked_until IS NULL OR locked_until <= {p})
+    ORDER BY available_at
+    LIMIT {p}
+    {lock}
+)
+RETURNING id, order_id, kind, payload_json, attempts;
+"""
+
+_RETRY_OUTBOX_SQL = """
+UPDATE order_outbox
+SET available_at = {p}, locked_until = NULL, last_error = {p}, updated_at = {p}
+WHERE id = {p};
+"""
+
+_FAIL_OUTBOX_SQL = """
+UPDATE order_outbox
+SET status = 'FAILED', locked_until = NULL, last_error = {p}, updated_at = {p}
+WHERE id = {p};
+"""
+
+# A key is claimed by inserting it, or by taking over a row whose claim or stored
+# response has expired; RETURNING tells the caller whether the claim went through.
+_CLAIM_IDEMPOTENCY_KEY_SQL = """
+INSERT INTO idempotency_keys (idempotency_key, fingerprint, owner, expires_at)
+VALUES ({p}, {p}, {p}, {p})
+ON CONFLICT (idempotency_key) DO UPDATE SET
+    fingerprint = excluded.fingerprint,
+    owner = excluded.owner,
+    status_code = NULL,
+    body = NULL,
+    headers_json = NULL,
+    media_type = NULL,
+    expires_at = excluded.expires_at
+WHERE idempotency_keys.expires_at <= {p}
+RETURNING idempotency_key;
+"""
+
+_SELECT_IDEMPOTENCY_KEY_SQL = """
+SELECT fingerprint, status_code, body, headers_json, media_type, expires_at
+FROM idempotency_keys
+WHERE idempotency_key = {p};
+"""
+
+_STORE_IDEMPOTENT_RESPONSE_SQL = """
+UPDATE idempotency_keys
+SET status_code = {p}, body = {p}, headers_json = {p}, media_type = {p}, expires_at = {p}
+WHERE idempotency_key = {p} AND owner = {p};
+"""
+
+_RELEASE_IDEMPOTENCY_KEY_SQL = """
+DELETE FROM idempotency_keys
+WHERE idempotency_key = {p} AND owner = {p} AND status_code IS NULL;
+"""
+
+_PURGE_IDEMPOTENCY_KEYS_SQL = "DELETE FROM idempotency_keys WHERE expires_at <= {p};"
+
+MAX_PAGE_SIZE = int(os.environ.get("ORDERS_MAX_PAGE_SIZE", "200"))
+EXPORT_BATCH_SIZE = int(os.environ.get("ORDERS_EXPORT_BATCH_SIZE", "500"))
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class OrderExistsError(Exception):
+    """Raised when an order id is inserted a second time."""
+
+
+@dataclass(frozen=True)
+class OrderUpdate:
+    """One row of a batched :meth:`OrderRepository.update_orders` call."""
+
+    order_id: str
+    status: str
+    total_amount: Optional[float] = None
+    items: Optional[list] = None
+    payment_reference: Optional[str] = None
+    failure_reason: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class OrderJob:
+    """A queued saga run claimed by a worker."""
+
+    order_id: str
+    payload: dict
+    attempts: int
+
+
+RESTAURANT_CANCEL = "restaurant.cancel"
+PAYMENT_REFUND = "payment.refund"
+# Refund whatever the payment service captured for the order; for captures without an answer.
+PAYMENT_REFUND_ORDER = "payment.refund_order"
+
+
+@dataclass(frozen=True)
+class Compensation:
+    """Side effect stored in ``order_outbox`` together with the status change that needs it."""
+
+    order_id: str
+    kind: str
+    payload: dict
+    # Seconds before the first delivery attempt.
+    delay: float = 0.0
+
+    @classmethod
+    def cancel_restaurant(cls, order_id: str, restaurant_id: str, reason: str | None) -> "Compensation":
+        return cls(order_id, RESTAURANT_CANCEL, {"restaurant_id": restaurant_id, "reason": reason})
+
+    @classmethod
+    def refund_payment(cls, order_id: str, reference: str, amount: float) -> "Compensation":
+        return cls(order_id, PAYMENT_REFUND, {"reference": reference, "amount": amount})
+
+    @classmethod
+    def refund_order_payments(cls, order_id: str, delay: float) -> "Compensation":
+        return cls(order_id, PAYMENT_REFUND_ORDER, {}, delay)
+
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    id: str
+    order_id: str
+    kind: str
+    payload: dict
+    attempts: int
+
+
+@dataclass(frozen=True)
+class OrderFilter:
+    status: Optional[str] = None
+    restaurant_id: Optional[str] = None
+    customer_reference: Optional[str] = None
+    updated_from: Optional[str] = None
+    updated_to: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class OrderPage:
+    records: list[OrderRecord]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(record: OrderRecord) -> str:
+    raw = json.dumps([record.updated_at, record.id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        updated_at, order_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursorError("Ungültiger Cursor.") from exc
+    if not isinstance(updated_at, str) or not isinstance(order_id, str):
+        raise InvalidCursorError("Ungültiger Cursor.")
+    return updated_at, order_id
+
+
+def _list_orders_query(
+    conn,
+    limit: int | None,
+    filters: OrderFilter | None,
+    after: tuple[str, str] | None,
+) -> tuple[str, list]:
+    """Keyset query over ``(updated_at, id)``; deep pages cost the same as the first."""
+    conditions: list[str] = []
+    params: list = []
+    if filters is not None:
+        for condition, value in (
+            ("status = {p}", filters.status),
+            ("restaurant_id = {p}", filters.restaurant_id),
+            ("customer_reference = {p}", filters.customer_reference),
+            ("updated_at >= {p}", filters.updated_from),
+            ("updated_at < {p}", filters.updated_to),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+    if after is not None:
+        conditions.append("(updated_at, id) < ({p}, {p})")
+        params.extend(after)
+    if limit is not None:
+        params.append(limit)
+    return _list_orders_sql(_dialect(conn), tuple(conditions), limit is not None), params
+
+
+@functools.lru_cache(maxsize=None)
+def _list_orders_sql(dialect: str, conditions: tuple[str, ...], limited: bool) -> str:
+    """One statement per filter combination and dialect; there are only a few dozen."""
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    limit_clause = "LIMIT {p}" if limited else ""
+    template = f"""
+    SELECT {_ORDER_COLUMNS}
+    FROM orders
+    {where}
+    ORDER BY updated_at DESC, id DESC
+    {limit_clause};
+    """
+    return template.format(**_DIALECTS[dialect])
+
+
+def _clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _to_page(records: list[OrderRecord], limit: int) -> OrderPage:
+    if len(records) > limit:
+        records = records[:limit]
+        return OrderPage(records=records, next_cursor=encode_cursor(records[-1]))
+    return OrderPage(records=records, next_cursor=None)
+
+
+@instrument_queries
 class OrderRepository:
     """Data-access layer for persisting saga state."""
 
-    def __init__(self, connection_factory=get_connection):
+    def __init__(self, connection_factory=None, pool: ConnectionPool | None = None):
+        if connection_factory is None and pool is None:
+            pool = get_pool()
         self._connection_factory = connection_factory
+        self._pool = pool
 
     @contextmanager
     def _connection(self):
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
         conn = self._connection_factory()
         try:
             yield conn
@@ -38,44 +387,56 @@ class OrderRepository:
             conn.close()
 
     def create_order(self, order_id: str, restaurant_id: str, customer_reference: str | None) -> OrderRecord:
-        now = datetime.now(timezone.utc).isoformat()
-        payload = (
-            order_id,
-            customer_reference,
-            restaurant_id,
-            "PENDING",
-            None,
-            None,
-            None,
-            None,
-            now,
-            now,
-        )
+        record = _pending_record(order_id, restaurant_id, customer_reference)
+        with self._connection() as conn, _rejecting_duplicates():
+            conn.execute(_sql(conn, _INSERT_ORDER_SQL), _insert_params(record))
+            conn.commit()
+        return record
+
+    def create_orders(self, orders: Sequence[tuple[str, str, str | None]]) -> list[OrderRecord]:
+        """Insert ``(order_id, restaurant_id, customer_reference)`` rows as PENDING in one statement.
+
+        Ids that already exist are skipped, not overwritten; only the inserted records are returned.
+        """
+        records = [_pending_record(*order) for order in orders]
+        if not records:
+            return records
         with self._connection() as conn:
-            placeholder = _placeholder(conn)
-            conn.execute(
-                f"""
-                INSERT INTO orders (
-                    id, customer_reference, restaurant_id, status, total_amount,
-                    items_json, payment_reference, failure_reason, created_at, updated_at
-                ) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder},
-                          {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder});
-                """,
-                payload,
-            )
+            rows = conn.execute(*_insert_many(conn, records)).fetchall()
+            conn.commit()
+        return _inserted(records, rows)
+
+    def enqueue_order(
+        self, order_id: str, restaurant_id: str, customer_reference: str | None, payload: dict
+    ) -> OrderRecord:
+        """Store the PENDING order and its saga job atomically."""
+        record = _pending_record(order_id, restaurant_id, customer_reference)
+        with self._connection() as conn, _rejecting_duplicates():
+            with _transaction(conn):
+                conn.execute(_sql(conn, _INSERT_ORDER_SQL), _insert_params(record))
+                conn.execute(_sql(conn, _INSERT_JOB_SQL), _job_params(record, payload))
+        return record
+
+    def claim_job(self, lease_seconds: float) -> OrderJob | None:
+        with self._connection() as conn:
+            row = conn.execute(*_claim_job_query(conn, lease_seconds)).fetchone()
+            conn.commit()
+        return _row_to_job(row) if row is not None else None
+
+    def complete_job(self, order_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _DELETE_JOB_SQL), (order_id,))
+            conn.commit()
+
+    def retry_job(self, order_id: str, error: str, delay_seconds: float) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _RETRY_JOB_SQL), _retry_params(order_id, error, delay_seconds))
+            conn.commit()
+
+    def fail_job(self, order_id: str, error: str) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _FAIL_JOB_SQL), (error, _now(), order_id))
             conn.commit()
-        return OrderRecord(
-            id=order_id,
-            restaurant_id=restaurant_id,
-            status="PENDING",
-            total_amount=None,
-            items=None,
-            payment_reference=None,
-            failure_reason=None,
-            customer_reference=customer_reference,
-            created_at=now,
-            updated_at=now,
-        )
 
     def update_order(
         self,
@@ -86,96 +447,707 @@ class OrderRepository:
         items: list | None = None,
         payment_reference: str | None = None,
         failure_reason: str | None = None,
+        compensations: Sequence[Compensation] = (),
+        only_pending: bool = False,
+    ) -> OrderRecord | None:
+        """Write a status transition and return the stored row without a second query.
+
+        ``compensations`` are queued in the outbox within the same transaction.
+        With ``only_pending`` an order that already left PENDING is left alone
+        and ``None`` is returned; its compensations are not queued either.
+        """
+        params = _update_params(order_id, status, total_amount, items, payment_reference, failure_reason)
+        statement = _ADVANCE_ORDER_RETURNING_SQL if only_pending else _UPDATE_ORDER_RETURNING_SQL
+        with self._connection() as conn:
+            with _transaction(conn):
+                row = conn.execute(_sql(conn, statement), params).fetchone()
+                if compensations and row is not None:
+                    _executemany(conn, _sql(conn, _INSERT_OUTBOX_SQL), _outbox_params(compensations))
+        return _row_to_record(row) if row is not None else None
+
+    def update_orders(
+        self, updates: Sequence[OrderUpdate], compensations: Sequence[Compensation] = ()
     ) -> None:
-        now = datetime.now(timezone.utc).isoformat()
-        items_json = json.dumps(items) if items is not None else None
+        """Apply saga updates to the orders still PENDING with one ``executemany`` in a single transaction."""
+        if not updates:
+            return
         with self._connection() as conn:
-            placeholder = _placeholder(conn)
-            conn.execute(
-                f"""
-                UPDATE orders
-                SET status = {placeholder},
-                    total_amount = COALESCE({placeholder}, total_amount),
-                    items_json = COALESCE({placeholder}, items_json),
-                    payment_reference = COALESCE({placeholder}, payment_reference),
-                    failure_reason = {placeholder},
-                    updated_at = {placeholder}
-                WHERE id = {placeholder};
-                """,
-                (
-                    status,
-                    total_amount,
-                    items_json,
-                    payment_reference,
-                    failure_reason,
-                    now,
-                    order_id,
-                ),
-            )
+            with _transaction(conn):
+                _executemany(
+                    conn,
+                    _sql(conn, _ADVANCE_ORDER_SQL),
+                    [_batch_update_params(update) for update in updates],
+                )
+                if compensations:
+                    _executemany(conn, _sql(conn, _INSERT_OUTBOX_SQL), _outbox_params(compensations))
+
+    def enqueue_compensations(self, compensations: Sequence[Compensation]) -> None:
+        """Queue compensations without a status change, e.g. for a saga run a cancel overtook."""
+        if not compensations:
+            return
+        with self._connection() as conn:
+            with _transaction(conn):
+                _executemany(conn, _sql(conn, _INSERT_OUTBOX_SQL), _outbox_params(compensations))
+
+    def claim_outbox(self, limit: int, lease_seconds: float) -> list[OutboxMessage]:
+        with self._connection() as conn:
+            rows = conn.execute(*_claim_outbox_query(conn, limit, lease_seconds)).fetchall()
+            conn.commit()
+        return [_row_to_outbox(row) for row in rows]
+
+    def complete_outbox(self, message_ids: Sequence[str]) -> None:
+        if not message_ids:
+            return
+        with self._connection() as conn:
+            conn.execute(*_delete_outbox_query(conn, message_ids))
+            conn.commit()
+
+    def retry_outbox(self, retries: Sequence[tuple[str, str, float]]) -> None:
+        """Reschedule ``(message_id, error, delay_seconds)`` entries."""
+        if not retries:
+            return
+        with self._connection() as conn:
+            with _transaction(conn):
+                _executemany(conn, _sql(conn, _RETRY_OUTBOX_SQL), _outbox_retry_params(retries))
+
+    def fail_outbox(self, message_id: str, error: str) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _FAIL_OUTBOX_SQL), (error, _now(), message_id))
             conn.commit()
 
     def get_order(self, order_id: str) -> OrderRecord | None:
         with self._connection() as conn:
-            placeholder = _placeholder(conn)
             row = conn.execute(
-                f"""
-                SELECT id, restaurant_id, status, total_amount, items_json,
-                       payment_reference, failure_reason, customer_reference,
-                       created_at, updated_at
-                FROM orders
-                WHERE id = {placeholder};
-                """,
-                (order_id,),
+                _sql(conn, _SELECT_ORDER_SQL), (order_id,)
             ).fetchone()
-            if row is None:
-                return None
-            return OrderRecord(
-                id=row["id"],
-                restaurant_id=row["restaurant_id"],
-                status=row["status"],
-                total_amount=row["total_amount"],
-                items=json.loads(row["items_json"]) if row["items_json"] else None,
-                payment_reference=row["payment_reference"],
-                failure_reason=row["failure_reason"],
-                customer_reference=row["customer_reference"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
+        return _row_to_record(row) if row is not None else None
+
+    def get_orders(self, order_ids: Sequence[str]) -> dict[str, OrderRecord]:
+        if not order_ids:
+            return {}
+        with self._connection() as conn:
+            rows = conn.execute(*_select_by_ids(conn, order_ids)).fetchall()
+        return {row["id"]: _row_to_record(row) for row in rows}
+
+    def list_orders(
+        self,
+        limit: int = 50,
+        *,
+        filters: OrderFilter | None = None,
+        after: tuple[str, str] | None = None,
+    ) -> list[OrderRecord]:
+        return self._select_orders(_clamp_page_size(limit), filters, after)
+
+    def list_orders_page(
+        self, limit: int = 50, *, filters: OrderFilter | None = None, cursor: str | None = None
+    ) -> OrderPage:
+        limit = _clamp_page_size(limit)
+        after = decode_cursor(cursor) if cursor else None
+        # One extra row tells whether another page exists.
+        return _to_page(self._select_orders(limit + 1, filters, after), limit)
+
+    def iter_orders(
+        self, filters: OrderFilter | None = None, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[OrderRecord]:
+        """Stream all matching orders; Postgres uses a server-side cursor, memory stays flat."""
+        with self._connection() as conn:
+            sql, params = _list_orders_query(conn, None, filters, None)
+            if isinstance(conn, sqlite3.Connection):
+                cursor = conn.execute(sql, params)
+                while rows := cursor.fetchmany(batch_size):
+                    for row in rows:
+                        yield _row_to_record(row)
+                return
+            with conn.transaction():
+                with conn.cursor(name="orders_export") as cursor:
+                    cursor.itersize = batch_size
+                    cursor.execute(sql, params)
+                    for row in cursor:
+                        yield _row_to_record(row)
+
+    def _select_orders(
+        self, limit: int, filters: OrderFilter | None, after: tuple[str, str] | None
+    ) -> list[OrderRecord]:
+        with self._connection() as conn:
+            sql, params = _list_orders_query(conn, limit, filters, after)
+            rows = conn.execute(sql, params).fetchall()
+        return [_row_to_record(row) for row in rows]
+
+
+@instrument_queries
+class AsyncOrderRepository:
+    """asyncio variant of :class:`OrderRepository` backed by an :class:`AsyncConnectionPool`."""
+
+    def __init__(self, pool: AsyncConnectionPool):
+        self._pool = pool
+
+    @asynccontextmanager
+    async def _connection(self):
+        async with self._pool.connection() as conn:
+            yield conn
+
+    async def create_order(
+        self, order_id: str, restaurant_id: str, customer_reference: str | None
+    ) -> OrderRecord:
+        record = _pending_record(order_id, restaurant_id, customer_reference)
+        async with self._connection() as conn:
+            with _rejecting_duplicates():
+                await conn.execute(_sql(conn, _INSERT_ORDER_SQL), _insert_params(record))
+            await conn.commit()
+        return record
+
+    async def create_orders(self, orders: Sequence[tuple[str, str, str | None]]) -> list[OrderRecord]:
+        records = [_pending_record(*order) for order in orders]
+        if not records:
+            return records
+        async with self._connection() as conn:
+            cursor = await conn.execute(*_insert_many(conn, records))
+            rows = await cursor.fetchall()
+            await conn.commit()
+        return _inserted(records, rows)
+
+    async def enqueue_order(
+        self, order_id: str, restaurant_id: str, customer_reference: str | None, payload: dict
+    ) -> OrderRecord:
+        record = _pending_record(order_id, restaurant_id, customer_reference)
+        async with self._connection() as conn:
+            with _rejecting_duplicates():
+                async with _async_transaction(conn):
+                    await conn.execute(_sql(conn, _INSERT_ORDER_SQL), _insert_params(record))
+                    await conn.execute(_sql(conn, _INSERT_JOB_SQL), _job_params(record, payload))
+        return record
+
+    async def claim_job(self, lease_seconds: float) -> OrderJob | None:
+        async with self._connection() as conn:
+            cursor = await conn.execute(*_claim_job_query(conn, lease_seconds))
+            row = await cursor.fetchone()
+            await conn.commit()
+        return _row_to_job(row) if row is not None else None
+
+    async def complete_job(self, order_id: str) -> None:
+        async with self._connection() as conn:
+            await conn.execute(_sql(conn, _DELETE_JOB_SQL), (order_id,))
+            await conn.commit()
+
+    async def retry_job(self, order_id: str, error: str, delay_seconds: float) -> None:
+        async with self._connection() as conn:
+            await conn.execute(
+                _sql(conn, _RETRY_JOB_SQL), _retry_params(order_id, error, delay_seconds)
             )
+            await conn.commit()
+
+    async def fail_job(self, order_id: str, error: str) -> None:
+        async with self._connection() as conn:
+            await conn.execute(_sql(conn, _FAIL_JOB_SQL), (error, _now(), order_id))
+            await conn.commit()
+
+    async def update_order(
+        self,
+        order_id: str,
+        *,
+        status: str,
+        total_amount: float | None = None,
+        items: list | None = None,
+        payment_reference: str | None = None,
+        failure_reason: str | None = None,
+        compensations: Sequence[Compensation] = (),
+        only_pending: bool = False,
+    ) -> OrderRecord | None:
+        params = _update_params(order_id, status, total_amount, items, payment_reference, failure_reason)
+        statement = _ADVANCE_ORDER_RETURNING_SQL if only_pending else _UPDATE_ORDER_RETURNING_SQL
+        async with self._connection() as conn:
+            async with _async_transaction(conn):
+                cursor = await conn.execute(_sql(conn, statement), params)
+                row = await cursor.fetchone()
+                if compensations and row is not None:
+                    await _executemany_async(
+                        conn, _sql(conn, _INSERT_OUTBOX_SQL), _outbox_params(compensations)
+                    )
+        return _row_to_record(row) if row is not None else None
+
+    async def update_orders(
+        self, updates: Sequence[OrderUpdate], compensations: Sequence[Compensation] = ()
+    ) -> None:
+        if not updates:
+            return
+        async with self._connection() as conn:
+            async with _async_transaction(conn):
+                await _executemany_async(
+                    conn,
+                    _sql(conn, _ADVANCE_ORDER_SQL),
+                    [_batch_update_params(update) for update in updates],
+                )
+                if compensations:
+                    await _executemany_async(
+                        conn, _sql(conn, _INSERT_OUTBOX_SQL), _outbox_params(compensations)
+                    )
 
-    def list_orders(self, limit: int = 50) -> list[OrderRecord]:
-        with self._connection() as conn:
-            placeholder = _placeholder(conn)
-            rows = conn.execute(
-                f"""
-                SELECT id, restaurant_id, status, total_amount, items_json,
-                       payment_reference, failure_reason, customer_reference,
-                       created_at, updated_at
-                FROM orders
-                ORDER BY updated_at DESC
-                LIMIT {placeholder};
-                """,
-                (limit,),
-            ).fetchall()
-
-        results: list[OrderRecord] = []
-        for row in rows:
-            results.append(
-                OrderRecord(
-                    id=row["id"],
-                    restaurant_id=row["restaurant_id"],
-                    status=row["status"],
-                    total_amount=row["total_amount"],
-                    items=json.loads(row["items_json"]) if row["items_json"] else None,
-                    payment_reference=row["payment_reference"],
-                    failure_reason=row["failure_reason"],
-                    customer_reference=row["customer_reference"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
+    async def enqueue_compensations(self, compensations: Sequence[Compensation]) -> None:
+        if not compensations:
+            return
+        async with self._connection() as conn:
+            async with _async_transaction(conn):
+                await _executemany_async(conn, _sql(conn, _INSERT_OUTBOX_SQL), _outbox_params(compensations))
+
+    async def claim_outbox(self, limit: int, lease_seconds: float) -> list[OutboxMessage]:
+        async with self._connection() as conn:
+            cursor = await conn.execute(*_claim_outbox_query(conn, limit, lease_seconds))
+            rows = await cursor.fetchall()
+            await conn.commit()
+        return [_row_to_outbox(row) for row in rows]
+
+    async def complete_outbox(self, message_ids: Sequence[str]) -> None:
+        if not message_ids:
+            return
+        async with self._connection() as conn:
+            await conn.execute(*_delete_outbox_query(conn, message_ids))
+            await conn.commit()
+
+    async def retry_outbox(self, retries: Sequence[tuple[str, str, float]]) -> None:
+        if not retries:
+            return
+        async with self._connection() as conn:
+            async with _async_transaction(conn):
+                await _executemany_async(
+                    conn, _sql(conn, _RETRY_OUTBOX_SQL), _outbox_retry_params(retries)
                 )
+
+    async def fail_outbox(self, message_id: str, error: str) -> None:
+        async with self._connection() as conn:
+            await conn.execute(_sql(conn, _FAIL_OUTBOX_SQL), (error, _now(), message_id))
+            await conn.commit()
+
+    async def get_order(self, order_id: str) -> OrderRecord | None:
+        async with self._connection() as conn:
+            cursor = await conn.execute(_sql(conn, _SELECT_ORDER_SQL), (order_id,))
+            row = await cursor.fetchone()
+        return _row_to_record(row) if row is not None else None
+
+    async def get_orders(self, order_ids: Sequence[str]) -> dict[str, OrderRecord]:
+        if not order_ids:
+            return {}
+        async with self._connection() as conn:
+            cursor = await conn.execute(*_select_by_ids(conn, order_ids))
+            rows = await cursor.fetchall()
+        return {row["id"]: _row_to_record(row) for row in rows}
+
+    async def list_orders(
+        self,
+        limit: int = 50,
+        *,
+        filters: OrderFilter | None = None,
+        after: tuple[str, str] | None = None,
+    ) -> list[OrderRecord]:
+        return await self._select_orders(_clamp_page_size(limit), filters, after)
+
+    async def list_orders_page(
+        self, limit: int = 50, *, filters: OrderFilter | None = None, cursor: str | None = None
+    ) -> OrderPage:
+        limit = _clamp_page_size(limit)
+        after = decode_cursor(cursor) if cursor else None
+        return _to_page(await self._select_orders(limit + 1, filters, after), limit)
+
+    async def iter_orders(
+        self, filters: OrderFilter | None = None, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[OrderRecord]:
+        async with self._connection() as conn:
+            sql, params = _list_orders_query(conn, None, filters, None)
+            if isinstance(conn, AsyncSQLiteConnection):
+                cursor = await conn.execute(sql, params)
+                while rows := await cursor.fetchmany(batch_size):
+                    for row in rows:
+                        yield _row_to_record(row)
+                return
+            async with conn.transaction():
+                async with conn.cursor(name="orders_export") as cursor:
+                    cursor.itersize = batch_size
+                    await cursor.execute(sql, params)
+                    async for row in cursor:
+                        yield _row_to_record(row)
+
+    async def _select_orders(
+        self, limit: int, filters: OrderFilter | None, after: tuple[str, str] | None
+    ) -> list[OrderRecord]:
+        async with self._connection() as conn:
+            sql, params = _list_orders_query(conn, limit, filters, after)
+            cursor = await conn.execute(sql, params)
+            rows = await cursor.fetchall()
+        return [_row_to_record(row) for row in rows]
+
+
+@instrument_queries
+class IdempotencyRepository:
+    """``Idempotency-Key`` claims and stored responses in ``idempotency_keys``.
+
+    Timestamps are passed in as epoch seconds so the store decides what "now" is.
+    """
+
+    def __init__(self, connection_factory=None, pool: ConnectionPool | None = None):
+        if connection_factory is None and pool is None:
+            pool = get_pool()
+        self._connection_factory = connection_factory
+        self._pool = pool
+
+    @contextmanager
+    def _connection(self):
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
+        conn = self._connection_factory()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def claim_key(self, key: str, fingerprint: str, owner: str, claim_until: float, now: float) -> bool:
+        with self._connection() as conn:
+            row = conn.execute(
+                _sql(conn, _CLAIM_IDEMPOTENCY_KEY_SQL), (key, fingerprint, owner, _timestamp(claim_until), _timestamp(now))
+            ).fetchone()
+            conn.commit()
+        return row is not None
+
+    def get_key(self, key: str) -> IdempotencyRecord | None:
+        with self._connection() as conn:
+            row = conn.execute(_sql(conn, _SELECT_IDEMPOTENCY_KEY_SQL), (key,)).fetchone()
+        return _row_to_idempotency(row) if row is not None else None
+
+    def store_response(
+        self,
+        key: str,
+        owner: str,
+        status_code: int,
+        body: bytes,
+        headers: Sequence[tuple[str, str]],
+        media_type: str | None,
+        expires_at: float,
+    ) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                _sql(conn, _STORE_IDEMPOTENT_RESPONSE_SQL),
+                _response_params(key, owner, status_code, body, headers, media_type, expires_at),
             )
-        return results
+            conn.commit()
+
+    def release_key(self, key: str, owner: str) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _RELEASE_IDEMPOTENCY_KEY_SQL), (key, owner))
+            conn.commit()
+
+    def purge_expired(self, now: float) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _PURGE_IDEMPOTENCY_KEYS_SQL), (_timestamp(now),))
+            conn.commit()
+
+
+@instrument_queries
+class AsyncIdempotencyRepository:
+    """asyncio variant of :class:`IdempotencyRepository` backed by an :class:`AsyncConnectionPool`."""
+
+    def __init__(self, pool: AsyncConnectionPool):
+        self._pool = pool
+
+    async def claim_key(self, key: str, fingerprint: str, owner: str, claim_until: float, now: float) -> bool:
+        async with self._pool.connection() as conn:
+            cursor = await conn.execute(
+                _sql(conn, _CLAIM_IDEMPOTENCY_KEY_SQL), (key, fingerprint, owner, _timestamp(claim_until), _timestamp(now))
+            )
+            row = await cursor.fetchone()
+            await conn.commit()
+        return row is not None
+
+    async def get_key(self, key: str) -> IdempotencyRecord | None:
+        async with self._pool.connection() as conn:
+            cursor = await conn.execute(_sql(conn, _SELECT_IDEMPOTENCY_KEY_SQL), (key,))
+            row = await cursor.fetchone()
+        return _row_to_idempotency(row) if row is not None else None
+
+    async def store_response(
+        self,
+        key: str,
+        owner: str,
+        status_code: int,
+        body: bytes,
+        headers: Sequence[tuple[str, str]],
+        media_type: str | None,
+        expires_at: float,
+    ) -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(
+                _sql(conn, _STORE_IDEMPOTENT_RESPONSE_SQL),
+                _response_params(key, owner, status_code, body, headers, media_type, expires_at),
+            )
+            await conn.commit()
+
+    async def release_key(self, key: str, owner: str) -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(_sql(conn, _RELEASE_IDEMPOTENCY_KEY_SQL), (key, owner))
+            await conn.commit()
+
+    async def purge_expired(self, now: float) -> None:
+        async with self._pool.connection() as conn:
+            await conn.execute(_sql(conn, _PURGE_IDEMPOTENCY_KEYS_SQL), (_timestamp(now),))
+            await conn.commit()
+
+
+def _pending_record(order_id: str, restaurant_id: str, customer_reference: str | None) -> OrderRecord:
+    now = datetime.now(timezone.utc).isoformat()
+    return OrderRecord(
+        id=order_id,
+        restaurant_id=restaurant_id,
+        status="PENDING",
+        total_amount=None,
+        items=None,
+        payment_reference=None,
+        failure_reason=None,
+        customer_reference=customer_reference,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def _insert_params(record: OrderRecord) -> tuple:
+    return (
+        record.id,
+        record.customer_reference,
+        record.restaurant_id,
+        record.status,
+        None,
+        None,
+        None,
+        None,
+        record.created_at,
+        record.updated_at,
+    )
+
+
+@contextmanager
+def _rejecting_duplicates():
+    """Turn a primary-key violation on insert into :class:`OrderExistsError`."""
+    try:
+        yield
+    except (sqlite3.IntegrityError, psycopg.errors.UniqueViolation) as exc:
+        raise OrderExistsError("Order existiert bereits") from exc
+
+
+@contextmanager
+def _transaction(conn):
+    """Group statements atomically on sqlite3 and on autocommit psycopg connections."""
+    if isinstance(conn, sqlite3.Connection):
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return
+    with conn.transaction():
+        yield
+
+
+@asynccontextmanager
+async def _async_transaction(conn):
+    if isinstance(conn, AsyncSQLiteConnection):
+        try:
+            yield
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+        return
+    async with conn.transaction():
+        yield
+
+
+def _executemany(conn, sql: str, params: list) -> None:
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(sql, params)
+    finally:
+        cursor.close()
+
+
+async def _executemany_async(conn, sql: str, params: list) -> None:
+    if isinstance(conn, AsyncSQLiteConnection):
+        await conn.executemany(sql, params)
+        return
+    async with conn.cursor() as cursor:
+        await cursor.executemany(sql, params)
+
+
+def _outbox_params(compensations: Sequence[Compensation]) -> list[tuple]:
+    now = datetime.now(timezone.utc)
+    created = now.isoformat()
+    return [
+        (
+            str(uuid.uuid4()),
+            item.order_id,
+            item.kind,
+            json.dumps(item.payload),
+            (now + timedelta(seconds=item.delay)).isoformat(),
+            created,
+            created,
+        )
+        for item in compensations
+    ]
+
+
+def _claim_outbox_query(conn, limit: int, lease_seconds: float) -> tuple[str, tuple]:
+    now = datetime.now(timezone.utc)
+    locked_until = (now + timedelta(seconds=lease_seconds)).isoformat()
+    return (
+        _sql(conn, _CLAIM_OUTBOX_SQL),
+        (locked_until, now.isoformat(), now.isoformat(), now.isoformat(), limit),
+    )
+
+
+def _delete_outbox_query(conn, message_ids: Sequence[str]) -> tuple[str, list]:
+    return _sql(conn, _DELETE_OUTBOX_SQL), [_id_list(conn, message_ids)]
+
+
+def _outbox_retry_params(retries: Sequence[tuple[str, str, float]]) -> list[tuple]:
+    now = datetime.now(timezone.utc)
+    return [
+        ((now + timedelta(seconds=delay)).isoformat(), error, now.isoformat(), message_id)
+        for message_id, error, delay in retries
+    ]
+
+
+def _row_to_outbox(row) -> OutboxMessage:
+    return OutboxMessage(
+        id=row["id"],
+        order_id=row["order_id"],
+        kind=row["kind"],
+        payload=json.loads(row["payload_json"]),
+        attempts=row["attempts"],
+    )
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+def _response_params(
+    key: str,
+    owner: str,
+    status_code: int,
+    body: bytes,
+    headers: Sequence[tuple[str, str]],
+    media_type: str | None,
+    expires_at: float,
+) -> tuple:
+    # Responses are JSON, so the body is kept as text in both dialects.
+    return (
+        status_code,
+        body.decode("utf-8"),
+        json.dumps([list(header) for header in headers]),
+        media_type,
+        _timestamp(expires_at),
+        key,
+        owner,
+    )
+
+
+def _row_to_idempotency(row) -> IdempotencyRecord:
+    return IdempotencyRecord(
+        fingerprint=row["fingerprint"],
+        status_code=row["status_code"],
+        body=(row["body"] or "").encode("utf-8"),
+        headers=tuple((name, value) for name, value in json.loads(row["headers_json"] or "[]")),
+        media_type=row["media_type"],
+        expires_at=datetime.fromisoformat(row["expires_at"]).timestamp(),
+    )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job_params(record: OrderRecord, payload: dict) -> tuple:
+    return (record.id, json.dumps(payload), record.created_at, record.created_at, record.created_at)
+
+
+def _claim_job_query(conn, lease_seconds: float) -> tuple[str, tuple]:
+    now = datetime.now(timezone.utc)
+    locked_until = (now + timedelta(seconds=lease_seconds)).isoformat()
+    return (
+        _sql(conn, _CLAIM_JOB_SQL),
+        (locked_until, now.isoformat(), now.isoformat(), now.isoformat()),
+    )
+
+
+def _retry_params(order_id: str, error: str, delay_seconds: float) -> tuple:
+    now = datetime.now(timezone.utc)
+    return ((now + timedelta(seconds=delay_seconds)).isoformat(), error, now.isoformat(), order_id)
+
+
+def _row_to_job(row) -> OrderJob:
+    return OrderJob(order_id=row["order_id"], payload=json.loads(row["payload_json"]), attempts=row["attempts"])
+
+
+def _inserted(records: Sequence[OrderRecord], rows) -> list[OrderRecord]:
+    ids = {row["id"] for row in rows}
+    return [record for record in records if record.id in ids]
+
+
+def _insert_many(conn, records: Sequence[OrderRecord]) -> tuple[str, list]:
+    params = [value for record in records for value in _insert_params(record)]
+    return _insert_orders_sql(_dialect(conn), len(records)), params
+
+
+@functools.lru_cache(maxsize=64)
+def _insert_orders_sql(dialect: str, count: int) -> str:
+    rows = ", ".join([_INSERT_ORDER_ROW] * count)
+    return _INSERT_ORDERS_SQL.format(rows=rows).format(**_DIALECTS[dialect])
+
+
+def _select_by_ids(conn, order_ids: Sequence[str]) -> tuple[str, list]:
+    return _sql(conn, _SELECT_ORDERS_BY_ID_SQL), [_id_list(conn, order_ids)]
+
+
+def _batch_update_params(update: OrderUpdate) -> tuple:
+    return _update_params(
+        update.order_id,
+        update.status,
+        update.total_amount,
+        update.items,
+        update.payment_reference,
+        update.failure_reason,
+    )
+
+
+def _update_params(
+    order_id: str,
+    status: str,
+    total_amount: float | None,
+    items: list | None,
+    payment_reference: str | None,
+    failure_reason: str | None,
+) -> tuple:
+    now = datetime.now(timezone.utc).isoformat()
+    items_json = json.dumps(items) if items is not None else None
+    return (
+        status,
+        total_amount,
+        items_json,
+        payment_reference,
+        failure_reason,
+        now,
+        order_id,
+    )
 
 
-def _placeholder(conn) -> str:
-    module = conn.__class__.__module__
-    return "%s" if "psycopg" in module else "?"
+def _row_to_record(row) -> OrderRecord:
+    return OrderRecord(
+        id=row["id"],
+        restaurant_id=row["restaurant_id"],
+        status=row["status"],
+        total_amount=row["total_amount"],
+        items=json.loads(row["items_json"]) if row["items_json"] else None,
+        payment_reference=row["payment_reference"],
+        failure_reason=row["failure_reason"],
+        customer_reference=row["customer_reference"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
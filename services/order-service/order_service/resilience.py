@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import httpx
+from mifos_observability.tracing import TRACER
+
+from .metrics import DOWNSTREAM_REQUEST_DURATION
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upper bounds in seconds; the last bucket catches everything slower.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+_RETRYABLE_STATUS = {502, 503, 504}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling a downstream whose circuit is open.
+
+    Subclasses ``httpx.TransportError`` so the clients report it like any other
+    unreachable downstream.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' ist offen, nächster Versuch in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class ResilienceSettings:
+    failure_threshold: int = 5
+    reset_timeout: float = 10.0
+    max_timeout: float = 5.0
+    connect_timeout: float = 2.0
+    min_timeout: float = 0.25
+    timeout_percentile: float = 0.99
+    timeout_multiplier: float = 3.0
+    min_samples: int = 20
+    window: int = 256
+    retries: int = 2
+    retry_backoff: float = 0.05
+
+    @classmethod
+    def from_env(cls) -> "ResilienceSettings":
+        return cls(
+            failure_threshold=int(os.environ.get("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.environ.get("CIRCUIT_BREAKER_RESET_TIMEOUT", "10")),
+            max_timeout=float(os.environ.get("HTTP_CLIENT_TIMEOUT", "5")),
+            connect_timeout=float(os.environ.get("HTTP_CLIENT_CONNECT_TIMEOUT", "2")),
+            min_timeout=float(os.environ.get("HTTP_ADAPTIVE_TIMEOUT_MIN", "0.25")),
+            timeout_percentile=float(os.environ.get("HTTP_ADAPTIVE_TIMEOUT_PERCENTILE", "0.99")),
+            timeout_multiplier=float(os.environ.get("HTTP_ADAPTIVE_TIMEOUT_MULTIPLIER", "3")),
+            retries=int(os.environ.get("HTTP_RETRY_ATTEMPTS", "2")),
+            retry_backoff=float(os.environ.get("HTTP_RETRY_BACKOFF", "0.05")),
+        )
+
+
+class Downstream:
+    """Circuit breaker, latency tracking and adaptive timeout for one downstream service.
+
+    Shared by every client of that service in the process (see
+    :meth:`HTTPClientRegistry.downstream`), so the sync and async paths trip the
+    same breaker. The timeout is ``multiplier × p<percentile>`` of recent
+    latencies, clamped to ``[min_timeout, max_timeout]``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        settings: ResilienceSettings | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.settings = settings or ResilienceSettings.from_env()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._samples: deque[float] = deque(maxlen=self.settings.window)
+        self._timeout = self.settings.max_timeout
+        self._bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self._latency_sum = 0.0
+        self._rejected = 0
+        self._retries = 0
+
+    def call(self, send: Callable[[httpx.Timeout], httpx.Response], idempotent: bool = False) -> httpx.Response:
+        attempt = 0
+        while True:
+            probe = self._admit()
+            started = self._clock()
+            try:
+                with TRACER.span(f"{self.name} call", kind="client", attempt=attempt) as span:
+                    response = send(self._timeouts())
+                    if span is not None:
+                        span.set_attribute("http.status_code", response.status_code)
+            except httpx.HTTPError as exc:
+                self._finish(probe, started, ok=False)
+                if not self._should_retry(idempotent, attempt, exc):
+                    raise
+            except BaseException:
+                self._release(probe)
+                raise
+            else:
+                ok = response.status_code < 500
+                self._finish(probe, started, ok=ok)
+                if ok or not self._should_retry(idempotent, attempt, response):
+                    return response
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def acall(
+        self, send: Callable[[httpx.Timeout], Awaitable[httpx.Response]], idempotent: bool = False
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            probe = self._admit()
+            started = self._clock()
+            try:
+                with TRACER.span(f"{self.name} call", kind="client", attempt=attempt) as span:
+                    response = await send(self._timeouts())
+                    if span is not None:
+                        span.set_attribute("http.status_code", response.status_code)
+            except httpx.HTTPError as exc:
+                self._finish(probe, started, ok=False)
+                if not self._should_retry(idempotent, attempt, exc):
+                    raise
+            except BaseException:
+                self._release(probe)
+                raise
+            else:
+                ok = response.status_code < 500
+                self._finish(probe, started, ok=ok)
+                if ok or not self._should_retry(idempotent, attempt, response):
+                    return response
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def retry_after(self) -> float | None:
+        """Seconds until an open circuit lets a probe through, ``None`` if calls are admitted."""
+        with self._lock:
+            if self._state == CLOSED or (self._state == HALF_OPEN and not self._probing):
+                return None
+            if self._state == HALF_OPEN:
+                return self.settings.reset_timeout
+            remaining = self._opened_at + self.settings.reset_timeout - self._clock()
+            return remaining if remaining > 0 else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            cumulative, buckets = 0, []
+            for bound, count in zip(LATENCY_BUCKETS, self._bucket_counts):
+                cumulative += count
+                buckets.append({"le": "+Inf" if bound == float("inf") else bound, "count": cumulative})
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "timeout": round(self._timeout, 4),
+                "rejected": self._rejected,
+                "retries": self._retries,
+                "latency_count": cumulative,
+                "latency_sum": round(self._latency_sum, 6),
+                "latency_buckets": buckets,
+            }
+
+    def _admit(self) -> bool:
+        """Reserve a call slot; returns ``True`` when the call is the half-open probe."""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.settings.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+            retry_after = max(self._opened_at + self.settings.reset_timeout - self._clock(), 0.0)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _finish(self, probe: bool, started: float, ok: bool) -> None:
+        elapsed = self._clock() - started
+        DOWNSTREAM_REQUEST_DURATION.observe(elapsed, self.name, "ok" if ok else "error")
+        with self._lock:
+            self._record_latency(elapsed)
+            if probe:
+                self._probing = False
+            if ok:
+                self._failures = 0
+                self._state = CLOSED
+                return
+            self._failures += 1
+            if probe or self._failures >= self.settings.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def _release(self, probe: bool) -> None:
+        # Cancelled or crashed locally: neither a success nor a downstream failure.
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def _record_latency(self, elapsed: float) -> None:
+        self._bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        self._latency_sum += elapsed
+        self._samples.append(elapsed)
+        # Re-deriving the percentile sorts the window, so only do it every few samples.
+        if len(self._samples) >= self.settings.min_samples and sum(self._bucket_counts) % 8 == 0:
+            ordered = sorted(self._samples)
+            index = min(len(ordered) - 1, int(self.settings.timeout_percentile * len(ordered)))
+            self._timeout = min(
+                self.settings.max_timeout,
+                max(self.settings.min_timeout, ordered[index] * self.settings.timeout_multiplier),
+            )
+
+    def _timeouts(self) -> httpx.Timeout:
+        with self._lock:
+            timeout = self._timeout
+        return httpx.Timeout(timeout, connect=min(self.settings.connect_timeout, timeout))
+
+    def _should_retry(self, idempotent: bool, attempt: int, outcome: httpx.Response | httpx.HTTPError) -> bool:
+        if not idempotent or attempt >= self.settings.retries:
+            return False
+        if isinstance(outcome, httpx.Response):
+            retryable = outcome.status_code in _RETRYABLE_STATUS
+        else:
+            retryable = isinstance(outcome, httpx.TransportError) and not isinstance(outcome, CircuitOpenError)
+        if retryable:
+            with self._lock:
+                self._retries += 1
+        return retryable
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many workers from arriving in lockstep.
+        return random.uniform(0, self.settings.retry_backoff * 2**attempt)
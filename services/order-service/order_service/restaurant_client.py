@@ -3,15 +3,24 @@ from __future__ import annotations
 import httpx
 from typing import List, Sequence
 
+from .resilience import Downstream
+
 
 class RestaurantServiceError(Exception):
     """Raised when downstream restaurant interactions fail."""
 
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class RestaurantClient:
-    def __init__(self, base_url: str):
+    """Calls go through ``downstream``; the restaurant upserts by order id, so every call may be retried."""
+
+    def __init__(self, base_url: str, client: httpx.Client | None = None, downstream: Downstream | None = None):
         self._base_url = base_url.rstrip("/")
-        self._client = httpx.Client(timeout=5.0)
+        self._client = client or httpx.Client(timeout=5.0)
+        self._downstream = downstream or Downstream("restaurant")
 
     def confirm_order(
         self, restaurant_id: str, order_id: str, items: Sequence[dict]
@@ -20,24 +29,119 @@ class RestaurantClient:
         payload = {"order_id": order_id, "items": items}
 
         try:
-            response = self._client.post(url, json=payload)
+            response = self._downstream.call(
+                lambda timeout: self._client.post(url, json=payload, timeout=timeout), idempotent=True
+            )
         except httpx.HTTPError as exc:
             raise RestaurantServiceError(f"Restaurant-Service nicht erreichbar: {exc}") from exc
+        return _confirmation(response)
 
-        if response.status_code >= 400:
-            raise RestaurantServiceError(
-                f"Restaurant hat Bestellung abgelehnt ({response.status_code}): {response.text}"
+    def confirm_orders(
+        self, restaurant_id: str, orders: Sequence[tuple[str, Sequence[dict]]]
+    ) -> dict[str, dict | RestaurantServiceError]:
+        """Confirm several orders of one restaurant in a single request."""
+        url = f"{self._base_url}/restaurants/{restaurant_id}/orders/batch"
+        payload = _batch_payload(orders)
+        try:
+            response = self._downstream.call(
+                lambda timeout: self._client.post(url, json=payload, timeout=timeout), idempotent=True
             )
-        return response.json()
+        except httpx.HTTPError as exc:
+            raise RestaurantServiceError(f"Restaurant-Service nicht erreichbar: {exc}") from exc
+        return _batch_confirmations(response)
 
     def cancel_order(self, restaurant_id: str, order_id: str, reason: str | None) -> None:
         url = f"{self._base_url}/restaurants/{restaurant_id}/orders/{order_id}/cancel"
         payload = {"reason": reason}
         try:
-            response = self._client.post(url, json=payload)
+            response = self._downstream.call(
+                lambda timeout: self._client.post(url, json=payload, timeout=timeout), idempotent=True
+            )
         except httpx.HTTPError as exc:
             raise RestaurantServiceError(f"Restaurant-Kompensation fehlgeschlagen: {exc}") from exc
-        if response.status_code >= 400:
-            raise RestaurantServiceError(
-                f"Restaurant konnte Order nicht stornieren ({response.status_code}): {response.text}"
+        _check_cancellation(response)
+
+
+class AsyncRestaurantClient:
+    """Non-blocking variant of :class:`RestaurantClient` on ``httpx.AsyncClient``."""
+
+    def __init__(
+        self, base_url: str, client: httpx.AsyncClient | None = None, downstream: Downstream | None = None
+    ):
+        self._base_url = base_url.rstrip("/")
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(timeout=5.0)
+        self._downstream = downstream or Downstream("restaurant")
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def confirm_order(
+        self, restaurant_id: str, order_id: str, items: Sequence[dict]
+    ) -> dict:
+        url = f"{self._base_url}/restaurants/{restaurant_id}/orders"
+        payload = {"order_id": order_id, "items": items}
+
+        try:
+            response = await self._downstream.acall(
+                lambda timeout: self._client.post(url, json=payload, timeout=timeout), idempotent=True
+            )
+        except httpx.HTTPError as exc:
+            raise RestaurantServiceError(f"Restaurant-Service nicht erreichbar: {exc}") from exc
+        return _confirmation(response)
+
+    async def confirm_orders(
+        self, restaurant_id: str, orders: Sequence[tuple[str, Sequence[dict]]]
+    ) -> dict[str, dict | RestaurantServiceError]:
+        url = f"{self._base_url}/restaurants/{restaurant_id}/orders/batch"
+        payload = _batch_payload(orders)
+        try:
+            response = await self._downstream.acall(
+                lambda timeout: self._client.post(url, json=payload, timeout=timeout), idempotent=True
+            )
+        except httpx.HTTPError as exc:
+            raise RestaurantServiceError(f"Restaurant-Service nicht erreichbar: {exc}") from exc
+        return _batch_confirmations(response)
+
+    async def cancel_order(self, restaurant_id: str, order_id: str, reason: str | None) -> None:
+        url = f"{self._base_url}/restaurants/{restaurant_id}/orders/{order_id}/cancel"
+        payload = {"reason": reason}
+        try:
+            response = await self._downstream.acall(
+                lambda timeout: self._client.post(url, json=payload, timeout=timeout), idempotent=True
             )
+        except httpx.HTTPError as exc:
+            raise RestaurantServiceError(f"Restaurant-Kompensation fehlgeschlagen: {exc}") from exc
+        _check_cancellation(response)
+
+
+def _confirmation(response: httpx.Response) -> dict:
+    if response.status_code >= 400:
+        raise RestaurantServiceError(
+            f"Restaurant hat Bestellung abgelehnt ({response.status_code}): {response.text}",
+            response.status_code,
+        )
+    return response.json()
+
+
+def _batch_payload(orders: Sequence[tuple[str, Sequence[dict]]]) -> dict:
+    return {"orders": [{"order_id": order_id, "items": list(items)} for order_id, items in orders]}
+
+
+def _batch_confirmations(response: httpx.Response) -> dict[str, dict | RestaurantServiceError]:
+    _confirmation(response)
+    return {
+        entry["order_id"]: entry["decision"]
+        if entry.get("decision") is not None
+        else RestaurantServiceError(f"Restaurant hat Bestellung abgelehnt: {entry.get('error')}")
+        for entry in response.json()
+    }
+
+
+def _check_cancellation(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RestaurantServiceError(
+            f"Restaurant konnte Order nicht stornieren ({response.status_code}): {response.text}",
+            response.status_code,
+        )
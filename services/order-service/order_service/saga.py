@@ -1,11 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import os
 import uuid
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
 
-from .payment_client import PaymentClient, PaymentServiceError
-from .repository import OrderRecord, OrderRepository
-from .restaurant_client import RestaurantClient, RestaurantServiceError
+from .metrics import SAGA_OUTCOMES, saga_step
+from .payment_client import AsyncPaymentClient, PaymentClient, PaymentResult, PaymentServiceError
+from .repository import AsyncOrderRepository, Compensation, OrderRecord, OrderRepository, OrderUpdate
+from .restaurant_client import AsyncRestaurantClient, RestaurantClient, RestaurantServiceError
+
+# Upper bound for concurrent restaurant calls (one per restaurant) while a batch fans out.
+BATCH_CONCURRENCY = int(os.environ.get("ORDER_BATCH_CONCURRENCY", "10"))
+# When a capture got no answer, its refund looks the order's payments up this many
+# seconds later, so a capture still in flight at the payment service is found too.
+UNCERTAIN_CAPTURE_DELAY = float(os.environ.get("ORDER_UNCERTAIN_CAPTURE_DELAY", "30"))
 
 
 @dataclass
@@ -16,6 +28,168 @@ class CreateOrderCommand:
     order_id: str | None = None
     simulation_mode: str | None = None
 
+    def to_payload(self) -> dict:
+        """Serialisable form stored with a queued job; the order id is the job key."""
+        return {
+            "restaurant_id": self.restaurant_id,
+            "items": self.items,
+            "customer_reference": self.customer_reference,
+            "simulation_mode": self.simulation_mode,
+        }
+
+    @classmethod
+    def from_payload(cls, order_id: str, payload: dict) -> "CreateOrderCommand":
+        return cls(order_id=order_id, **payload)
+
+
+@dataclass
+class BatchOrderResult:
+    order: OrderRecord
+    error: str | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _BatchState:
+    """Bookkeeping shared by the sync and async batch entry points."""
+
+    commands: dict[str, CreateOrderCommand]
+    updates: list[OrderUpdate] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+    charges: list[tuple[str, float]] = field(default_factory=list)
+    compensations: list[Compensation] = field(default_factory=list)
+    decisions: dict[str, dict] = field(default_factory=dict)
+    # Order ids that were already taken; their rows are reported, never touched.
+    existing: set[str] = field(default_factory=set)
+    captures: dict[str, PaymentResult] = field(default_factory=dict)
+    # Orders a cancel overtook while the batch ran.
+    overtaken: set[str] = field(default_factory=set)
+
+    @classmethod
+    def start(cls, commands: Sequence[CreateOrderCommand]) -> "_BatchState":
+        by_id = {command.order_id or str(uuid.uuid4()): command for command in commands}
+        if len(by_id) != len(commands):
+            raise ValueError("Jede order_id darf im Batch nur einmal vorkommen.")
+        return cls(by_id)
+
+    def pending_rows(self) -> list[tuple[str, str, str | None]]:
+        return [
+            (order_id, command.restaurant_id, command.customer_reference)
+            for order_id, command in self.commands.items()
+        ]
+
+    def skip_existing(self, inserted: Sequence[OrderRecord]) -> None:
+        inserted_ids = {record.id for record in inserted}
+        for order_id in self.commands:
+            if order_id not in inserted_ids:
+                self.existing.add(order_id)
+                self.errors[order_id] = "Order existiert bereits"
+
+    def placed(self) -> list[str]:
+        """Ids of the orders this batch inserted and drives through the saga."""
+        return [order_id for order_id in self.commands if order_id not in self.existing]
+
+    def confirmation_groups(
+        self,
+    ) -> tuple[dict[str, dict | RestaurantServiceError], dict[str, list[tuple[str, list[dict]]]]]:
+        """Split the batch into simulated failures and one confirmation call per restaurant."""
+        outcomes: dict[str, dict | RestaurantServiceError] = {}
+        groups: dict[str, list[tuple[str, list[dict]]]] = {}
+        for order_id in self.placed():
+            command = self.commands[order_id]
+            if command.simulation_mode == "restaurant_failure":
+                outcomes[order_id] = RestaurantServiceError("Simulierter Restaurant-Fehler")
+            else:
+                groups.setdefault(command.restaurant_id, []).append((order_id, command.items))
+        return outcomes, groups
+
+    def record_confirmations(self, outcomes: dict[str, dict | RestaurantServiceError]) -> None:
+        for order_id in self.placed():
+            outcome = outcomes.get(order_id)
+            if outcome is None:
+                outcome = RestaurantServiceError("Restaurant hat die Bestellung nicht beantwortet.")
+            if isinstance(outcome, RestaurantServiceError):
+                self._fail(order_id, str(outcome))
+                continue
+            self.decisions[order_id] = outcome
+            if self.commands[order_id].simulation_mode == "payment_failure":
+                self._fail(order_id, "Simulierte Zahlungsstoerung", compensate=True)
+            else:
+                self.charges.append((order_id, outcome.get("total_amount", 0.0)))
+
+    def record_payments(
+        self, results: dict[str, PaymentResult], batch_error: PaymentServiceError | None = None
+    ) -> None:
+        """``batch_error`` is set when the grouped capture failed as a whole."""
+        refund = batch_error is not None and batch_error.outcome_unknown
+        for order_id, _ in self.charges:
+            result = results.get(order_id)
+            if result is None or result.status != "CAPTURED":
+                if batch_error is not None:
+                    reason = str(batch_error)
+                else:
+                    reason = (result and result.failure_reason) or "Zahlung fehlgeschlagen"
+                self._fail(order_id, reason, compensate=True, refund=refund)
+                continue
+            decision = self.decisions[order_id]
+            self.captures[order_id] = result
+            self.updates.append(
+                OrderUpdate(
+                    order_id,
+                    status="CONFIRMED",
+                    total_amount=decision.get("total_amount", 0.0),
+                    items=decision.get("items"),
+                    payment_reference=result.reference,
+                )
+            )
+
+    def superseded(self, records: dict[str, OrderRecord]) -> list[Compensation]:
+        """Compensations for captured orders that a cancel moved out of PENDING first."""
+        compensations: list[Compensation] = []
+        for order_id, result in self.captures.items():
+            if records[order_id].status != "CONFIRMED":
+                self.overtaken.add(order_id)
+                self.errors[order_id] = "Order wurde während der Verarbeitung storniert"
+                compensations.extend(
+                    _undo_compensations(
+                        order_id,
+                        self.commands[order_id].restaurant_id,
+                        result,
+                        self.decisions[order_id].get("total_amount", 0.0),
+                    )
+                )
+        return compensations
+
+    def results(self, records: dict[str, OrderRecord]) -> list[BatchOrderResult]:
+        for order_id in self.placed():
+            if order_id in self.overtaken:
+                SAGA_OUTCOMES.inc("superseded")
+            elif order_id not in self.errors:
+                SAGA_OUTCOMES.inc("confirmed")
+            else:
+                SAGA_OUTCOMES.inc("payment_failed" if order_id in self.decisions else "restaurant_failed")
+        return [BatchOrderResult(records[order_id], self.errors.get(order_id)) for order_id in self.commands]
+
+    def _fail(self, order_id: str, reason: str, compensate: bool = False, refund: bool = False) -> None:
+        decision = self.decisions.get(order_id, {})
+        self.errors[order_id] = reason
+        self.updates.append(
+            OrderUpdate(
+                order_id,
+                status="CANCELED",
+                total_amount=decision.get("total_amount"),
+                items=decision.get("items"),
+                failure_reason=reason,
+            )
+        )
+        if compensate:
+            self.compensations.extend(
+                _payment_failed_compensations(order_id, self.commands[order_id].restaurant_id, refund)
+            )
+
 
 class OrderSaga:
     def __init__(
@@ -23,68 +197,321 @@ class OrderSaga:
         repository: OrderRepository,
         restaurant_client: RestaurantClient,
         payment_client: PaymentClient,
+        on_transition: Callable[[OrderRecord], None] | None = None,
     ):
         self._repo = repository
         self._restaurant = restaurant_client
         self._payment = payment_client
+        self._on_transition = on_transition
+
+    def _published(self, record: OrderRecord | None) -> OrderRecord | None:
+        if record is not None and self._on_transition is not None:
+            self._on_transition(record)
+        return record
 
     def place_order(self, command: CreateOrderCommand) -> OrderRecord:
+        # Each write borrows a pooled connection only for its statement, never across the
+        # downstream HTTP calls; the final UPDATE returns the row, so there is no re-read.
         order_id = command.order_id or str(uuid.uuid4())
-        self._repo.create_order(order_id, command.restaurant_id, command.customer_reference)
+        self._published(self._repo.create_order(order_id, command.restaurant_id, command.customer_reference))
+        return self._advance(order_id, command)
+
+    def resume(self, order_id: str, command: CreateOrderCommand) -> OrderRecord | None:
+        """Run the saga for an order that was stored as PENDING by ``enqueue_order``."""
+        record = self._repo.get_order(order_id)
+        if record is None or record.status != "PENDING":
+            return record
+        return self._advance(order_id, command)
 
+    def _advance(self, order_id: str, command: CreateOrderCommand) -> OrderRecord:
         try:
-            if command.simulation_mode == "restaurant_failure":
-                raise RestaurantServiceError("Simulierter Restaurant-Fehler")
-            restaurant_decision = self._restaurant.confirm_order(
-                command.restaurant_id, order_id, command.items
-            )
+            with saga_step("restaurant_confirm"):
+                if command.simulation_mode == "restaurant_failure":
+                    raise RestaurantServiceError("Simulierter Restaurant-Fehler")
+                restaurant_decision = self._restaurant.confirm_order(
+                    command.restaurant_id, order_id, command.items
+                )
         except RestaurantServiceError as exc:
-            self._repo.update_order(
-                order_id,
-                status="CANCELED",
-                failure_reason=str(exc),
+            SAGA_OUTCOMES.inc("restaurant_failed")
+            # No row: a cancel got in first; the restaurant never confirmed, so there is nothing to undo.
+            self._published(
+                self._repo.update_order(order_id, status="CANCELED", failure_reason=str(exc), only_pending=True)
             )
             raise
 
         total_amount = restaurant_decision.get("total_amount", 0.0)
 
         try:
-            if command.simulation_mode == "payment_failure":
-                raise PaymentServiceError("Simulierte Zahlungsstoerung")
-            payment_result = self._payment.authorize_and_capture(order_id, total_amount)
+            with saga_step("payment_capture"):
+                if command.simulation_mode == "payment_failure":
+                    raise PaymentServiceError("Simulierte Zahlungsstoerung")
+                payment_result = self._payment.authorize_and_capture(order_id, total_amount)
         except PaymentServiceError as exc:
-            self._repo.update_order(
+            SAGA_OUTCOMES.inc("payment_failed")
+            compensations = _payment_failed_compensations(order_id, command.restaurant_id, exc.outcome_unknown)
+            canceled = self._repo.update_order(
                 order_id,
                 status="CANCELED",
                 total_amount=total_amount,
                 items=restaurant_decision.get("items"),
                 failure_reason=str(exc),
+                compensations=compensations,
+                only_pending=True,
             )
-            self._compensate_restaurant(command.restaurant_id, order_id, "payment_failed")
+            if canceled is None:
+                # A cancel got in first without knowing of the confirmation (or a capture that may have happened).
+                self._repo.enqueue_compensations(compensations)
+            self._published(canceled)
             raise
 
-        self._repo.update_order(
+        confirmed = self._repo.update_order(
             order_id,
             status="CONFIRMED",
             total_amount=total_amount,
             items=restaurant_decision.get("items"),
             payment_reference=payment_result.reference,
             failure_reason=None,
+            only_pending=True,
         )
+        if confirmed is None:
+            return self._superseded(
+                order_id, _undo_compensations(order_id, command.restaurant_id, payment_result, total_amount)
+            )
+        SAGA_OUTCOMES.inc("confirmed")
+        return self._published(confirmed)
+
+    def _superseded(self, order_id: str, compensations: list[Compensation]) -> OrderRecord | None:
+        """The order left PENDING while the saga ran, e.g. through a manual cancel.
+
+        That cancel knew nothing of this run's confirmation or capture, so they are
+        undone through the outbox and the saga stops; the stored state stands.
+        """
+        SAGA_OUTCOMES.inc("superseded")
+        self._repo.enqueue_compensations(compensations)
         return self._repo.get_order(order_id)
 
+    def place_orders(self, commands: Sequence[CreateOrderCommand]) -> list[BatchOrderResult]:
+        """Place several orders: one insert, one confirmation call per restaurant, one grouped capture."""
+        batch = _BatchState.start(commands)
+        batch.skip_existing(self._repo.create_orders(batch.pending_rows()))
+        outcomes, groups = batch.confirmation_groups()
+
+        with saga_step("batch_confirm"), ThreadPoolExecutor(
+            max_workers=max(1, min(BATCH_CONCURRENCY, len(groups)))
+        ) as executor:
+            # Each call runs in a copy of this context so its spans join the request's trace.
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._try_confirm_group, restaurant_id, orders)
+                for restaurant_id, orders in groups.items()
+            ]
+            for future in futures:
+                outcomes.update(future.result())
+        batch.record_confirmations(outcomes)
+        if batch.charges:
+            try:
+                with saga_step("batch_capture"):
+                    captured = self._payment.authorize_and_capture_many(batch.charges)
+                batch.record_payments(captured)
+            except PaymentServiceError as exc:
+                batch.record_payments({}, exc)
+
+        # Compensations go to the outbox in the same transaction as the CANCELED states.
+        self._repo.update_orders(batch.updates, batch.compensations)
+        records = self._repo.get_orders(list(batch.commands))
+        self._repo.enqueue_compensations(batch.superseded(records))
+        for order_id in batch.placed():
+            self._published(records[order_id])
+        return batch.results(records)
+
+    def _try_confirm_group(
+        self, restaurant_id: str, orders: list[tuple[str, list[dict]]]
+    ) -> dict[str, dict | RestaurantServiceError]:
+        try:
+            return self._restaurant.confirm_orders(restaurant_id, orders)
+        except RestaurantServiceError as exc:
+            return {order_id: exc for order_id, _ in orders}
+
     def cancel(self, order: OrderRecord, reason: str | None = None) -> OrderRecord:
-        self._compensate_restaurant(order.restaurant_id, order.id, reason or "manual_cancel")
-        self._repo.update_order(
-            order.id,
-            status="CANCELED",
-            failure_reason=reason,
+        return self._published(
+            self._repo.update_order(
+                order.id,
+                status="CANCELED",
+                failure_reason=reason,
+                compensations=_cancel_compensations(order, reason),
+            )
         )
-        return self._repo.get_order(order.id)
 
-    def _compensate_restaurant(self, restaurant_id: str, order_id: str, reason: str | None) -> None:
+
+class AsyncOrderSaga:
+    """Same orchestration as :class:`OrderSaga`, but never blocks the event loop."""
+
+    def __init__(
+        self,
+        repository: AsyncOrderRepository,
+        restaurant_client: AsyncRestaurantClient,
+        payment_client: AsyncPaymentClient,
+        on_transition: Callable[[OrderRecord], None] | None = None,
+    ):
+        self._repo = repository
+        self._restaurant = restaurant_client
+        self._payment = payment_client
+        self._on_transition = on_transition
+
+    def _published(self, record: OrderRecord | None) -> OrderRecord | None:
+        if record is not None and self._on_transition is not None:
+            self._on_transition(record)
+        return record
+
+    async def place_order(self, command: CreateOrderCommand) -> OrderRecord:
+        # Like OrderSaga: no connection is held while awaiting the restaurant or payment service.
+        order_id = command.order_id or str(uuid.uuid4())
+        self._published(await self._repo.create_order(order_id, command.restaurant_id, command.customer_reference))
+        return await self._advance(order_id, command)
+
+    async def resume(self, order_id: str, command: CreateOrderCommand) -> OrderRecord | None:
+        """Run the saga for an order that was stored as PENDING by ``enqueue_order``."""
+        record = await self._repo.get_order(order_id)
+        if record is None or record.status != "PENDING":
+            return record
+        return await self._advance(order_id, command)
+
+    async def _advance(self, order_id: str, command: CreateOrderCommand) -> OrderRecord:
         try:
-            self._restaurant.cancel_order(restaurant_id, order_id, reason)
-        except RestaurantServiceError:
-            # Saga best effort; Logging kann später ergänzt werden
-            pass
+            with saga_step("restaurant_confirm"):
+                if command.simulation_mode == "restaurant_failure":
+                    raise RestaurantServiceError("Simulierter Restaurant-Fehler")
+                restaurant_decision = await self._restaurant.confirm_order(
+                    command.restaurant_id, order_id, command.items
+                )
+        except RestaurantServiceError as exc:
+            SAGA_OUTCOMES.inc("restaurant_failed")
+            # No row: a cancel got in first; the restaurant never confirmed, so there is nothing to undo.
+            self._published(
+                await self._repo.update_order(order_id, status="CANCELED", failure_reason=str(exc), only_pending=True)
+            )
+            raise
+
+        total_amount = restaurant_decision.get("total_amount", 0.0)
+
+        try:
+            with saga_step("payment_capture"):
+                if command.simulation_mode == "payment_failure":
+                    raise PaymentServiceError("Simulierte Zahlungsstoerung")
+                payment_result = await self._payment.authorize_and_capture(order_id, total_amount)
+        except PaymentServiceError as exc:
+            SAGA_OUTCOMES.inc("payment_failed")
+            compensations = _payment_failed_compensations(order_id, command.restaurant_id, exc.outcome_unknown)
+            canceled = await self._repo.update_order(
+                order_id,
+                status="CANCELED",
+                total_amount=total_amount,
+                items=restaurant_decision.get("items"),
+                failure_reason=str(exc),
+                compensations=compensations,
+                only_pending=True,
+            )
+            if canceled is None:
+                # A cancel got in first without knowing of the confirmation (or a capture that may have happened).
+                await self._repo.enqueue_compensations(compensations)
+            self._published(canceled)
+            raise
+
+        confirmed = await self._repo.update_order(
+            order_id,
+            status="CONFIRMED",
+            total_amount=total_amount,
+            items=restaurant_decision.get("items"),
+            payment_reference=payment_result.reference,
+            failure_reason=None,
+            only_pending=True,
+        )
+        if confirmed is None:
+            return await self._superseded(
+                order_id, _undo_compensations(order_id, command.restaurant_id, payment_result, total_amount)
+            )
+        SAGA_OUTCOMES.inc("confirmed")
+        return self._published(confirmed)
+
+    async def _superseded(self, order_id: str, compensations: list[Compensation]) -> OrderRecord | None:
+        SAGA_OUTCOMES.inc("superseded")
+        await self._repo.enqueue_compensations(compensations)
+        return await self._repo.get_order(order_id)
+
+    async def place_orders(self, commands: Sequence[CreateOrderCommand]) -> list[BatchOrderResult]:
+        batch = _BatchState.start(commands)
+        batch.skip_existing(await self._repo.create_orders(batch.pending_rows()))
+
+        limit = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+        async def bounded(call):
+            async with limit:
+                return await call
+
+        outcomes, groups = batch.confirmation_groups()
+        with saga_step("batch_confirm"):
+            confirmations = await asyncio.gather(
+                *(bounded(self._try_confirm_group(restaurant_id, orders)) for restaurant_id, orders in groups.items())
+            )
+        for confirmed in confirmations:
+            outcomes.update(confirmed)
+        batch.record_confirmations(outcomes)
+        if batch.charges:
+            try:
+                with saga_step("batch_capture"):
+                    captured = await self._payment.authorize_and_capture_many(batch.charges)
+                batch.record_payments(captured)
+            except PaymentServiceError as exc:
+                batch.record_payments({}, exc)
+
+        await self._repo.update_orders(batch.updates, batch.compensations)
+        records = await self._repo.get_orders(list(batch.commands))
+        await self._repo.enqueue_compensations(batch.superseded(records))
+        for order_id in batch.placed():
+            self._published(records[order_id])
+        return batch.results(records)
+
+    async def _try_confirm_group(
+        self, restaurant_id: str, orders: list[tuple[str, list[dict]]]
+    ) -> dict[str, dict | RestaurantServiceError]:
+        try:
+            return await self._restaurant.confirm_orders(restaurant_id, orders)
+        except RestaurantServiceError as exc:
+            return {order_id: exc for order_id, _ in orders}
+
+    async def cancel(self, order: OrderRecord, reason: str | None = None) -> OrderRecord:
+        return self._published(
+            await self._repo.update_order(
+                order.id,
+                status="CANCELED",
+                failure_reason=reason,
+                compensations=_cancel_compensations(order, reason),
+            )
+        )
+
+
+def _payment_failed_compensations(order_id: str, restaurant_id: str, outcome_unknown: bool) -> list[Compensation]:
+    """Release the restaurant; refund the order's captures if the capture may have gone through."""
+    compensations = [Compensation.cancel_restaurant(order_id, restaurant_id, "payment_failed")]
+    if outcome_unknown:
+        compensations.append(Compensation.refund_order_payments(order_id, UNCERTAIN_CAPTURE_DELAY))
+    return compensations
+
+
+def _undo_compensations(
+    order_id: str, restaurant_id: str, payment: PaymentResult, amount: float
+) -> list[Compensation]:
+    """Release the restaurant and refund the capture of a saga run that a cancel overtook."""
+    return [
+        Compensation.cancel_restaurant(order_id, restaurant_id, "order_canceled"),
+        Compensation.refund_payment(order_id, payment.reference, amount),
+    ]
+
+
+def _cancel_compensations(order: OrderRecord, reason: str | None) -> list[Compensation]:
+    """Outbox entries undoing the downstream effects of ``order``; none if it is already canceled."""
+    if order.status == "CANCELED":
+        return []
+    compensations = [Compensation.cancel_restaurant(order.id, order.restaurant_id, reason or "manual_cancel")]
+    if order.payment_reference:
+        compensations.append(Compensation.refund_payment(order.id, order.payment_reference, order.total_amount or 0.0))
+    return compensations
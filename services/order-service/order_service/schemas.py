@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -9,6 +9,21 @@ class HealthResponse(BaseModel):
     status: Literal["ok"]
 
 
+class ReadinessCheck(BaseModel):
+    status: Literal["ok", "degraded", "unavailable"]
+    detail: Optional[str] = None
+
+
+class ReadinessResponse(BaseModel):
+    status: Literal["ready", "degraded", "unavailable"]
+    checks: Dict[str, ReadinessCheck]
+    # Reported for operators, not part of ``status``.
+    downstreams: Dict[str, ReadinessCheck] = Field(default_factory=dict)
+    schema_version: Optional[int] = None
+    expected_schema_version: int
+    checked_at: str
+
+
 class OrderItem(BaseModel):
     menu_item_id: str
     quantity: int = Field(..., gt=0)
@@ -38,5 +53,64 @@ class OrderSummary(BaseModel):
     updated_at: str
 
 
+class OrderAccepted(BaseModel):
+    order_id: str
+    status: str
+
+
+class BatchCreateOrderRequest(BaseModel):
+    orders: List[CreateOrderRequest] = Field(..., min_length=1)
+
+
+class BatchOrderResult(BaseModel):
+    order_id: str
+    succeeded: bool
+    error: Optional[str] = None
+    order: OrderSummary
+
+
 class CancelOrderRequest(BaseModel):
     reason: Optional[str] = None
+
+
+class PoolStats(BaseModel):
+    min_size: int
+    max_size: int
+    size: int
+    idle: int
+    in_use: int
+    waiting: int
+    utilisation: float
+    requests_total: int
+    requests_waited: int
+    wait_time_total_ms: float
+    wait_time_max_ms: float
+    timeouts: int
+    connections_created: int
+    connections_discarded: int
+
+
+class HTTPClientStats(BaseModel):
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry: float
+    connections: int
+    idle: int
+    active: int
+    requests_in_flight: int
+
+
+class LatencyBucket(BaseModel):
+    le: Union[float, str]
+    count: int
+
+
+class DownstreamStats(BaseModel):
+    state: Literal["closed", "open", "half_open"]
+    consecutive_failures: int
+    timeout: float
+    rejected: int
+    retries: int
+    latency_count: int
+    latency_sum: float
+    latency_buckets: List[LatencyBucket]
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from order_service.database import AsyncConnectionPool, AsyncSQLiteConnection, PoolSettings, apply_schema
+from order_service.payment_client import PaymentResult, PaymentServiceError
+from order_service.repository import AsyncOrderRepository, OrderExistsError
+from order_service.restaurant_client import RestaurantServiceError
+from order_service.saga import AsyncOrderSaga, CreateOrderCommand
+
+
+@pytest.fixture()
+def connect(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    async def connection_factory():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return AsyncSQLiteConnection(conn)
+
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+
+    return connection_factory
+
+
+def run_with_repo(connect, scenario):
+    async def main():
+        pool = AsyncConnectionPool(connect, PoolSettings(min_size=1, max_size=2))
+        await pool.open()
+        try:
+            result = await scenario(AsyncOrderRepository(pool))
+            return result, pool.stats()
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+class SuccessfulRestaurantClient:
+    async def confirm_order(self, restaurant_id, order_id, items):
+        return {
+            "order_id": order_id,
+            "restaurant_id": restaurant_id,
+            "items": [{"menu_item_id": items[0]["menu_item_id"], "quantity": 1, "line_total": 10.0}],
+            "total_amount": 10.0,
+        }
+
+    async def cancel_order(self, restaurant_id, order_id, reason):
+        self.canceled = (order_id, reason)
+
+
+class FailingRestaurantClient(SuccessfulRestaurantClient):
+    async def confirm_order(self, restaurant_id, order_id, items):
+        raise RestaurantServiceError("Restaurant down")
+
+
+class SuccessfulPaymentClient:
+    async def authorize_and_capture(self, order_id, amount):
+        return PaymentResult(reference="pay-123", status="CAPTURED")
+
+    async def refund(self, reference, amount):
+        return PaymentResult(reference=reference, status="REFUNDED")
+
+
+class FailingPaymentClient(SuccessfulPaymentClient):
+    async def authorize_and_capture(self, order_id, amount):
+        raise PaymentServiceError("card declined")
+
+
+def command(order_id: str) -> CreateOrderCommand:
+    return CreateOrderCommand(
+        restaurant_id="resto-roma",
+        items=[{"menu_item_id": "roma-carbonara", "quantity": 1}],
+        order_id=order_id,
+    )
+
+
+def test_successful_order(connect):
+    async def scenario(repo):
+        saga = AsyncOrderSaga(repo, SuccessfulRestaurantClient(), SuccessfulPaymentClient())
+        return await saga.place_order(command("order-1")), await repo.list_orders(limit=10)
+
+    (record, listed), _ = run_with_repo(connect, scenario)
+    assert record.status == "CONFIRMED"
+    assert record.payment_reference == "pay-123"
+    assert [entry.id for entry in listed] == ["order-1"]
+
+
+def test_restaurant_failure(connect):
+    async def scenario(repo):
+        saga = AsyncOrderSaga(repo, FailingRestaurantClient(), SuccessfulPaymentClient())
+        with pytest.raises(RestaurantServiceError):
+            await saga.place_order(command("order-2"))
+        return await repo.get_order("order-2")
+
+    record, _ = run_with_repo(connect, scenario)
+    assert record.status == "CANCELED"
+    assert record.failure_reason == "Restaurant down"
+
+
+def test_payment_failure_triggers_compensation(connect):
+    restaurant = SuccessfulRestaurantClient()
+
+    async def scenario(repo):
+        saga = AsyncOrderSaga(repo, restaurant, FailingPaymentClient())
+        with pytest.raises(PaymentServiceError):
+            await saga.place_order(command("order-3"))
+        return await repo.get_order("order-3"), await repo.claim_outbox(10, 60)
+
+    (record, outbox), _ = run_with_repo(connect, scenario)
+    assert record.status == "CANCELED"
+    assert record.failure_reason == "card declined"
+    assert [(message.order_id, message.kind, message.payload["reason"]) for message in outbox] == [
+        ("order-3", "restaurant.cancel", "payment_failed")
+    ]
+
+
+def test_concurrent_orders_share_bounded_pool(connect):
+    async def scenario(repo):
+        saga = AsyncOrderSaga(repo, SuccessfulRestaurantClient(), SuccessfulPaymentClient())
+        records = await asyncio.gather(*(saga.place_order(command(f"order-{i}")) for i in range(10)))
+        return records
+
+    records, stats = run_with_repo(connect, scenario)
+    assert all(record.status == "CONFIRMED" for record in records)
+    assert stats["size"] <= 2
+    assert stats["in_use"] == 0
+
+
+def test_saga_holds_no_connection_while_awaiting_downstream(connect):
+    in_use_during_calls = []
+
+    async def scenario(repo):
+        class ObservedPaymentClient(SuccessfulPaymentClient):
+            async def authorize_and_capture(self, order_id, amount):
+                in_use_during_calls.append(repo._pool.stats()["in_use"])
+                return await super().authorize_and_capture(order_id, amount)
+
+        saga = AsyncOrderSaga(repo, SuccessfulRestaurantClient(), ObservedPaymentClient())
+        return await saga.place_order(command("order-4"))
+
+    record, _ = run_with_repo(connect, scenario)
+    assert record.status == "CONFIRMED"
+    assert in_use_during_calls == [0]
+
+
+def test_existing_order_id_is_rejected_by_the_insert(connect):
+    async def scenario(repo):
+        saga = AsyncOrderSaga(repo, SuccessfulRestaurantClient(), SuccessfulPaymentClient())
+        await saga.place_order(command("order-5"))
+        with pytest.raises(OrderExistsError):
+            await saga.place_order(command("order-5"))
+        with pytest.raises(OrderExistsError):
+            await repo.enqueue_order("order-5", "resto-roma", None, command("order-5").to_payload())
+        return await repo.get_order("order-5")
+
+    record, stats = run_with_repo(connect, scenario)
+    assert record.status == "CONFIRMED"
+    assert stats["in_use"] == 0
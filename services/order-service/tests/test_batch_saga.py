@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from order_service.database import AsyncConnectionPool, AsyncSQLiteConnection, PoolSettings, apply_schema
+from order_service.payment_client import PaymentResult, PaymentServiceError
+from order_service.repository import AsyncOrderRepository, OrderRepository
+from order_service.restaurant_client import RestaurantServiceError
+from order_service.saga import AsyncOrderSaga, CreateOrderCommand, OrderSaga
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = tmp_path / "orders.db"
+    with sqlite3.connect(path) as conn:
+        apply_schema(conn)
+    return path
+
+
+@pytest.fixture()
+def repo(db_path):
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+class RecordingRestaurantClient:
+    """Rejects restaurant ``resto-closed``; records confirmation calls."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def confirm_orders(self, restaurant_id, orders):
+        with self._lock:
+            self.calls.append((restaurant_id, [order_id for order_id, _ in orders]))
+        if restaurant_id == "resto-closed":
+            raise RestaurantServiceError("Restaurant geschlossen")
+        return {
+            order_id: {"items": [{"menu_item_id": items[0]["menu_item_id"], "line_total": 12.0}], "total_amount": 12.0}
+            for order_id, items in orders
+        }
+
+
+class GroupedPaymentClient:
+    """Declines ``order-declined``; counts batch calls."""
+
+    def __init__(self, error: str | None = None, outcome_unknown: bool = False):
+        self.calls = []
+        self._error = error
+        self._outcome_unknown = outcome_unknown
+
+    def authorize_and_capture_many(self, charges):
+        self.calls.append(list(charges))
+        if self._error:
+            raise PaymentServiceError(self._error, outcome_unknown=self._outcome_unknown)
+        return {
+            order_id: PaymentResult(reference=f"pay-{order_id}", status="CAPTURED")
+            if order_id != "order-declined"
+            else PaymentResult(reference="", status="FAILED", failure_reason="Karte abgelehnt")
+            for order_id, _ in charges
+        }
+
+
+class AsyncRestaurantAdapter:
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def confirm_orders(self, restaurant_id, orders):
+        await asyncio.sleep(0)
+        return self.inner.confirm_orders(restaurant_id, orders)
+
+
+class AsyncPaymentAdapter:
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def authorize_and_capture_many(self, charges):
+        return self.inner.authorize_and_capture_many(charges)
+
+
+def commands():
+    def command(order_id, restaurant_id="resto-roma", simulation_mode=None):
+        return CreateOrderCommand(
+            restaurant_id=restaurant_id,
+            items=[{"menu_item_id": "roma-carbonara", "quantity": 1}],
+            order_id=order_id,
+            simulation_mode=simulation_mode,
+        )
+
+    return [
+        command("order-ok"),
+        command("order-closed", restaurant_id="resto-closed"),
+        command("order-declined"),
+        command("order-simulated", simulation_mode="payment_failure"),
+    ]
+
+
+def assert_outcomes(results, restaurant, payment, outbox):
+    by_id = {result.order.id: result for result in results}
+    assert [result.order.id for result in results] == ["order-ok", "order-closed", "order-declined", "order-simulated"]
+    assert by_id["order-ok"].succeeded
+    assert by_id["order-ok"].order.status == "CONFIRMED"
+    assert by_id["order-ok"].order.payment_reference == "pay-order-ok"
+    assert by_id["order-closed"].error == "Restaurant geschlossen"
+    assert by_id["order-declined"].order.failure_reason == "Karte abgelehnt"
+    assert by_id["order-simulated"].order.status == "CANCELED"
+    assert sorted(restaurant.calls) == [
+        ("resto-closed", ["order-closed"]),
+        ("resto-roma", ["order-ok", "order-declined", "order-simulated"]),
+    ]
+    assert payment.calls == [[("order-ok", 12.0), ("order-declined", 12.0)]]
+    assert sorted((message.order_id, message.kind) for message in outbox) == [
+        ("order-declined", "restaurant.cancel"),
+        ("order-simulated", "restaurant.cancel"),
+    ]
+
+
+def test_batch_reports_each_order(repo):
+    restaurant, payment = RecordingRestaurantClient(), GroupedPaymentClient()
+    results = OrderSaga(repo, restaurant, payment).place_orders(commands())
+
+    assert_outcomes(results, restaurant, payment, repo.claim_outbox(10, 60))
+    assert repo.get_order("order-closed").status == "CANCELED"
+
+
+def test_batch_payment_outage_cancels_charged_orders(repo):
+    restaurant = RecordingRestaurantClient()
+    results = OrderSaga(repo, restaurant, GroupedPaymentClient(error="Payment down")).place_orders(commands()[:1])
+
+    assert results[0].error == "Payment down"
+    assert results[0].order.total_amount == 12.0
+    assert [message.order_id for message in repo.claim_outbox(10, 60)] == ["order-ok"]
+
+
+def test_a_cancel_during_the_batch_capture_wins_and_is_refunded(repo):
+    class CancelingPaymentClient(GroupedPaymentClient):
+        def authorize_and_capture_many(self, charges):
+            repo.update_order("order-ok", status="CANCELED", failure_reason="Kunde storniert")
+            return super().authorize_and_capture_many(charges)
+
+    results = OrderSaga(repo, RecordingRestaurantClient(), CancelingPaymentClient()).place_orders(commands()[:1])
+
+    assert results[0].order.status == "CANCELED"
+    assert results[0].order.failure_reason == "Kunde storniert"
+    assert results[0].error == "Order wurde während der Verarbeitung storniert"
+    assert sorted((message.kind, message.payload.get("reference")) for message in repo.claim_outbox(10, 60)) == [
+        ("payment.refund", "pay-order-ok"),
+        ("restaurant.cancel", None),
+    ]
+
+
+def test_batch_capture_without_answer_queues_a_refund_lookup_per_order(repo):
+    payment = GroupedPaymentClient(error="Payment-Service nicht erreichbar: timeout", outcome_unknown=True)
+    results = OrderSaga(repo, RecordingRestaurantClient(), payment).place_orders(commands()[:3])
+
+    assert [result.succeeded for result in results] == [False] * 3
+    with repo._connection() as conn:
+        queued = sorted(
+            (row["order_id"], row["kind"], row["available_at"] > row["created_at"])
+            for row in conn.execute("SELECT order_id, kind, available_at, created_at FROM order_outbox;")
+        )
+    # order-closed never reached the payment step, so nothing can have been captured for it.
+    assert queued == [
+        ("order-declined", "payment.refund_order", True),
+        ("order-declined", "restaurant.cancel", False),
+        ("order-ok", "payment.refund_order", True),
+        ("order-ok", "restaurant.cancel", False),
+    ]
+
+
+def test_existing_order_id_fails_only_its_own_result(repo):
+    repo.create_order("order-ok", "resto-roma", "earlier request")
+    restaurant, payment = RecordingRestaurantClient(), GroupedPaymentClient()
+    results = OrderSaga(repo, restaurant, payment).place_orders(commands()[:3])
+
+    by_id = {result.order.id: result for result in results}
+    assert by_id["order-ok"].error == "Order existiert bereits"
+    assert by_id["order-ok"].order.status == "PENDING"
+    assert by_id["order-ok"].order.customer_reference == "earlier request"
+    assert by_id["order-declined"].order.status == "CANCELED"
+    assert sorted(restaurant.calls) == [("resto-closed", ["order-closed"]), ("resto-roma", ["order-declined"])]
+    assert payment.calls == [[("order-declined", 12.0)]]
+
+
+def test_batch_rejects_duplicate_order_ids(repo):
+    saga = OrderSaga(repo, RecordingRestaurantClient(), GroupedPaymentClient())
+    with pytest.raises(ValueError):
+        saga.place_orders(commands()[:1] * 2)
+    assert repo.get_order("order-ok") is None
+
+
+def test_async_batch_matches_sync_semantics(db_path):
+    restaurant, payment = RecordingRestaurantClient(), GroupedPaymentClient()
+
+    async def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return AsyncSQLiteConnection(conn)
+
+    async def main():
+        pool = AsyncConnectionPool(connect, PoolSettings(min_size=1, max_size=2))
+        await pool.open()
+        try:
+            repo = AsyncOrderRepository(pool)
+            saga = AsyncOrderSaga(repo, AsyncRestaurantAdapter(restaurant), AsyncPaymentAdapter(payment))
+            return await saga.place_orders(commands()), await repo.claim_outbox(10, 60)
+        finally:
+            await pool.close()
+
+    results, outbox = asyncio.run(main())
+    assert_outcomes(results, restaurant, payment, outbox)
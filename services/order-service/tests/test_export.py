@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import sqlite3
+
+import pytest
+
+from order_service import export
+from order_service.app import create_app, get_repository
+from order_service.database import (
+    AsyncConnectionPool,
+    AsyncSQLiteConnection,
+    ConnectionPool,
+    PoolSettings,
+    apply_schema,
+)
+from order_service.export import EXPORT_COLUMNS, stream_export, stream_export_async
+from order_service.repository import AsyncOrderRepository, OrderFilter, OrderRepository
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = tmp_path / "orders.db"
+    with sqlite3.connect(path) as conn:
+        apply_schema(conn)
+        conn.executemany(
+            """
+            INSERT INTO orders (id, customer_reference, restaurant_id, status, items_json, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?);
+            """,
+            [
+                (
+                    f"order-{index:02d}",
+                    'acme, "north"' if index % 2 else None,
+                    "resto-roma",
+                    "CONFIRMED" if index % 3 else "CANCELED",
+                    json.dumps([{"menu_item_id": "pizza", "quantity": index}]),
+                    "2024-05-01T10:00:00+00:00",
+                    f"2024-05-01T10:{index:02d}:00+00:00",
+                )
+                for index in range(7)
+            ],
+        )
+    return path
+
+
+@pytest.fixture()
+def repo(db_path):
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+def test_ndjson_export_streams_all_orders_newest_first(repo):
+    body = "".join(stream_export(repo.iter_orders(batch_size=2), "ndjson"))
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [row["id"] for row in rows] == [f"order-{index:02d}" for index in reversed(range(7))]
+    assert rows[0]["items"] == [{"menu_item_id": "pizza", "quantity": 6}]
+
+
+def test_csv_export_quotes_values_and_applies_filters(repo):
+    body = "".join(stream_export(repo.iter_orders(OrderFilter(status="CANCELED")), "csv"))
+    rows = list(csv.reader(io.StringIO(body)))
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert [row[0] for row in rows[1:]] == ["order-06", "order-03", "order-00"]
+    assert rows[2][EXPORT_COLUMNS.index("customer_reference")] == 'acme, "north"'
+    assert json.loads(rows[1][EXPORT_COLUMNS.index("items")]) == [{"menu_item_id": "pizza", "quantity": 6}]
+
+
+def test_export_flushes_in_chunks(repo, monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_ROWS", 3)
+    chunks = list(stream_export(repo.iter_orders(), "ndjson"))
+    assert [chunk.count("\n") for chunk in chunks] == [3, 3, 1]
+
+
+def test_async_export_matches_sync_export(db_path, repo):
+    async def collect():
+        async def connect():
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            return AsyncSQLiteConnection(conn)
+
+        pool = AsyncConnectionPool(connect, PoolSettings(min_size=1, max_size=2))
+        await pool.open()
+        try:
+            async_repo = AsyncOrderRepository(pool)
+            return "".join([chunk async for chunk in stream_export_async(async_repo.iter_orders(batch_size=3), "csv")])
+        finally:
+            await pool.close()
+
+    assert asyncio.run(collect()) == "".join(stream_export(repo.iter_orders(), "csv"))
+
+
+def test_export_releases_its_connection_when_the_client_disconnects(db_path, monkeypatch):
+    monkeypatch.setenv("ORDER_EXECUTION_MODE", "sync")
+    monkeypatch.setattr(export, "CHUNK_ROWS", 1)
+
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    pool = ConnectionPool(connect, PoolSettings(min_size=1, max_size=1))
+    pool.open()
+    app = create_app()
+    app.dependency_overrides[get_repository] = lambda: OrderRepository(pool=pool)
+
+    async def request():
+        first_chunk = asyncio.Event()
+        requested = False
+        sent = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await first_chunk.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body" and message["body"]:
+                first_chunk.set()
+                # Keep the stream busy so the disconnect arrives mid-export.
+                await asyncio.sleep(0.05)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/orders/export",
+            "raw_path": b"/orders/export",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [],
+            "server": ("testserver", 80),
+            "client": ("testclient", 1234),
+        }
+        await app(scope, receive, send)
+        # Checked before the loop gets to finalize dropped async generators.
+        return sent, pool.stats()["in_use"]
+
+    try:
+        sent, in_use = asyncio.run(request())
+        chunks = [message for message in sent if message["type"] == "http.response.body"]
+        assert 1 <= len(chunks) < 7
+        assert all(message["more_body"] for message in chunks)
+        assert in_use == 0
+    finally:
+        pool.close()
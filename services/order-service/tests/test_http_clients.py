@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from order_service.http_clients import HTTPClientRegistry, HTTPClientSettings
+from order_service.restaurant_client import AsyncRestaurantClient, RestaurantClient
+
+
+def test_registry_shares_clients_per_downstream():
+    registry = HTTPClientRegistry(HTTPClientSettings(max_connections_per_host=8, max_keepalive_connections=4))
+
+    first = RestaurantClient("http://restaurant", client=registry.client("restaurant"))
+    second = RestaurantClient("http://restaurant", client=registry.client("restaurant"))
+
+    assert first._client is second._client
+    assert registry.client("payment") is not registry.client("restaurant")
+    stats = registry.stats()
+    assert set(stats) == {"restaurant:sync", "payment:sync"}
+    assert stats["restaurant:sync"]["max_connections"] == 8
+    assert stats["restaurant:sync"]["max_keepalive_connections"] == 4
+    assert stats["restaurant:sync"]["connections"] == 0
+    asyncio.run(registry.aclose())
+
+
+def test_shared_async_client_survives_wrapper_close_and_registry_closes_it():
+    async def scenario():
+        registry = HTTPClientRegistry()
+        shared = registry.async_client("restaurant")
+        await AsyncRestaurantClient("http://restaurant", client=shared).aclose()
+        assert not shared.is_closed
+        await registry.aclose()
+        assert shared.is_closed
+        with pytest.raises(RuntimeError):
+            registry.async_client("restaurant")
+
+    asyncio.run(scenario())
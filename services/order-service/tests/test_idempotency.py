@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from mifos_db.idempotency import IdempotencyKeyMismatch, IdempotencySettings, IdempotencyStore
+
+from order_service.database import AsyncConnectionPool, AsyncSQLiteConnection, PoolSettings, apply_schema
+from order_service.repository import AsyncIdempotencyRepository, IdempotencyRepository
+
+SETTINGS = IdempotencySettings(ttl=60, lock_timeout=5, poll_interval=0.005)
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = tmp_path / "orders.db"
+    with sqlite3.connect(path) as conn:
+        apply_schema(conn)
+    return path
+
+
+@pytest.fixture()
+def repository(db_path):
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    return IdempotencyRepository(connection_factory=connection_factory)
+
+
+def test_server_errors_are_not_kept(repository):
+    store = IdempotencyStore(repository, SETTINGS)
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        if len(calls) == 1:
+            raise HTTPException(status_code=502, detail="Restaurant-Service nicht erreichbar")
+        return JSONResponse(status_code=201, content={"id": "order-1"}, headers={"Location": "/orders/order-1"})
+
+    async def scenario():
+        failed = await store.run("k", "f", handle)
+        retried = await store.run("k", "f", handle)
+        replayed = await store.run("k", "f", handle)
+        return failed, retried, replayed
+
+    failed, retried, replayed = asyncio.run(scenario())
+
+    assert failed.status_code == 502
+    assert retried.status_code == replayed.status_code == 201
+    assert replayed.headers["location"] == "/orders/order-1"
+    assert replayed.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 2
+
+
+def test_stores_sharing_a_database_run_the_handler_once(repository):
+    # Two stores stand in for two workers (or replicas) behind the same database.
+    stores = [IdempotencyStore(repository, SETTINGS), IdempotencyStore(repository, SETTINGS)]
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return JSONResponse(status_code=201, content={"id": "order-1"})
+
+    async def scenario():
+        responses = await asyncio.gather(*(store.run("k", "f", handle) for store in stores))
+        with pytest.raises(IdempotencyKeyMismatch):
+            await stores[1].run("k", "other body", handle)
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [response.body for response in responses] == [b'{"id":"order-1"}'] * 2
+    assert [response.headers.get("idempotent-replayed") for response in responses].count("true") == 1
+
+
+def test_waiting_duplicates_only_read_the_key(repository):
+    claims = []
+
+    class CountingRepository:
+        def __getattr__(self, name):
+            return getattr(repository, name)
+
+        def claim_key(self, *args):
+            claimed = repository.claim_key(*args)
+            claims.append(claimed)
+            return claimed
+
+    store = IdempotencyStore(CountingRepository(), SETTINGS)
+
+    async def handle():
+        await asyncio.sleep(0.1)
+        return JSONResponse(status_code=201, content={})
+
+    async def scenario():
+        original = asyncio.create_task(store.run("k", "f", handle))
+        await asyncio.sleep(0.01)
+        duplicates = await asyncio.gather(*(store.run("k", "f", handle) for _ in range(2)))
+        return [await original, *duplicates]
+
+    responses = asyncio.run(scenario())
+    # ~20 polls per duplicate, but the only write is the original claim.
+    assert claims == [True]
+    assert [response.status_code for response in responses] == [201] * 3
+
+
+def test_duplicate_takes_over_when_the_original_request_is_cancelled(repository):
+    store = IdempotencyStore(repository, SETTINGS)
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return JSONResponse(content={"attempt": len(calls)})
+
+    async def scenario():
+        original = asyncio.create_task(store.run("k", "f", handle))
+        await asyncio.sleep(0.01)
+        duplicate = asyncio.create_task(store.run("k", "f", handle))
+        await asyncio.sleep(0.01)
+        original.cancel()
+        return await duplicate
+
+    response = asyncio.run(scenario())
+    assert response.body == b'{"attempt":2}'
+    assert len(calls) == 2
+
+
+def test_expired_responses_and_abandoned_claims_are_taken_over(repository):
+    now = [1_000_000.0]
+    store = IdempotencyStore(repository, SETTINGS, clock=lambda: now[0])
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        return JSONResponse(content={})
+
+    async def scenario():
+        await store.run("done", "", handle)
+        await store.run("done", "", handle)
+        now[0] += SETTINGS.ttl
+        await store.run("done", "", handle)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+    # A worker died while holding this key: its claim lapses after lock_timeout.
+    assert repository.claim_key("crashed", "", "dead-worker", now[0] + SETTINGS.lock_timeout, now[0])
+    now[0] += SETTINGS.lock_timeout
+    asyncio.run(store.run("crashed", "", handle))
+    assert len(calls) == 3
+
+
+def test_async_repository_replays_stored_responses(db_path):
+    async def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return AsyncSQLiteConnection(conn)
+
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        return JSONResponse(status_code=202, content={"id": "order-1"}, headers={"Preference-Applied": "respond-async"})
+
+    async def scenario():
+        pool = AsyncConnectionPool(connect, PoolSettings(min_size=0, max_size=1))
+        store = IdempotencyStore(
+            AsyncIdempotencyRepository(pool), SETTINGS, replayed_headers=("location", "preference-applied")
+        )
+        try:
+            return await store.run("k", "f", handle), await store.run("k", "f", handle)
+        finally:
+            await pool.close()
+
+    first, replayed = asyncio.run(scenario())
+    assert first.status_code == replayed.status_code == 202
+    assert replayed.headers["preference-applied"] == "respond-async"
+    assert len(calls) == 1
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from order_service.database import apply_schema
+from order_service.jobs import JobSettings, OrderJobWorkers, OrderWaiters, watch_order
+from order_service.payment_client import PaymentResult
+from order_service.repository import OrderRepository
+from order_service.saga import CreateOrderCommand, OrderSaga
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connection_factory() as conn:
+        apply_schema(conn)
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+class RestaurantClient:
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+
+    def confirm_order(self, restaurant_id, order_id, items):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("connection reset")
+        return {"items": [{"menu_item_id": "pizza", "line_total": 9.0}], "total_amount": 9.0}
+
+    def cancel_order(self, restaurant_id, order_id, reason):
+        return None
+
+
+class PaymentClient:
+    def authorize_and_capture(self, order_id, amount):
+        return PaymentResult(reference="pay-1", status="CAPTURED")
+
+
+class BrokenPaymentClient:
+    def authorize_and_capture(self, order_id, amount):
+        raise RuntimeError("payment socket closed")
+
+
+def enqueue(repo, order_id="order-1"):
+    command = CreateOrderCommand(restaurant_id="resto-roma", items=[{"menu_item_id": "pizza", "quantity": 1}])
+    return repo.enqueue_order(order_id, command.restaurant_id, None, command.to_payload())
+
+
+def workers(repo, restaurant, payment=None, **settings):
+    return OrderJobWorkers(
+        repo,
+        lambda: OrderSaga(repo, restaurant, payment or PaymentClient()),
+        JobSettings(workers=1, retry_delay=0, **settings),
+    )
+
+
+def test_enqueued_order_is_pending_until_a_worker_runs_it(repo):
+    assert enqueue(repo).status == "PENDING"
+    pool = workers(repo, RestaurantClient())
+
+    assert asyncio.run(pool.run_once()) is True
+    assert asyncio.run(pool.run_once()) is False
+    record = repo.get_order("order-1")
+    assert record.status == "CONFIRMED"
+    assert record.payment_reference == "pay-1"
+
+
+def test_unexpected_errors_are_retried_then_cancel_the_order(repo):
+    enqueue(repo, "order-retry")
+    pool = workers(repo, RestaurantClient(failures=1), max_attempts=2)
+    asyncio.run(pool.run_once())
+    asyncio.run(pool.run_once())
+    assert repo.get_order("order-retry").status == "CONFIRMED"
+
+    enqueue(repo, "order-broken")
+    pool = workers(repo, RestaurantClient(failures=5), max_attempts=2)
+    while asyncio.run(pool.run_once()):
+        pass
+    record = repo.get_order("order-broken")
+    assert record.status == "CANCELED"
+    assert record.failure_reason == "Verarbeitung fehlgeschlagen: connection reset"
+
+
+def test_final_unexpected_failure_queues_the_restaurant_compensation(repo):
+    enqueue(repo, "order-unpaid")
+    pool = workers(repo, RestaurantClient(), BrokenPaymentClient(), max_attempts=1)
+    asyncio.run(pool.run_once())
+
+    record = repo.get_order("order-unpaid")
+    assert record.status == "CANCELED"
+    assert record.failure_reason == "Verarbeitung fehlgeschlagen: payment socket closed"
+    assert [(message.kind, message.payload["restaurant_id"]) for message in repo.claim_outbox(10, 60)] == [
+        ("restaurant.cancel", "resto-roma")
+    ]
+    assert asyncio.run(pool.run_once()) is False
+
+
+def test_a_cancel_during_the_job_wins_and_the_capture_is_refunded(repo):
+    enqueue(repo, "order-canceled")
+
+    class CancelingPaymentClient:
+        def authorize_and_capture(self, order_id, amount):
+            # The customer cancels while the capture is in flight.
+            OrderSaga(repo, RestaurantClient(), self).cancel(repo.get_order(order_id), "Kunde storniert")
+            return PaymentResult(reference="pay-late", status="CAPTURED")
+
+    pool = workers(repo, RestaurantClient(), CancelingPaymentClient())
+    assert asyncio.run(pool.run_once()) is True
+
+    record = repo.get_order("order-canceled")
+    assert record.status == "CANCELED"
+    assert record.failure_reason == "Kunde storniert"
+    assert record.payment_reference is None
+    assert sorted(
+        (message.kind, message.payload.get("reason") or message.payload.get("reference"))
+        for message in repo.claim_outbox(10, 60)
+    ) == [
+        ("payment.refund", "pay-late"),
+        ("restaurant.cancel", "Kunde storniert"),
+        ("restaurant.cancel", "order_canceled"),
+    ]
+    assert asyncio.run(pool.run_once()) is False
+
+
+def test_expired_lease_is_claimed_again(repo):
+    enqueue(repo)
+    assert repo.claim_job(lease_seconds=-1).attempts == 1
+    assert repo.claim_job(lease_seconds=60).attempts == 2
+    assert repo.claim_job(lease_seconds=60) is None
+
+
+def test_waiters_wake_on_notify():
+    async def scenario():
+        waiters = OrderWaiters()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        loop.call_later(0.01, waiters.notify, "order-1")
+        await waiters.wait("order-1", timeout=5)
+        return loop.time() - started
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_waiters_deliver_records_published_from_worker_threads(repo):
+    record = enqueue(repo)
+
+    async def scenario():
+        waiters = OrderWaiters()
+        async with waiters.subscribe("order-1") as updates:
+            assert waiters.subscribers() == 1
+            await asyncio.to_thread(waiters.publish, record)
+            received = await asyncio.wait_for(updates.get(), 1)
+        return received, waiters.subscribers()
+
+    assert asyncio.run(scenario()) == (record, 0)
+
+
+def test_watch_order_yields_the_stored_state_then_saga_transitions(repo):
+    enqueue(repo)
+
+    async def scenario():
+        waiters = OrderWaiters()
+        saga = OrderSaga(repo, RestaurantClient(), PaymentClient(), on_transition=waiters.publish)
+        command = CreateOrderCommand(restaurant_id="resto-roma", items=[{"menu_item_id": "pizza", "quantity": 1}])
+        seen = []
+        async for record in watch_order(waiters, repo, "order-1", timeout=5, recheck=5):
+            seen.append(record.status)
+            if record.status == "PENDING":
+                asyncio.get_running_loop().run_in_executor(None, saga.resume, "order-1", command)
+            else:
+                break
+        return seen
+
+    assert asyncio.run(scenario()) == ["PENDING", "CONFIRMED"]
+
+
+def test_watch_order_rechecks_the_database_when_nothing_is_published(repo):
+    enqueue(repo)
+
+    async def scenario():
+        seen = []
+        async for record in watch_order(OrderWaiters(), repo, "order-1", timeout=5, recheck=0.01):
+            seen.append(record and record.status)
+            if record is None:
+                # Another process finishes the saga without publishing here.
+                repo.update_order("order-1", status="CANCELED", failure_reason="Restaurant offline")
+            elif record.status == "CANCELED":
+                break
+        return seen
+
+    assert asyncio.run(scenario()) == ["PENDING", None, "CANCELED"]
+
+
+def test_watch_order_ends_for_unknown_orders(repo):
+    async def scenario():
+        return [record async for record in watch_order(OrderWaiters(), repo, "missing", timeout=5, recheck=5)]
+
+    assert asyncio.run(scenario()) == []
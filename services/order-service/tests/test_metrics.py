@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pytest
+
+from order_service.database import apply_schema
+from order_service.metrics import (
+    DB_QUERY_DURATION,
+    SAGA_OUTCOMES,
+    SAGA_STEP_DURATION,
+    Counter,
+    Histogram,
+    Registry,
+)
+from order_service.payment_client import MockPaymentClient
+from order_service.repository import OrderRepository
+from order_service.saga import CreateOrderCommand, OrderSaga
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connection_factory() as conn:
+        apply_schema(conn)
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+class RestaurantClient:
+    def confirm_order(self, restaurant_id, order_id, items):
+        return {"order_id": order_id, "items": items, "total_amount": 10.0}
+
+
+def sample(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets_summed_over_thread_shards():
+    registry = Registry()
+    histogram = registry.register(Histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("demo_events", "Demo"))
+
+    def observe():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, "/orders")
+        counter.inc()
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert sample(text, 'demo_seconds_bucket{route="/orders",le="0.1"}') == 4
+    assert sample(text, 'demo_seconds_bucket{route="/orders",le="1"}') == 8
+    assert sample(text, 'demo_seconds_bucket{route="/orders",le="+Inf"}') == 12
+    assert sample(text, 'demo_seconds_count{route="/orders"}') == 12
+    assert sample(text, "demo_events_total") == 4
+
+
+def test_shards_of_ended_threads_are_folded_not_kept():
+    registry = Registry()
+    counter = registry.register(Counter("demo_churn", "Demo", ("kind",)))
+
+    for _ in range(50):
+        thread = threading.Thread(target=counter.inc, args=("job",))
+        thread.start()
+        thread.join()
+    counter.inc("job")
+
+    assert sample(registry.render(), 'demo_churn_total{kind="job"}') == 51
+    assert len(counter._shards) == 1
+
+
+def test_saga_records_steps_outcomes_and_queries(repo):
+    registry = Registry()
+    for metric in (SAGA_OUTCOMES, SAGA_STEP_DURATION, DB_QUERY_DURATION):
+        registry.register(metric)
+    before = registry.render()
+
+    saga = OrderSaga(repo, RestaurantClient(), MockPaymentClient())
+    saga.place_order(CreateOrderCommand(restaurant_id="resto", items=[{"menu_item_id": "m1", "quantity": 1}]))
+
+    after = registry.render()
+    for prefix, delta in (
+        ('saga_outcomes_total{outcome="confirmed"}', 1),
+        ('saga_step_duration_seconds_count{step="restaurant_confirm",outcome="ok"}', 1),
+        ('saga_step_duration_seconds_count{step="payment_capture",outcome="ok"}', 1),
+        ('db_query_duration_seconds_count{repository="OrderRepository",method="create_order"}', 1),
+        ('db_query_duration_seconds_count{repository="OrderRepository",method="update_order"}', 1),
+    ):
+        assert sample(after, prefix) - sample(before, prefix) == delta
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+
+from order_service.database import (
+    LATEST_SCHEMA_VERSION,
+    MIGRATIONS,
+    AsyncSQLiteConnection,
+    apply_schema,
+    schema_version,
+    schema_version_async,
+)
+
+
+def test_migrations_are_recorded_and_idempotent(tmp_path):
+    conn = sqlite3.connect(tmp_path / "orders.db")
+    assert schema_version(conn) == 0
+
+    apply_schema(conn)
+    apply_schema(conn)
+
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version;")]
+    assert versions == [migration.version for migration in MIGRATIONS]
+    assert schema_version(conn) == LATEST_SCHEMA_VERSION
+
+
+def test_async_schema_version_matches_the_sync_check(tmp_path):
+    conn = sqlite3.connect(tmp_path / "orders.db", check_same_thread=False)
+    assert asyncio.run(schema_version_async(AsyncSQLiteConnection(conn))) == 0
+
+    apply_schema(conn)
+    assert asyncio.run(schema_version_async(AsyncSQLiteConnection(conn))) == LATEST_SCHEMA_VERSION
+
+
+def test_list_orders_uses_updated_at_index(tmp_path):
+    conn = sqlite3.connect(tmp_path / "orders.db")
+    apply_schema(conn)
+
+    plan = " ".join(
+        str(row[-1])
+        for row in conn.execute("EXPLAIN QUERY PLAN SELECT id FROM orders ORDER BY updated_at DESC LIMIT 50;")
+    )
+    assert "idx_orders_updated_at" in plan
+
+
+def test_existing_unversioned_database_is_adopted(tmp_path):
+    conn = sqlite3.connect(tmp_path / "orders.db")
+    conn.executescript(MIGRATIONS[0].sql)
+    conn.execute(
+        "INSERT INTO orders (id, restaurant_id, status, created_at, updated_at)"
+        " VALUES ('order-1', 'resto-roma', 'PENDING', 'now', 'now');"
+    )
+    conn.commit()
+
+    apply_schema(conn)
+
+    assert schema_version(conn) == LATEST_SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(1) FROM orders;").fetchone()[0] == 1
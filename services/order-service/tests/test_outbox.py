@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+
+import httpx
+import pytest
+
+from order_service.database import apply_schema
+from order_service.outbox import OutboxDispatcher, OutboxSettings
+from order_service.payment_client import HTTPPaymentClient, PaymentResult
+from order_service.repository import PAYMENT_REFUND_ORDER, Compensation, OrderRepository
+from order_service.restaurant_client import RestaurantServiceError
+from order_service.saga import OrderSaga
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connection_factory() as conn:
+        apply_schema(conn)
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+class RestaurantClient:
+    def __init__(self):
+        self.canceled = []
+
+    def cancel_order(self, restaurant_id, order_id, reason):
+        if restaurant_id == "resto-down":
+            raise RestaurantServiceError("Restaurant-Kompensation fehlgeschlagen: timeout")
+        if restaurant_id == "resto-gone":
+            raise RestaurantServiceError("Restaurant konnte Order nicht stornieren (404)", 404)
+        self.canceled.append((order_id, reason))
+
+
+class PaymentClient:
+    def __init__(self):
+        self.refunded = []
+
+    def refund(self, reference, amount):
+        self.refunded.append((reference, amount))
+        return PaymentResult(reference=reference, status="REFUNDED")
+
+
+def outbox_rows(repo):
+    with repo._connection() as conn:
+        return {
+            row["order_id"]: (row["status"], row["attempts"])
+            for row in conn.execute("SELECT order_id, status, attempts FROM order_outbox;")
+        }
+
+
+def test_cancel_queues_restaurant_cancel_and_refund_with_the_status_change(repo):
+    repo.create_order("order-1", "resto-roma", None)
+    confirmed = repo.update_order("order-1", status="CONFIRMED", total_amount=18.5, payment_reference="pay-1")
+    restaurant, payment = RestaurantClient(), PaymentClient()
+
+    canceled = OrderSaga(repo, restaurant, payment).cancel(confirmed, "Kunde storniert")
+    assert canceled.status == "CANCELED"
+    assert restaurant.canceled == [] and payment.refunded == []
+
+    dispatcher = OutboxDispatcher(repo, restaurant, payment, OutboxSettings(retry_delay=0))
+    assert asyncio.run(dispatcher.dispatch_once()) == 2
+    assert restaurant.canceled == [("order-1", "Kunde storniert")]
+    assert payment.refunded == [("pay-1", 18.5)]
+    assert outbox_rows(repo) == {}
+
+    OrderSaga(repo, restaurant, payment).cancel(canceled, "nochmal")
+    assert outbox_rows(repo) == {}
+
+
+def test_transient_failures_are_retried_and_client_errors_parked(repo):
+    for order_id, restaurant_id in (("order-down", "resto-down"), ("order-gone", "resto-gone")):
+        repo.create_order(order_id, restaurant_id, None)
+        repo.update_order(
+            order_id,
+            status="CANCELED",
+            compensations=[Compensation.cancel_restaurant(order_id, restaurant_id, "payment_failed")],
+        )
+    dispatcher = OutboxDispatcher(repo, RestaurantClient(), PaymentClient(), OutboxSettings(retry_delay=0))
+
+    asyncio.run(dispatcher.dispatch_once())
+    asyncio.run(dispatcher.dispatch_once())
+
+    assert outbox_rows(repo) == {"order-down": ("PENDING", 2), "order-gone": ("FAILED", 1)}
+
+
+def test_refund_by_order_refunds_every_capture_the_payment_service_reports(repo):
+    requests = []
+
+    def payment_service(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path, request.url.params.get("order_id")))
+        if request.method == "GET":
+            return httpx.Response(
+                200,
+                json=[
+                    {"payment_id": "pay-1", "amount": 12.0, "status": "CAPTURED"},
+                    {"payment_id": "pay-0", "amount": 12.0, "status": "FAILED"},
+                ],
+            )
+        return httpx.Response(200, json={"payment_id": "pay-1", "status": "REFUNDED"})
+
+    payment = HTTPPaymentClient("http://payment", client=httpx.Client(transport=httpx.MockTransport(payment_service)))
+    repo.create_order("order-1", "resto-roma", None)
+    repo.update_order("order-1", status="CANCELED", compensations=[Compensation.refund_order_payments("order-1", 0)])
+
+    dispatcher = OutboxDispatcher(repo, RestaurantClient(), payment, OutboxSettings(retry_delay=0))
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+    assert requests == [("GET", "/payments", "order-1"), ("POST", "/payments/pay-1/refund", None)]
+    assert outbox_rows(repo) == {}
+
+    # A delayed lookup is not claimed before its time.
+    repo.update_order("order-1", status="CANCELED", compensations=[Compensation.refund_order_payments("order-1", 60)])
+    assert asyncio.run(dispatcher.dispatch_once()) == 0
+    assert [message.kind for message in repo.claim_outbox(10, 60)] == []
+    with repo._connection() as conn:
+        assert conn.execute("SELECT kind FROM order_outbox;").fetchone()["kind"] == PAYMENT_REFUND_ORDER
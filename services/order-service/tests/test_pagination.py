@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from order_service.database import apply_schema
+from order_service.repository import InvalidCursorError, OrderFilter, OrderRepository
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connection_factory() as conn:
+        apply_schema(conn)
+        conn.executemany(
+            """
+            INSERT INTO orders (id, customer_reference, restaurant_id, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?);
+            """,
+            [
+                (
+                    f"order-{index:02d}",
+                    "acme" if index % 2 else None,
+                    "resto-roma" if index < 5 else "resto-kyoto",
+                    "CONFIRMED" if index % 3 else "CANCELED",
+                    "2024-05-01T10:00:00+00:00",
+                    # two orders share each timestamp to exercise the id tie-breaker
+                    f"2024-05-01T10:{index // 2:02d}:00+00:00",
+                )
+                for index in range(9)
+            ],
+        )
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+def test_cursor_pages_cover_all_orders_once(repo):
+    seen = []
+    cursor = None
+    while True:
+        page = repo.list_orders_page(limit=2, cursor=cursor)
+        seen.extend(record.id for record in page.records)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    assert seen == [f"order-{index:02d}" for index in reversed(range(9))]
+
+
+def test_filters_combine_with_pagination(repo):
+    filters = OrderFilter(
+        status="CONFIRMED",
+        restaurant_id="resto-roma",
+        updated_from="2024-05-01T10:01:00+00:00",
+    )
+    first = repo.list_orders_page(limit=1, filters=filters)
+    second = repo.list_orders_page(limit=5, filters=filters, cursor=first.next_cursor)
+
+    assert [record.id for record in first.records + second.records] == ["order-04", "order-02"]
+    assert second.next_cursor is None
+    assert [record.id for record in repo.list_orders(filters=OrderFilter(customer_reference="acme"), limit=2)] == [
+        "order-07",
+        "order-05",
+    ]
+
+
+def test_invalid_cursor_is_rejected(repo):
+    with pytest.raises(InvalidCursorError):
+        repo.list_orders_page(cursor="not-a-cursor")
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from order_service.database import ConnectionPool, PoolSettings, PoolTimeout, apply_schema
+from order_service.repository import OrderRepository
+
+
+@pytest.fixture()
+def connect(tmp_path):
+    db_path = tmp_path / "orders.db"
+    opened: list[sqlite3.Connection] = []
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        opened.append(conn)
+        return conn
+
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+
+    connection_factory.opened = opened
+    return connection_factory
+
+
+def test_repository_reuses_pooled_connection(connect):
+    pool = ConnectionPool(connect, PoolSettings(min_size=1, max_size=2))
+    repo = OrderRepository(pool=pool)
+
+    repo.create_order("order-1", "resto-roma", None)
+    repo.update_order("order-1", status="CONFIRMED", total_amount=12.5)
+    record = repo.get_order("order-1")
+
+    assert record.status == "CONFIRMED"
+    assert len(connect.opened) == 1
+    stats = pool.stats()
+    assert stats["requests_total"] == 3
+    assert stats["idle"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_pool_times_out_when_exhausted(connect):
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=1, timeout=0.05))
+
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["requests_waited"] == 1
+
+
+def test_zero_timeout_fails_at_once_instead_of_waiting(connect):
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=1, timeout=30))
+
+    with pool.connection():
+        started = time.monotonic()
+        with pytest.raises(PoolTimeout):
+            with pool.connection(timeout=0):
+                pass
+        assert time.monotonic() - started < 1
+    with pool.connection(timeout=0):
+        pass
+
+    assert pool.stats()["waiting"] == 0
+
+
+def test_waiter_receives_released_connection(connect):
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=1, timeout=2))
+    borrowed = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            borrowed.set()
+            release.wait(1)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    borrowed.wait(1)
+    threading.Timer(0.05, release.set).start()
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    worker.join()
+
+    assert len(connect.opened) == 1
+    assert pool.stats()["wait_time_max_ms"] > 0
+
+
+def test_connections_are_recycled_after_max_lifetime(connect):
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=1, max_lifetime=0.001))
+
+    with pool.connection():
+        pass
+    time.sleep(0.01)
+    with pool.connection():
+        pass
+
+    assert len(connect.opened) == 2
+    assert pool.stats()["connections_discarded"] >= 1
+
+
+def test_reset_after_fork_forgets_the_inherited_pool_without_closing_it(monkeypatch):
+    from order_service import database
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    inherited = ConnectionPool(lambda: conn, PoolSettings(min_size=1, max_size=1))
+    inherited.open()
+    monkeypatch.setattr(database, "_pool", inherited)
+
+    database.reset_pool_after_fork()
+
+    assert database._pool is None
+    # The parent still owns this socket; the child must not have closed it.
+    assert conn.execute("SELECT 1;").fetchone() == (1,)
+    inherited.close()
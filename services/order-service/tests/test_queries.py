@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from order_service.database import apply_schema
+from order_service.repository import (
+    _SELECT_ORDERS_BY_ID_SQL,
+    Compensation,
+    OrderFilter,
+    OrderRepository,
+    _delete_outbox_query,
+    _list_orders_query,
+    _select_by_ids,
+    _sql,
+)
+
+
+class Connection:
+    """Stands in for a psycopg connection; only the module name selects the dialect."""
+
+    __module__ = "psycopg"
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connection_factory() as conn:
+        apply_schema(conn)
+    return OrderRepository(connection_factory=connection_factory)
+
+
+def test_statements_are_rendered_once_per_dialect():
+    pg, lite = Connection(), sqlite3.connect(":memory:")
+
+    assert _sql(pg, _SELECT_ORDERS_BY_ID_SQL) is _sql(pg, _SELECT_ORDERS_BY_ID_SQL)
+    assert "WHERE id = ANY(%s);" in _sql(pg, _SELECT_ORDERS_BY_ID_SQL)
+    assert "WHERE id IN (SELECT value FROM json_each(?));" in _sql(lite, _SELECT_ORDERS_BY_ID_SQL)
+
+
+def test_id_lists_bind_one_parameter_whatever_their_length():
+    pg, lite = Connection(), sqlite3.connect(":memory:")
+
+    one, three = _select_by_ids(pg, ["a"]), _select_by_ids(pg, ["a", "b", "c"])
+    assert one[0] is three[0]
+    assert three[1] == [["a", "b", "c"]]
+    assert _delete_outbox_query(lite, ["a", "b"])[1] == ['["a", "b"]']
+
+
+def test_list_query_text_is_shared_between_equal_filter_shapes():
+    pg = Connection()
+    first, params = _list_orders_query(pg, 10, OrderFilter(status="CONFIRMED"), None)
+    second, _ = _list_orders_query(pg, 20, OrderFilter(status="CANCELED"), None)
+
+    assert first is second
+    assert "status = %s" in first and "LIMIT %s" in first
+    assert params == ["CONFIRMED", 10]
+
+
+def test_get_orders_and_complete_outbox_on_sqlite(repo):
+    repo.create_orders([(f"order-{index}", "resto-roma", None) for index in range(3)])
+
+    assert set(repo.get_orders(["order-0", "order-2", "missing"])) == {"order-0", "order-2"}
+
+    repo.update_order(
+        "order-1",
+        status="CANCELED",
+        compensations=[Compensation("order-1", "restaurant_cancel", {}), Compensation("order-1", "refund", {})],
+    )
+    messages = repo.claim_outbox(limit=10, lease_seconds=60)
+    repo.complete_outbox([message.id for message in messages])
+    assert len(messages) == 2
+    assert repo.claim_outbox(limit=10, lease_seconds=0) == []
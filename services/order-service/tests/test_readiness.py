@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from order_service import schemas
+from order_service.database import LATEST_SCHEMA_VERSION, PoolTimeout
+from order_service.readiness import (
+    ReadinessProbe,
+    ReadinessSettings,
+    circuit_check,
+    database_check,
+    pool_check,
+    readiness_response,
+)
+from order_service.resilience import Downstream, ResilienceSettings
+from order_service.restaurant_client import RestaurantClient, RestaurantServiceError
+
+OK = schemas.ReadinessCheck(status="ok")
+
+
+def pool_stats(size: int, idle: int, waiting: int, max_size: int = 2) -> dict:
+    return {"size": size, "idle": idle, "waiting": waiting, "max_size": max_size}
+
+
+def test_probe_caches_and_coalesces_concurrent_checks():
+    calls = []
+
+    async def check() -> schemas.ReadinessResponse:
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return readiness_response({"database": OK}, LATEST_SCHEMA_VERSION)
+
+    async def scenario():
+        probe = ReadinessProbe(check, ReadinessSettings(cache_ttl=60))
+        results = await asyncio.gather(*(probe.result() for _ in range(10)))
+        await probe.result()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {result.status for result in results} == {"ready"}
+
+
+def test_probe_serves_the_last_verdict_while_a_check_is_slow():
+    release = asyncio.Event()
+    calls = []
+
+    async def check() -> schemas.ReadinessResponse:
+        calls.append(None)
+        if len(calls) > 1:
+            await release.wait()
+        return readiness_response({"database": OK}, LATEST_SCHEMA_VERSION)
+
+    async def scenario():
+        probe = ReadinessProbe(check, ReadinessSettings(cache_ttl=0))
+        first = await probe.result()
+        # The second check hangs; probes must neither wait for it nor start more.
+        stale = await asyncio.wait_for(asyncio.gather(*(probe.result() for _ in range(5))), 1)
+        release.set()
+        await asyncio.sleep(0)
+        return first, stale
+
+    first, stale = asyncio.run(scenario())
+    assert all(result is first for result in stale)
+    assert len(calls) == 2
+
+
+def test_probe_checks_again_once_the_cache_expires():
+    calls = []
+
+    async def check() -> schemas.ReadinessResponse:
+        calls.append(None)
+        return readiness_response({"database": OK}, LATEST_SCHEMA_VERSION)
+
+    async def scenario():
+        probe = ReadinessProbe(check, ReadinessSettings(cache_ttl=0))
+        await probe.result()
+        await probe.result()
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    ("stats", "expected"),
+    [
+        (pool_stats(size=1, idle=0, waiting=0), "ok"),
+        (pool_stats(size=2, idle=1, waiting=0), "ok"),
+        (pool_stats(size=2, idle=0, waiting=0), "degraded"),
+        (pool_stats(size=2, idle=0, waiting=3), "degraded"),
+    ],
+)
+def test_pool_check(stats, expected):
+    assert pool_check(stats).status == expected
+
+
+def test_database_check_reports_unreachable_and_outdated_schemas():
+    async def outdated() -> int:
+        return LATEST_SCHEMA_VERSION - 1
+
+    async def unreachable() -> int:
+        raise ConnectionRefusedError("connection refused")
+
+    check, version = asyncio.run(database_check(outdated))
+    assert (check.status, version) == ("unavailable", LATEST_SCHEMA_VERSION - 1)
+    assert "Bootstrap" in check.detail
+
+    check, version = asyncio.run(database_check(unreachable))
+    assert (check.status, version) == ("unavailable", None)
+    assert check.detail == "Datenbank nicht erreichbar: connection refused"
+
+
+def test_database_check_only_degrades_when_no_connection_is_free():
+    async def busy() -> int:
+        raise PoolTimeout("Keine DB-Verbindung innerhalb von 0s verfügbar.")
+
+    check, version = asyncio.run(database_check(busy))
+    assert (check.status, version) == ("degraded", None)
+
+
+def test_open_circuit_is_reported_without_affecting_the_verdict():
+    downstream = Downstream("restaurant", ResilienceSettings(failure_threshold=1, retries=0, min_samples=4))
+    client = RestaurantClient(
+        "http://restaurant",
+        client=httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(500))),
+        downstream=downstream,
+    )
+    assert circuit_check(downstream) == OK
+
+    with pytest.raises(RestaurantServiceError):
+        client.confirm_order("resto", "order-1", [])
+    check = circuit_check(downstream)
+    assert check.status == "degraded"
+
+    response = readiness_response({"database": OK}, LATEST_SCHEMA_VERSION, {"restaurant": check})
+    assert response.status == "ready"
+    assert response.downstreams["restaurant"].status == "degraded"
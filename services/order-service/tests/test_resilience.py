@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from order_service.resilience import CircuitOpenError, Downstream, ResilienceSettings
+from order_service.restaurant_client import AsyncRestaurantClient, RestaurantClient, RestaurantServiceError
+
+SETTINGS = ResilienceSettings(failure_threshold=3, reset_timeout=10, retries=2, retry_backoff=0, min_samples=4)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def transport(statuses: list[int], seen: list[httpx.Request]) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(statuses.pop(0) if statuses else 200, json={"order_id": "order-1"})
+
+    return httpx.MockTransport(handler)
+
+
+def test_breaker_opens_rejects_and_closes_after_a_successful_probe():
+    clock, seen = Clock(), []
+    downstream = Downstream("restaurant", SETTINGS, clock=clock)
+    client = RestaurantClient(
+        "http://restaurant", client=httpx.Client(transport=transport([500] * 3, seen)), downstream=downstream
+    )
+
+    for _ in range(3):
+        with pytest.raises(RestaurantServiceError):
+            client.confirm_order("resto", "order-1", [])
+    with pytest.raises(RestaurantServiceError, match="Circuit 'restaurant' ist offen"):
+        client.confirm_order("resto", "order-1", [])
+
+    assert len(seen) == 3
+    assert downstream.stats()["state"] == "open"
+    assert downstream.retry_after() == 10
+
+    clock.now = 10
+    assert downstream.retry_after() is None
+    assert client.confirm_order("resto", "order-1", []) == {"order_id": "order-1"}
+    assert downstream.stats()["state"] == "closed"
+
+
+def test_failed_probe_reopens_the_circuit():
+    clock = Clock()
+    downstream = Downstream("payment", SETTINGS, clock=clock)
+    for _ in range(3):
+        downstream.call(lambda timeout: httpx.Response(500))
+
+    clock.now = 11
+    downstream.call(lambda timeout: httpx.Response(503))
+
+    with pytest.raises(CircuitOpenError):
+        downstream.call(lambda timeout: httpx.Response(200))
+    assert downstream.stats()["rejected"] == 1
+
+
+def test_only_idempotent_calls_are_retried():
+    seen = []
+    downstream = Downstream("restaurant", ResilienceSettings(retries=2, retry_backoff=0))
+    client = httpx.Client(transport=transport([503, 503, 503, 503], seen))
+
+    first = downstream.call(lambda timeout: client.post("http://r/a", timeout=timeout), idempotent=True)
+    second = downstream.call(lambda timeout: client.post("http://r/b", timeout=timeout))
+
+    assert first.status_code == 503 and second.status_code == 503
+    assert [request.url.path for request in seen] == ["/a", "/a", "/a", "/b"]
+    assert downstream.stats()["retries"] == 2
+
+
+def test_timeout_follows_observed_latency_within_bounds():
+    clock = Clock()
+    downstream = Downstream(
+        "restaurant", ResilienceSettings(min_samples=8, timeout_multiplier=3, min_timeout=0.25), clock=clock
+    )
+    timeouts = []
+
+    def send(timeout):
+        timeouts.append(timeout.read)
+        clock.now += 0.2
+        return httpx.Response(200)
+
+    for _ in range(16):
+        downstream.call(send)
+
+    assert timeouts[0] == 5.0
+    assert timeouts[-1] == pytest.approx(0.6)
+    stats = downstream.stats()
+    assert stats["latency_count"] == 16
+    assert {"le": 0.25, "count": 16} in stats["latency_buckets"]
+
+
+def test_async_client_shares_the_breaker():
+    clock, seen = Clock(), []
+    downstream = Downstream("restaurant", SETTINGS, clock=clock)
+    client = AsyncRestaurantClient(
+        "http://restaurant",
+        client=httpx.AsyncClient(transport=transport([], seen)),
+        downstream=downstream,
+    )
+    for _ in range(3):
+        downstream.call(lambda timeout: httpx.Response(500))
+
+    with pytest.raises(RestaurantServiceError):
+        asyncio.run(client.cancel_order("resto", "order-1", None))
+    assert seen == []
@@ -4,9 +4,9 @@ import sqlite3
 
 import pytest
 
-from order_service.database import apply_schema
+from order_service.database import ConnectionPool, PoolSettings, apply_schema
 from order_service.payment_client import PaymentClient, PaymentResult, PaymentServiceError
-from order_service.repository import OrderRepository
+from order_service.repository import OrderExistsError, OrderRepository
 from order_service.restaurant_client import RestaurantServiceError
 from order_service.saga import CreateOrderCommand, OrderSaga
 
@@ -143,3 +143,61 @@ def test_list_orders(repo):
     )
     entries = repo.list_orders(limit=10)
     assert any(entry.id == "order-5" for entry in entries)
+
+
+def test_saga_holds_no_connection_during_downstream_calls(tmp_path):
+    db_path = tmp_path / "traced.db"
+    statements, in_use_during_calls = [], []
+
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=1))
+
+    class ObservedRestaurantClient(SuccessfulRestaurantClient):
+        def confirm_order(self, restaurant_id, order_id, items):
+            in_use_during_calls.append(pool.stats()["in_use"])
+            return super().confirm_order(restaurant_id, order_id, items)
+
+    class ObservedPaymentClient(SuccessfulPaymentClient):
+        def authorize_and_capture(self, order_id, amount):
+            in_use_during_calls.append(pool.stats()["in_use"])
+            return super().authorize_and_capture(order_id, amount)
+
+    saga = OrderSaga(OrderRepository(pool=pool), ObservedRestaurantClient(), ObservedPaymentClient())
+    record = saga.place_order(
+        CreateOrderCommand(
+            restaurant_id="resto-roma",
+            items=[{"menu_item_id": "roma-carbonara", "quantity": 1}],
+            order_id="order-6",
+        )
+    )
+    pool.close()
+
+    assert record.status == "CONFIRMED"
+    assert record.payment_reference == "pay-123"
+    assert in_use_during_calls == [0, 0]
+    assert not any(sql.lstrip().startswith("SELECT") for sql in statements)
+    assert sum("RETURNING" in sql for sql in statements) == 1
+
+
+def test_existing_order_id_is_rejected_by_the_insert(repo):
+    saga = OrderSaga(repo, SuccessfulRestaurantClient(), SuccessfulPaymentClient())
+    command = CreateOrderCommand(
+        restaurant_id="resto-roma",
+        items=[{"menu_item_id": "roma-carbonara", "quantity": 1}],
+        order_id="order-7",
+    )
+    saga.place_order(command)
+
+    with pytest.raises(OrderExistsError):
+        saga.place_order(command)
+    with pytest.raises(OrderExistsError):
+        repo.enqueue_order("order-7", "resto-roma", None, command.to_payload())
+    assert repo.get_order("order-7").status == "CONFIRMED"
+    assert repo.claim_job(60) is None
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import sqlite3
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mifos_observability.tracing import TRACER, InMemoryExporter, Tracer, TracingMiddleware, parse_traceparent
+
+from order_service.app import create_app
+from order_service.database import apply_schema
+from order_service.http_clients import _inject_traceparent
+from order_service.payment_client import MockPaymentClient
+from order_service.repository import OrderRepository
+from order_service.resilience import Downstream
+from order_service.restaurant_client import RestaurantClient
+from order_service.saga import CreateOrderCommand, OrderSaga
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    db_path = tmp_path / "orders.db"
+
+    def connection_factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connection_factory() as conn:
+        apply_schema(conn)
+
+    return OrderRepository(connection_factory=connection_factory)
+
+
+@pytest.fixture()
+def exporter():
+    previous = (TRACER.exporter, TRACER.sample_ratio)
+    exporter = InMemoryExporter()
+    TRACER.configure(exporter, 1.0)
+    yield exporter
+    TRACER.configure(*previous)
+
+
+def restaurant_client(seen: list[httpx.Request]) -> RestaurantClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={"order_id": "order-1", "items": [], "total_amount": 10.0})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler), event_hooks={"request": [_inject_traceparent]})
+    return RestaurantClient("http://restaurant", client=client, downstream=Downstream("restaurant"))
+
+
+def place_order(repo, seen):
+    saga = OrderSaga(repo, restaurant_client(seen), MockPaymentClient())
+    with TRACER.span("POST /orders", kind="server"):
+        saga.place_order(CreateOrderCommand(restaurant_id="resto", items=[{"menu_item_id": "m1", "quantity": 1}]))
+
+
+def test_traceparent_parsing():
+    context = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert context.sampled and context.traceparent.endswith("00f067aa0ba902b7-01")
+    assert parse_traceparent("00-00000000000000000000000000000000-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_saga_steps_queries_and_downstream_calls_share_one_trace(repo, exporter):
+    seen = []
+    place_order(repo, seen)
+
+    spans = {span.name: span for span in exporter.spans}
+    assert {span.trace_id for span in exporter.spans} == {spans["POST /orders"].trace_id}
+    assert spans["saga restaurant_confirm"].parent_id == spans["POST /orders"].span_id
+    assert spans["restaurant call"].parent_id == spans["saga restaurant_confirm"].span_id
+    assert spans["db OrderRepository.create_order"].parent_id == spans["POST /orders"].span_id
+
+    outgoing = parse_traceparent(seen[0].headers["traceparent"])
+    assert outgoing.trace_id == spans["POST /orders"].trace_id
+    assert outgoing.span_id == spans["restaurant call"].span_id
+
+
+def test_unsampled_traces_record_nothing_but_still_propagate(repo, exporter):
+    TRACER.configure(sample_ratio=0.0)
+    seen = []
+    place_order(repo, seen)
+
+    assert exporter.spans == []
+    assert seen[0].headers["traceparent"].endswith("-00")
+
+
+def test_middleware_continues_the_callers_trace():
+    exporter = InMemoryExporter()
+    tracer = Tracer("test-service", exporter, sample_ratio=0.0)
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+
+    @app.get("/orders/{order_id}")
+    async def get_order(order_id: str):
+        return {"traceparent": tracer.traceparent()}
+
+    parent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    response = TestClient(app).get("/orders/1", headers={"traceparent": parent})
+
+    (span,) = exporter.spans
+    assert span.name == "GET /orders/{order_id}"
+    assert span.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert span.parent_id == "00f067aa0ba902b7"
+    assert span.attributes["http.status_code"] == 200
+    assert response.json()["traceparent"] == f"00-{span.trace_id}-{span.span_id}-01"
+
+
+def test_the_app_names_the_shared_tracer(exporter):
+    previous = TRACER.service
+    try:
+        create_app()
+        with TRACER.span("startup"):
+            pass
+    finally:
+        TRACER.configure(service=previous)
+
+    assert exporter.spans[0].attributes["service.name"] == "order-service"
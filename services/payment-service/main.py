@@ -10,6 +10,10 @@ app = create_app()
 if __name__ == "__main__":
     import uvicorn
 
+    from payment_service.database import init_db
+
+    # Local development only: containers run ``python -m payment_service.bootstrap`` once instead.
+    init_db()
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -1,10 +1,30 @@
 from __future__ import annotations
 
-from fastapi import Depends, FastAPI, HTTPException, status
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
 
-from .database import init_db
-from .repository import PaymentRepository
-from .schemas import HealthResponse, PaymentRequest, PaymentSummary, RefundRequest
+from fastapi import Depends, FastAPI, Header, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from mifos_db.idempotency import IdempotencyKeyMismatch, IdempotencyStore, fingerprint
+from mifos_observability.tracing import TRACER, TracingMiddleware
+from pydantic import BaseModel
+
+from .database import close_pool, get_pool, schema_version
+from .metrics import CONTENT_TYPE, DB_POOL_CONNECTIONS, HTTP_REQUEST_DURATION, REGISTRY, MetricsMiddleware
+from .readiness import DEGRADED, OK, UNAVAILABLE, ReadinessProbe, database_check, pool_check, readiness_response
+from .repository import IdempotencyRepository, PaymentRecord, PaymentRepository
+from .schemas import (
+    BatchPaymentRequest,
+    HealthResponse,
+    PaymentRequest,
+    PaymentSummary,
+    PoolStats,
+    ReadinessCheck,
+    ReadinessResponse,
+    RefundRequest,
+)
 from .service import PaymentDeclined, PaymentProcessor, RefundError
 
 
@@ -16,43 +36,125 @@ def build_processor(repo: PaymentRepository = Depends(get_repository)) -> Paymen
     return PaymentProcessor(repo)
 
 
+MAX_BATCH_SIZE = int(os.environ.get("PAYMENTS_MAX_BATCH_SIZE", "100"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No connection is opened here: workers boot while the database is still
+    # unreachable and connect on first use; /readyz reports when they can serve.
+    app.state.readiness = ReadinessProbe(_check_readiness)
+    app.state.idempotency = IdempotencyStore(IdempotencyRepository())
+    try:
+        yield
+    finally:
+        close_pool()
+
+
+def _pool_samples():
+    stats = get_pool().stats()
+    return [((state,), stats[state]) for state in ("idle", "in_use", "waiting")]
+
+
+def _schema_version() -> int:
+    with get_pool().connection(timeout=0) as conn:
+        return schema_version(conn)
+
+
+async def _check_readiness() -> ReadinessResponse:
+    checks = {"db_pool": pool_check(get_pool().stats())}
+    version = None
+    if checks["db_pool"].status != OK:
+        # Every connection is in use; the check must not take one from a request.
+        checks["database"] = ReadinessCheck(status=DEGRADED, detail="Nicht geprüft: Pool ausgelastet")
+    else:
+        checks["database"], version = await database_check(lambda: run_in_threadpool(_schema_version))
+    return readiness_response(checks, version)
+
+
 def create_app() -> FastAPI:
-    init_db()
     app = FastAPI(
         title="Payment Service",
         version="0.1.0",
         description="Autorisiert, captured und refundet Zahlungen.",
+        lifespan=lifespan,
     )
+    app.add_middleware(MetricsMiddleware, histogram=HTTP_REQUEST_DURATION)
+    TRACER.configure(service="payment-service")
+    app.add_middleware(TracingMiddleware, tracer=TRACER)
+    DB_POOL_CONNECTIONS.collect = _pool_samples
 
     @app.get("/healthz", response_model=HealthResponse)
     async def healthz() -> HealthResponse:
         return HealthResponse()
 
+    @app.get("/readyz", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+    async def readyz(response: Response) -> ReadinessResponse:
+        """``503`` when this instance cannot serve (DB unreachable, schema behind); a busy pool only degrades."""
+        readiness = await app.state.readiness.result()
+        if readiness.status == UNAVAILABLE:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return readiness
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    @app.get("/internal/db-pool", response_model=PoolStats)
+    async def db_pool_stats() -> PoolStats:
+        return PoolStats(**get_pool().stats())
+
     @app.post("/payments", response_model=PaymentSummary, status_code=status.HTTP_201_CREATED)
     async def create_payment(
         payload: PaymentRequest,
+        idempotency_key: Optional[str] = Header(None),
         processor: PaymentProcessor = Depends(build_processor),
-    ) -> PaymentSummary:
-        try:
-            record = processor.create_payment(payload.order_id, payload.amount)
-        except PaymentDeclined as exc:
-            raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=str(exc))
-        return PaymentSummary(
-            payment_id=record.id,
-            order_id=record.order_id,
-            amount=record.amount,
-            status=record.status,
-            failure_reason=record.failure_reason,
-            created_at=record.created_at,
-            updated_at=record.updated_at,
-        )
+    ) -> Response:
+        async def handle() -> Response:
+            try:
+                record = await run_in_threadpool(processor.create_payment, payload.order_id, payload.amount)
+            except PaymentDeclined as exc:
+                raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=str(exc))
+            return JSONResponse(status_code=status.HTTP_201_CREATED, content=_summary(record).model_dump())
+
+        return await _idempotent(app, "POST /payments", idempotency_key, payload, handle)
+
+    @app.post("/payments/batch", response_model=list[PaymentSummary])
+    async def create_payments(
+        payload: BatchPaymentRequest,
+        idempotency_key: Optional[str] = Header(None),
+        processor: PaymentProcessor = Depends(build_processor),
+    ) -> Response:
+        if len(payload.payments) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Maximal {MAX_BATCH_SIZE} Zahlungen pro Batch erlaubt.",
+            )
+
+        async def handle() -> Response:
+            records = await run_in_threadpool(
+                processor.create_payments,
+                [(payment.order_id, payment.amount) for payment in payload.payments],
+            )
+            return JSONResponse(content=[_summary(record).model_dump() for record in records])
+
+        return await _idempotent(app, "POST /payments/batch", idempotency_key, payload, handle)
+
+    @app.get("/payments", response_model=list[PaymentSummary])
+    async def list_payments(
+        order_id: str,
+        repo: PaymentRepository = Depends(get_repository),
+    ) -> list[PaymentSummary]:
+        """Payments of one order; the order service looks up captures whose answer it never got."""
+        records = await run_in_threadpool(repo.list_payments, order_id)
+        return [_summary(record) for record in records]
 
     @app.get("/payments/{payment_id}", response_model=PaymentSummary)
     async def get_payment(
         payment_id: str,
         repo: PaymentRepository = Depends(get_repository),
     ) -> PaymentSummary:
-        record = repo.get_payment(payment_id)
+        record = await run_in_threadpool(repo.get_payment, payment_id)
         if record is None:
             raise HTTPException(status_code=404, detail="Payment not found")
         return PaymentSummary(
@@ -72,7 +174,7 @@ def create_app() -> FastAPI:
         processor: PaymentProcessor = Depends(build_processor),
     ) -> PaymentSummary:
         try:
-            record = processor.refund(payment_id)
+            record = await run_in_threadpool(processor.refund, payment_id)
         except RefundError as exc:
             raise HTTPException(status_code=400, detail=str(exc))
         return PaymentSummary(
@@ -86,3 +188,31 @@ def create_app() -> FastAPI:
         )
 
     return app
+
+
+async def _idempotent(
+    app: FastAPI,
+    route: str,
+    key: str | None,
+    payload: BaseModel,
+    handler: Callable[[], Awaitable[Response]],
+) -> Response:
+    """Run ``handler`` once per ``Idempotency-Key``; retries get the stored response."""
+    if key is None:
+        return await handler()
+    try:
+        return await app.state.idempotency.run(f"{route} {key}", fingerprint(payload), handler)
+    except IdempotencyKeyMismatch as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+def _summary(record: PaymentRecord) -> PaymentSummary:
+    return PaymentSummary(
+        payment_id=record.id,
+        order_id=record.order_id,
+        amount=record.amount,
+        status=record.status,
+        failure_reason=record.failure_reason,
+        created_at=record.created_at,
+        updated_at=record.updated_at,
+    )
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import functools
+import json
 import sqlite3
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Sequence
 
-from .database import get_connection
+from mifos_db.idempotency import IdempotencyRecord
+from mifos_db.sql import DIALECTS as _DIALECTS
+from mifos_db.sql import dialect as _dialect
+from mifos_db.sql import id_list as _id_list
+from mifos_db.sql import sql as _sql
+
+from .database import ConnectionPool, get_pool
+from .metrics import instrument_queries
 
 
 @dataclass(frozen=True)
@@ -20,77 +29,250 @@ class PaymentRecord:
     updated_at: str
 
 
+# A second successful capture for an order is skipped (uq_payments_captured_order_id);
+# RETURNING reports which rows went in.
+_INSERT_PAYMENTS_SQL = """
+INSERT INTO payments (id, order_id, amount, status, failure_reason, created_at, updated_at)
+VALUES {rows}
+ON CONFLICT (order_id) WHERE status = 'CAPTURED' DO NOTHING
+RETURNING id;
+"""
+
+_PAYMENT_ROW = "({p}, {p}, {p}, {p}, {p}, {p}, {p})"
+
+_UPDATE_STATUS_SQL = """
+UPDATE payments
+SET status = {p}, failure_reason = {p}, updated_at = {p}
+WHERE id = {p};
+"""
+
+_SELECT_PAYMENT_SQL = """
+SELECT id, order_id, amount, status, failure_reason, created_at, updated_at
+FROM payments
+WHERE id = {p};
+"""
+
+_SELECT_ORDER_PAYMENTS_SQL = """
+SELECT id, order_id, amount, status, failure_reason, created_at, updated_at
+FROM payments
+WHERE order_id = {p}
+ORDER BY created_at, id;
+"""
+
+_SELECT_CAPTURES_SQL = """
+SELECT id, order_id, amount, status, failure_reason, created_at, updated_at
+FROM payments
+WHERE status = 'CAPTURED' AND order_id {in_ids};
+"""
+
+# A key is claimed by inserting it, or by taking over a row whose claim or stored
+# response has expired; RETURNING tells the caller whether the claim went through.
+_CLAIM_IDEMPOTENCY_KEY_SQL = """
+INSERT INTO idempotency_keys (idempotency_key, fingerprint, owner, expires_at)
+VALUES ({p}, {p}, {p}, {p})
+ON CONFLICT (idempotency_key) DO UPDATE SET
+    fingerprint = excluded.fingerprint,
+    owner = excluded.owner,
+    status_code = NULL,
+    body = NULL,
+    headers_json = NULL,
+    media_type = NULL,
+    expires_at = excluded.expires_at
+WHERE idempotency_keys.expires_at <= {p}
+RETURNING idempotency_key;
+"""
+
+_SELECT_IDEMPOTENCY_KEY_SQL = """
+SELECT fingerprint, status_code, body, headers_json, media_type, expires_at
+FROM idempotency_keys
+WHERE idempotency_key = {p};
+"""
+
+_STORE_IDEMPOTENT_RESPONSE_SQL = """
+UPDATE idempotency_keys
+SET status_code = {p}, body = {p}, headers_json = {p}, media_type = {p}, expires_at = {p}
+WHERE idempotency_key = {p} AND owner = {p};
+"""
+
+_RELEASE_IDEMPOTENCY_KEY_SQL = """
+DELETE FROM idempotency_keys
+WHERE idempotency_key = {p} AND owner = {p} AND status_code IS NULL;
+"""
+
+_PURGE_IDEMPOTENCY_KEYS_SQL = "DELETE FROM idempotency_keys WHERE expires_at <= {p};"
+
+
+@instrument_queries
 class PaymentRepository:
-    def __init__(self, connection_factory=get_connection):
+    def __init__(self, connection_factory=None, pool: ConnectionPool | None = None):
+        if connection_factory is None and pool is None:
+            pool = get_pool()
         self._connection_factory = connection_factory
+        self._pool = pool
 
     @contextmanager
     def _connection(self):
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
         conn = self._connection_factory()
         try:
             yield conn
         finally:
             conn.close()
 
-    def insert_payment(self, record: PaymentRecord) -> None:
+    def insert_payment(self, record: PaymentRecord) -> PaymentRecord:
+        return self.insert_payments([record])[0]
+
+    def insert_payments(self, records: Sequence[PaymentRecord]) -> list[PaymentRecord]:
+        """Insert all records in one round trip and one transaction.
+
+        Returns the stored records: where an order already has a successful
+        capture, that capture takes the place of the new one.
+        """
+        if not records:
+            return []
         with self._connection() as conn:
-            placeholder = _placeholder(conn)
-            conn.execute(
-                f"""
-                INSERT INTO payments (id, order_id, amount, status, failure_reason, created_at, updated_at)
-                VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder});
-                """,
-                (
-                    record.id,
-                    record.order_id,
-                    record.amount,
-                    record.status,
-                    record.failure_reason,
-                    record.created_at,
-                    record.updated_at,
-                ),
-            )
+            params: list = []
+            for record in records:
+                params.extend(
+                    (
+                        record.id,
+                        record.order_id,
+                        record.amount,
+                        record.status,
+                        record.failure_reason,
+                        record.created_at,
+                        record.updated_at,
+                    )
+                )
+            inserted = {row["id"] for row in conn.execute(_insert_payments_sql(_dialect(conn), len(records)), params)}
+            skipped = [record.order_id for record in records if record.id not in inserted]
+            captures = {}
+            if skipped:
+                rows = conn.execute(_sql(conn, _SELECT_CAPTURES_SQL), (_id_list(conn, skipped),)).fetchall()
+                captures = {row["order_id"]: _row_to_payment(row) for row in rows}
             conn.commit()
+        return [record if record.id in inserted else captures[record.order_id] for record in records]
 
     def update_status(self, payment_id: str, status: str, failure_reason: str | None = None) -> PaymentRecord | None:
         now = datetime.now(timezone.utc).isoformat()
         with self._connection() as conn:
-            placeholder = _placeholder(conn)
-            conn.execute(
-                f"""
-                UPDATE payments
-                SET status = {placeholder}, failure_reason = {placeholder}, updated_at = {placeholder}
-                WHERE id = {placeholder};
-                """,
-                (status, failure_reason, now, payment_id),
-            )
+            conn.execute(_sql(conn, _UPDATE_STATUS_SQL), (status, failure_reason, now, payment_id))
             conn.commit()
         return self.get_payment(payment_id)
 
     def get_payment(self, payment_id: str) -> PaymentRecord | None:
         with self._connection() as conn:
-            placeholder = _placeholder(conn)
+            row = conn.execute(_sql(conn, _SELECT_PAYMENT_SQL), (payment_id,)).fetchone()
+        return _row_to_payment(row) if row is not None else None
+
+    def list_payments(self, order_id: str) -> list[PaymentRecord]:
+        with self._connection() as conn:
+            rows = conn.execute(_sql(conn, _SELECT_ORDER_PAYMENTS_SQL), (order_id,)).fetchall()
+        return [_row_to_payment(row) for row in rows]
+
+
+@instrument_queries
+class IdempotencyRepository:
+    """``Idempotency-Key`` claims and stored responses in ``idempotency_keys``.
+
+    Timestamps are passed in as epoch seconds so the store decides what "now" is.
+    """
+
+    def __init__(self, connection_factory=None, pool: ConnectionPool | None = None):
+        if connection_factory is None and pool is None:
+            pool = get_pool()
+        self._connection_factory = connection_factory
+        self._pool = pool
+
+    @contextmanager
+    def _connection(self):
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
+        conn = self._connection_factory()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def claim_key(self, key: str, fingerprint: str, owner: str, claim_until: float, now: float) -> bool:
+        with self._connection() as conn:
             row = conn.execute(
-                f"""
-                SELECT id, order_id, amount, status, failure_reason, created_at, updated_at
-                FROM payments
-                WHERE id = {placeholder};
-                """,
-                (payment_id,),
+                _sql(conn, _CLAIM_IDEMPOTENCY_KEY_SQL), (key, fingerprint, owner, _timestamp(claim_until), _timestamp(now))
             ).fetchone()
-            if row is None:
-                return None
-            return PaymentRecord(
-                id=row["id"],
-                order_id=row["order_id"],
-                amount=row["amount"],
-                status=row["status"],
-                failure_reason=row["failure_reason"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-
-
-def _placeholder(conn) -> str:
-    module = conn.__class__.__module__
-    return "%s" if "psycopg" in module else "?"
+            conn.commit()
+        return row is not None
+
+    def get_key(self, key: str) -> IdempotencyRecord | None:
+        with self._connection() as conn:
+            row = conn.execute(_sql(conn, _SELECT_IDEMPOTENCY_KEY_SQL), (key,)).fetchone()
+        if row is None:
+            return None
+        return IdempotencyRecord(
+            fingerprint=row["fingerprint"],
+            status_code=row["status_code"],
+            body=(row["body"] or "").encode("utf-8"),
+            headers=tuple((name, value) for name, value in json.loads(row["headers_json"] or "[]")),
+            media_type=row["media_type"],
+            expires_at=datetime.fromisoformat(row["expires_at"]).timestamp(),
+        )
+
+    def store_response(
+        self,
+        key: str,
+        owner: str,
+        status_code: int,
+        body: bytes,
+        headers: Sequence[tuple[str, str]],
+        media_type: str | None,
+        expires_at: float,
+    ) -> None:
+        # Responses are JSON, so the body is kept as text in both dialects.
+        params = (
+            status_code,
+            body.decode("utf-8"),
+            json.dumps([list(header) for header in headers]),
+            media_type,
+            _timestamp(expires_at),
+            key,
+            owner,
+        )
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _STORE_IDEMPOTENT_RESPONSE_SQL), params)
+            conn.commit()
+
+    def release_key(self, key: str, owner: str) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _RELEASE_IDEMPOTENCY_KEY_SQL), (key, owner))
+            conn.commit()
+
+    def purge_expired(self, now: float) -> None:
+        with self._connection() as conn:
+            conn.execute(_sql(conn, _PURGE_IDEMPOTENCY_KEYS_SQL), (_timestamp(now),))
+            conn.commit()
+
+
+def _row_to_payment(row) -> PaymentRecord:
+    return PaymentRecord(
+        id=row["id"],
+        order_id=row["order_id"],
+        amount=row["amount"],
+        status=row["status"],
+        failure_reason=row["failure_reason"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+@functools.lru_cache(maxsize=64)
+def _insert_payments_sql(dialect: str, count: int) -> str:
+    rows = ", ".join([_PAYMENT_ROW] * count)
+    return _INSERT_PAYMENTS_SQL.format(rows=rows).format(**_DIALECTS[dialect])
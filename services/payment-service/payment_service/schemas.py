@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -9,11 +9,28 @@ class HealthResponse(BaseModel):
     status: str = "ok"
 
 
+class ReadinessCheck(BaseModel):
+    status: str
+    detail: Optional[str] = None
+
+
+class ReadinessResponse(BaseModel):
+    status: str
+    checks: Dict[str, ReadinessCheck]
+    schema_version: Optional[int] = None
+    expected_schema_version: int
+    checked_at: str
+
+
 class PaymentRequest(BaseModel):
     order_id: str
     amount: float = Field(..., gt=0)
 
 
+class BatchPaymentRequest(BaseModel):
+    payments: List[PaymentRequest] = Field(..., min_length=1)
+
+
 class PaymentSummary(BaseModel):
     payment_id: str
     order_id: str
@@ -26,3 +43,20 @@ class PaymentSummary(BaseModel):
 
 class RefundRequest(BaseModel):
     reason: Optional[str] = None
+
+
+class PoolStats(BaseModel):
+    min_size: int
+    max_size: int
+    size: int
+    idle: int
+    in_use: int
+    waiting: int
+    utilisation: float
+    requests_total: int
+    requests_waited: int
+    wait_time_total_ms: float
+    wait_time_max_ms: float
+    timeouts: int
+    connections_created: int
+    connections_discarded: int
@@ -4,6 +4,7 @@ import os
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Sequence
 
 from .repository import PaymentRecord, PaymentRepository
 
@@ -30,32 +31,28 @@ class PaymentProcessor:
         self._failure_mode = mode
 
     def create_payment(self, order_id: str, amount: float) -> PaymentRecord:
-        payment_id = f"pay-{uuid.uuid4()}"
+        """Capture ``amount``; an order that was already captured gets its existing payment back."""
+        record = self._repo.insert_payment(self._new_record(order_id, amount))
+        if record.status == "FAILED":
+            raise PaymentDeclined("Payment declined due to configured failure mode.")
+        return record
+
+    def create_payments(self, charges: Sequence[tuple[str, float]]) -> list[PaymentRecord]:
+        """Capture several orders at once; declines are reported per record, not raised."""
+        return self._repo.insert_payments([self._new_record(order_id, amount) for order_id, amount in charges])
+
+    def _new_record(self, order_id: str, amount: float) -> PaymentRecord:
         now = datetime.now(timezone.utc).isoformat()
-        record = PaymentRecord(
-            id=payment_id,
+        declined = self._failure_mode in {"authorize", "capture"}
+        return PaymentRecord(
+            id=f"pay-{uuid.uuid4()}",
             order_id=order_id,
             amount=amount,
-            status="CAPTURED",
-            failure_reason=None,
+            status="FAILED" if declined else "CAPTURED",
+            failure_reason="Configured failure mode" if declined else None,
             created_at=now,
             updated_at=now,
         )
-        if self._failure_mode in {"authorize", "capture"}:
-            record = PaymentRecord(
-                id=payment_id,
-                order_id=order_id,
-                amount=amount,
-                status="FAILED",
-                failure_reason="Configured failure mode",
-                created_at=now,
-                updated_at=now,
-            )
-            self._repo.insert_payment(record)
-            raise PaymentDeclined("Payment declined due to configured failure mode.")
-
-        self._repo.insert_payment(record)
-        return record
 
     def refund(self, payment_id: str) -> PaymentRecord:
         record = self._repo.get_payment(payment_id)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from mifos_db.idempotency import (
+    IdempotencyKeyMismatch,
+    IdempotencySettings,
+    IdempotencyStore,
+    fingerprint,
+)
+
+from payment_service.database import apply_schema
+from payment_service.repository import IdempotencyRepository, PaymentRepository
+from payment_service.service import PaymentDeclined, PaymentProcessor
+
+
+SETTINGS = IdempotencySettings(ttl=60, lock_timeout=5, poll_interval=0.005)
+
+
+@pytest.fixture()
+def connection_factory(tmp_path):
+    db_path = tmp_path / "payment.db"
+
+    def connect():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with connect() as conn:
+        apply_schema(conn)
+
+    return connect
+
+
+@pytest.fixture()
+def repo(connection_factory):
+    return PaymentRepository(connection_factory=connection_factory)
+
+
+@pytest.fixture()
+def store(connection_factory):
+    return IdempotencyStore(IdempotencyRepository(connection_factory=connection_factory), SETTINGS)
+
+
+def capture_handler(processor, order_id, amount, calls):
+    async def handle():
+        calls.append(order_id)
+        await asyncio.sleep(0.01)
+        try:
+            record = processor.create_payment(order_id, amount)
+        except PaymentDeclined as exc:
+            raise HTTPException(status_code=402, detail=str(exc))
+        return JSONResponse(status_code=201, content={"payment_id": record.id})
+
+    return handle
+
+
+def test_concurrent_retries_capture_once(repo, store):
+    calls = []
+    handle = capture_handler(PaymentProcessor(repo), "order-1", 10.0, calls)
+    key_fingerprint = fingerprint({"order_id": "order-1", "amount": 10.0})
+
+    async def retry_storm():
+        return await asyncio.gather(*(store.run("capture-order-1", key_fingerprint, handle) for _ in range(5)))
+
+    responses = asyncio.run(retry_storm())
+
+    assert calls == ["order-1"]
+    assert len({json.loads(response.body)["payment_id"] for response in responses}) == 1
+    assert [response.headers.get("idempotent-replayed") for response in responses].count("true") == 4
+
+
+def test_declines_are_replayed_and_reused_keys_rejected(repo, store):
+    calls = []
+    handle = capture_handler(PaymentProcessor(repo, failure_mode="capture"), "order-2", 5.0, calls)
+
+    async def scenario():
+        first = await store.run("k", fingerprint("order-2"), handle)
+        second = await store.run("k", fingerprint("order-2"), handle)
+        with pytest.raises(IdempotencyKeyMismatch):
+            await store.run("k", fingerprint("order-3"), handle)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status_code == second.status_code == 402
+    assert calls == ["order-2"]
+
+
+def test_expired_keys_run_again_and_are_purged(connection_factory):
+    now = [1_000_000.0]
+    store = IdempotencyStore(IdempotencyRepository(connection_factory=connection_factory), SETTINGS, lambda: now[0])
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        return JSONResponse(content={})
+
+    async def scenario():
+        for key in ("a", "b"):
+            await store.run(key, "", handle)
+        await store.run("b", "", handle)
+        now[0] += SETTINGS.ttl + 60
+        await store.run("b", "", handle)
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+    with connection_factory() as conn:
+        assert [row[0] for row in conn.execute("SELECT idempotency_key FROM idempotency_keys;")] == ["b"]
@@ -4,7 +4,14 @@ import sqlite3
 
 import pytest
 
-from payment_service.database import apply_schema
+from payment_service.database import (
+    LATEST_SCHEMA_VERSION,
+    MIGRATIONS,
+    ConnectionPool,
+    PoolSettings,
+    apply_schema,
+    schema_version,
+)
 from payment_service.repository import PaymentRepository
 from payment_service.service import PaymentDeclined, PaymentProcessor, RefundError
 
@@ -51,3 +58,88 @@ def test_refund_failure(repo):
     record = processor.create_payment("order-4", 12.0)
     with pytest.raises(RefundError):
         processor.refund(record.id)
+
+
+def test_processor_borrows_from_pool(tmp_path):
+    db_path = tmp_path / "pooled.db"
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        opened.append(conn)
+        return conn
+
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=2))
+    processor = PaymentProcessor(PaymentRepository(pool=pool))
+
+    record = processor.create_payment("order-5", 8.0)
+    processor.refund(record.id)
+
+    assert len(opened) == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_schema_is_versioned_and_indexes_order_id(tmp_path):
+    conn = sqlite3.connect(tmp_path / "plan.db")
+    apply_schema(conn)
+    apply_schema(conn)
+
+    assert schema_version(conn) == LATEST_SCHEMA_VERSION
+    plan = " ".join(
+        str(row[-1])
+        for row in conn.execute("EXPLAIN QUERY PLAN SELECT id FROM payments WHERE order_id = ?;", ("order-1",))
+    )
+    assert "idx_payments_order_id" in plan
+
+
+def test_duplicate_captures_of_older_databases_are_marked_before_indexing(tmp_path):
+    conn = sqlite3.connect(tmp_path / "payment.db")
+    conn.executescript(MIGRATIONS[0].sql)
+    conn.executemany(
+        "INSERT INTO payments (id, order_id, amount, status, created_at, updated_at)"
+        " VALUES (?, ?, 20.0, ?, ?, ?);",
+        [
+            ("pay-b", "order-1", "CAPTURED", "2024-01-01T10:00:05", "2024-01-01T10:00:05"),
+            ("pay-a", "order-1", "CAPTURED", "2024-01-01T10:00:00", "2024-01-01T10:00:00"),
+            ("pay-c", "order-1", "CAPTURED", "2024-01-01T10:00:05", "2024-01-01T10:00:05"),
+            ("pay-d", "order-1", "REFUNDED", "2023-12-31T10:00:00", "2023-12-31T10:00:00"),
+            ("pay-e", "order-2", "CAPTURED", "2024-01-01T11:00:00", "2024-01-01T11:00:00"),
+        ],
+    )
+    conn.commit()
+
+    apply_schema(conn)
+
+    assert schema_version(conn) == LATEST_SCHEMA_VERSION
+    statuses = dict(conn.execute("SELECT id, status FROM payments;").fetchall())
+    assert statuses == {
+        "pay-a": "CAPTURED",
+        "pay-b": "DUPLICATE",
+        "pay-c": "DUPLICATE",
+        "pay-d": "REFUNDED",
+        "pay-e": "CAPTURED",
+    }
+
+
+def test_batch_capture_reports_each_payment(repo):
+    records = PaymentProcessor(repo, failure_mode="none").create_payments([("order-a", 10.0), ("order-b", 4.5)])
+    assert [record.order_id for record in records] == ["order-a", "order-b"]
+    assert all(repo.get_payment(record.id).status == "CAPTURED" for record in records)
+
+    declined = PaymentProcessor(repo, failure_mode="capture").create_payments([("order-c", 3.0)])
+    assert declined[0].status == "FAILED"
+    assert repo.get_payment(declined[0].id).failure_reason == "Configured failure mode"
+
+
+def test_an_order_is_captured_at_most_once(repo):
+    processor = PaymentProcessor(repo)
+    first = processor.create_payment("order-5", 20.0)
+    again = processor.create_payment("order-5", 20.0)
+    batch = processor.create_payments([("order-5", 20.0), ("order-6", 8.0)])
+
+    assert again.id == first.id
+    assert batch[0].id == first.id
+    assert batch[1].order_id == "order-6" and batch[1].id != first.id
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
 import os
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from mifos_observability.tracing import TRACER, TracingMiddleware
 
 from . import schemas
-from .database import init_db
+from .cache import CatalogueSync, get_catalogue_cache
+from .database import close_pool, get_pool, schema_version
+from .http_cache import conditional_json_response
+from .metrics import CONTENT_TYPE, DB_POOL_CONNECTIONS, HTTP_REQUEST_DURATION, REGISTRY, MetricsMiddleware
+from .readiness import DEGRADED, OK, UNAVAILABLE, ReadinessProbe, database_check, pool_check, readiness_response
 from .repository import (
     MenuItemValidationError,
     OrderItem,
@@ -17,16 +25,59 @@ from .repository import (
 )
 
 
+MAX_BATCH_SIZE = int(os.environ.get("RESTAURANT_ORDERS_MAX_BATCH_SIZE", "100"))
+CATALOGUE_SYNC_INTERVAL = float(os.environ.get("CATALOGUE_CACHE_SYNC_INTERVAL", "1"))
+
+
 def get_repository() -> RestaurantRepository:
-    return RestaurantRepository()
+    return RestaurantRepository(cache=get_catalogue_cache())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No connection is opened here: workers boot while the database is still
+    # unreachable and connect on first use; /readyz reports when they can serve.
+    app.state.readiness = ReadinessProbe(_check_readiness)
+    cache = get_catalogue_cache()
+    catalogue_sync = CatalogueSync(
+        cache, lambda: run_in_threadpool(get_repository().catalogue_generations), CATALOGUE_SYNC_INTERVAL
+    )
+    if cache.enabled:
+        catalogue_sync.start()
+    try:
+        yield
+    finally:
+        await catalogue_sync.stop()
+        close_pool()
+
+
+def _pool_samples():
+    stats = get_pool().stats()
+    return [((state,), stats[state]) for state in ("idle", "in_use", "waiting")]
+
+
+def _schema_version() -> int:
+    with get_pool().connection(timeout=0) as conn:
+        return schema_version(conn)
+
+
+async def _check_readiness() -> schemas.ReadinessResponse:
+    checks = {"db_pool": pool_check(get_pool().stats())}
+    version = None
+    if checks["db_pool"].status != OK:
+        # Every connection is in use; the check must not take one from a request.
+        checks["database"] = schemas.ReadinessCheck(status=DEGRADED, detail="Nicht geprüft: Pool ausgelastet")
+    else:
+        checks["database"], version = await database_check(lambda: run_in_threadpool(_schema_version))
+    return readiness_response(checks, version)
 
 
 def create_app() -> FastAPI:
-    init_db()
     app = FastAPI(
         title="Restaurant Service",
         version="0.1.0",
         description="Bestellt Menues und bestaetigt Orders innerhalb der miFOS-Architektur.",
+        lifespan=lifespan,
     )
 
     allowed_origins = [
@@ -39,20 +90,64 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(MetricsMiddleware, histogram=HTTP_REQUEST_DURATION)
+    TRACER.configure(service="restaurant-service")
+    app.add_middleware(TracingMiddleware, tracer=TRACER)
+    DB_POOL_CONNECTIONS.collect = _pool_samples
 
     @app.get("/healthz", response_model=schemas.HealthResponse, tags=["system"])
     async def health() -> schemas.HealthResponse:
         return schemas.HealthResponse(status="ok")
 
+    @app.get(
+        "/readyz",
+        response_model=schemas.ReadinessResponse,
+        responses={503: {"model": schemas.ReadinessResponse}},
+        tags=["system"],
+    )
+    async def readyz(response: Response) -> schemas.ReadinessResponse:
+        """``503`` when this instance cannot serve (DB unreachable, schema behind); a busy pool only degrades."""
+        readiness = await app.state.readiness.result()
+        if readiness.status == UNAVAILABLE:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return readiness
+
+    @app.get("/metrics", response_class=PlainTextResponse, tags=["system"])
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    @app.get("/internal/db-pool", response_model=schemas.PoolStats, tags=["system"])
+    async def db_pool_stats() -> schemas.PoolStats:
+        return schemas.PoolStats(**get_pool().stats())
+
+    @app.get("/internal/catalogue-cache", response_model=schemas.CacheStats, tags=["system"])
+    async def catalogue_cache_stats() -> schemas.CacheStats:
+        return schemas.CacheStats(**get_catalogue_cache().stats())
+
+    @app.post(
+        "/internal/catalogue-cache/invalidate",
+        status_code=status.HTTP_204_NO_CONTENT,
+        response_class=Response,
+        response_model=None,
+        tags=["system"],
+    )
+    async def invalidate_catalogue_cache(
+        restaurant_id: Optional[str] = None,
+        repo: RestaurantRepository = Depends(get_repository),
+    ) -> None:
+        await run_in_threadpool(repo.invalidate_catalogue, restaurant_id)
+
     @app.get(
         "/restaurants",
         response_model=List[schemas.Restaurant],
         tags=["restaurants"],
     )
     async def list_restaurants(
+        request: Request,
         repo: RestaurantRepository = Depends(get_repository),
-    ) -> List[schemas.Restaurant]:
-        return [schemas.Restaurant(**row) for row in repo.list_restaurants()]
+    ) -> Response:
+        restaurants = [schemas.Restaurant(**row) for row in await run_in_threadpool(repo.list_restaurants)]
+        return conditional_json_response(request, restaurants)
 
     @app.get(
         "/restaurants/{restaurant_id}/menu",
@@ -60,13 +155,15 @@ def create_app() -> FastAPI:
         tags=["restaurants"],
     )
     async def get_menu(
-        restaurant_id: str, repo: RestaurantRepository = Depends(get_repository)
-    ) -> List[schemas.MenuItem]:
+        restaurant_id: str,
+        request: Request,
+        repo: RestaurantRepository = Depends(get_repository),
+    ) -> Response:
         try:
-            rows = repo.get_menu(restaurant_id)
+            rows = await run_in_threadpool(repo.get_menu, restaurant_id)
         except RestaurantNotFoundError as exc:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
-        return [schemas.MenuItem(**row) for row in rows]
+        return conditional_json_response(request, [schemas.MenuItem(**row) for row in rows])
 
     @app.post(
         "/restaurants/{restaurant_id}/orders",
@@ -80,7 +177,8 @@ def create_app() -> FastAPI:
         repo: RestaurantRepository = Depends(get_repository),
     ) -> schemas.OrderDecision:
         try:
-            response = repo.confirm_order(
+            response = await run_in_threadpool(
+                repo.confirm_order,
                 restaurant_id,
                 payload.order_id,
                 [OrderItem(**item.model_dump()) for item in payload.items],
@@ -92,6 +190,45 @@ def create_app() -> FastAPI:
 
         return schemas.OrderDecision(**response)
 
+    @app.post(
+        "/restaurants/{restaurant_id}/orders/batch",
+        response_model=List[schemas.BatchOrderDecision],
+        tags=["orders"],
+    )
+    async def confirm_orders(
+        restaurant_id: str,
+        payload: schemas.BatchOrderRequest,
+        repo: RestaurantRepository = Depends(get_repository),
+    ) -> List[schemas.BatchOrderDecision]:
+        if len(payload.orders) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Maximal {MAX_BATCH_SIZE} Bestellungen pro Batch erlaubt.",
+            )
+        try:
+            results = await run_in_threadpool(
+                repo.confirm_orders,
+                restaurant_id,
+                [
+                    (order.order_id, [OrderItem(**item.model_dump()) for item in order.items])
+                    for order in payload.orders
+                ],
+            )
+        except RestaurantNotFoundError as exc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+        return [
+            schemas.BatchOrderDecision(
+                order_id=result["order_id"],
+                status="CONFIRMED" if result["error"] is None else "REJECTED",
+                decision=result["decision"],
+                error=result["error"],
+            )
+            for result in results
+        ]
+
     @app.post(
         "/restaurants/{restaurant_id}/orders/{order_id}/cancel",
         response_model=schemas.OrderDecision,
@@ -104,7 +241,7 @@ def create_app() -> FastAPI:
         repo: RestaurantRepository = Depends(get_repository),
     ) -> schemas.OrderDecision:
         try:
-            response = repo.cancel_order(restaurant_id, order_id, payload.reason)
+            response = await run_in_threadpool(repo.cancel_order, restaurant_id, order_id, payload.reason)
         except RestaurantNotFoundError as exc:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
         except OrderNotFoundError as exc:
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Scope recorded in ``catalogue_invalidations`` when the whole catalogue is dropped.
+ALL_RESTAURANTS = "*"
+
+
+@dataclass(frozen=True)
+class CatalogueEntry:
+    """Restaurant row plus its full menu, as loaded from the database."""
+
+    restaurant: dict
+    items: Tuple[dict, ...]
+    by_id: Dict[str, dict] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "by_id", {item["id"]: item for item in self.items})
+
+
+class CatalogueCache:
+    """Bounded, TTL-based in-process cache for restaurants and menus.
+
+    Menus are kept per restaurant in LRU order; once ``max_entries`` is
+    reached the least recently used restaurant is evicted. Entries expire
+    after ``ttl`` seconds, ``invalidate()`` drops them explicitly. The cache
+    is per process; :class:`CatalogueSync` carries invalidations to the others.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._menus: "OrderedDict[str, Tuple[float, CatalogueEntry]]" = OrderedDict()
+        self._restaurants: Optional[Tuple[float, Tuple[dict, ...]]] = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._generations: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_env(cls) -> "CatalogueCache":
+        return cls(
+            ttl=float(os.environ.get("CATALOGUE_CACHE_TTL", "60")),
+            max_entries=int(os.environ.get("CATALOGUE_CACHE_MAX_ENTRIES", "10000")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get_restaurants(self) -> Optional[List[dict]]:
+        with self._lock:
+            cached = self._restaurants
+            if cached is not None and cached[0] > self._clock():
+                self._hits += 1
+                return [dict(row) for row in cached[1]]
+            self._restaurants = None
+            self._misses += 1
+            return None
+
+    def put_restaurants(self, rows: List[dict]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._restaurants = (self._clock() + self.ttl, tuple(dict(row) for row in rows))
+
+    def get_menu(self, restaurant_id: str) -> Optional[CatalogueEntry]:
+        with self._lock:
+            cached = self._menus.get(restaurant_id)
+            if cached is not None and cached[0] > self._clock():
+                self._menus.move_to_end(restaurant_id)
+                self._hits += 1
+                return cached[1]
+            if cached is not None:
+                del self._menus[restaurant_id]
+            self._misses += 1
+            return None
+
+    def put_menu(self, restaurant_id: str, entry: CatalogueEntry) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._menus[restaurant_id] = (self._clock() + self.ttl, entry)
+            self._menus.move_to_end(restaurant_id)
+            while len(self._menus) > self.max_entries:
+                self._menus.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, restaurant_id: str | None = None) -> None:
+        """Drop one restaurant's menu, or the whole catalogue when no id is given."""
+        with self._lock:
+            self._invalidations += 1
+            self._restaurants = None
+            if restaurant_id is None:
+                self._menus.clear()
+            else:
+                self._menus.pop(restaurant_id, None)
+
+    def apply_generations(self, generations: Dict[str, int]) -> None:
+        """Invalidate every scope whose generation changed since the previous call.
+
+        The first call only records the baseline; whatever was cached before it
+        is dropped, since invalidations made in between cannot be told apart.
+        """
+        with self._lock:
+            known, self._generations = self._generations, dict(generations)
+        if known is None:
+            self.invalidate()
+            return
+        changed = [scope for scope, generation in generations.items() if known.get(scope) != generation]
+        if ALL_RESTAURANTS in changed:
+            self.invalidate()
+            return
+        for scope in changed:
+            self.invalidate(scope)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+                "entries": len(self._menus),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+_cache: CatalogueCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_catalogue_cache() -> CatalogueCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CatalogueCache.from_env()
+    return _cache
+
+
+class CatalogueSync:
+    """Applies invalidations recorded in the database to this process's cache.
+
+    ``POST /internal/catalogue-cache/invalidate`` reaches one worker of one
+    replica; it bumps the generation in ``catalogue_invalidations`` and every
+    other process drops the affected menus within ``interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        cache: CatalogueCache,
+        read_generations: Callable[[], Awaitable[Dict[str, int]]],
+        interval: float = 1.0,
+    ):
+        self._cache = cache
+        self._read_generations = read_generations
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="catalogue-cache-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sync_once(self) -> None:
+        self._cache.apply_generations(await self._read_generations())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync_once()
+            except Exception:  # pragma: no cover - the TTL still bounds staleness while the DB is away
+                logger.warning("Katalog-Invalidierungen konnten nicht gelesen werden", exc_info=True)
+            await asyncio.sleep(self.interval)
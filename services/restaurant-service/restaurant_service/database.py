@@ -2,10 +2,17 @@ from __future__ import annotations
 
 import os
 import sqlite3
+import threading
 import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Iterable
 
 import psycopg
+# The pool lives in the shared mifos_db package; re-exported for the repository and tests.
+from mifos_db import ConnectionPool, PoolSettings, PoolTimeout  # noqa: F401
+from mifos_db.sql import placeholder as _placeholder
 from psycopg.rows import dict_row
 
 SCHEMA_SQL = """
@@ -38,6 +45,53 @@ CREATE TABLE IF NOT EXISTS restaurant_orders (
 """
 
 
+@dataclass(frozen=True)
+class Migration:
+    """One schema step. Statements must be idempotent (``IF NOT EXISTS``)."""
+
+    version: int
+    description: str
+    sql: str
+
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+);
+"""
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "create catalogue and restaurant order tables", SCHEMA_SQL),
+    Migration(
+        2,
+        "index menu items and restaurant orders by restaurant",
+        """
+        CREATE INDEX IF NOT EXISTS idx_restaurants_name ON restaurants (name);
+        CREATE INDEX IF NOT EXISTS idx_menu_items_restaurant ON menu_items (restaurant_id, name);
+        CREATE INDEX IF NOT EXISTS idx_restaurant_orders_restaurant
+            ON restaurant_orders (restaurant_id, updated_at);
+        """,
+    ),
+    Migration(
+        3,
+        "create catalogue_invalidations for cross-worker cache invalidation",
+        """
+        CREATE TABLE IF NOT EXISTS catalogue_invalidations (
+            scope TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        """,
+    ),
+)
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# pg_advisory_lock key serialising migrations of concurrently starting workers
+_MIGRATION_LOCK_KEY = 0x52455354
+
+
 def _build_database_url() -> str:
     if url := os.environ.get("DATABASE_URL"):
         return url
@@ -52,6 +106,23 @@ def _build_database_url() -> str:
 DATABASE_URL = _build_database_url()
 
 
+# Seconds a single connection attempt may take; pooled connections fail fast after
+# one attempt, only get_connection() (bootstrap) keeps retrying until the database is up.
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "5"))
+
+
+def _prepare_threshold() -> int | None:
+    value = os.environ.get("DB_PREPARE_THRESHOLD", "0").strip().lower()
+    return None if value in {"", "none", "off"} else int(value)
+
+
+# psycopg prepares a statement server-side once it ran this many times on a
+# connection (0: on first use). The repositories keep their SQL text stable, so
+# pooled connections parse and plan each statement once. "none" switches it off,
+# which PgBouncer in transaction mode requires.
+DB_PREPARE_THRESHOLD = _prepare_threshold()
+
+
 def get_connection():
     """Return a connection against Postgres (default) or SQLite when configured."""
     retries = int(os.environ.get("DB_CONNECT_MAX_RETRIES", "30"))
@@ -71,33 +142,123 @@ def get_connection():
 def _connect_once():
     if DATABASE_URL.startswith("sqlite://"):
         path = DATABASE_URL.replace("sqlite:///", "")
-        conn = sqlite3.connect(path)
+        conn = sqlite3.connect(path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
         return conn
 
-    conn = psycopg.connect(DATABASE_URL, autocommit=True, row_factory=dict_row)
+    conn = psycopg.connect(
+        DATABASE_URL,
+        autocommit=True,
+        row_factory=dict_row,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        prepare_threshold=DB_PREPARE_THRESHOLD,
+    )
     return conn
 
 
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_connect_once)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def reset_pool_after_fork() -> None:
+    """Drop a pool inherited from the parent process without closing its connections.
+
+    The sockets are shared with the parent; closing them here would end the
+    parent's sessions, so the child just starts over with fresh state.
+    """
+    global _pool, _pool_lock
+    _pool_lock = threading.Lock()
+    _pool = None
+
+
 def init_db() -> None:
+    """Apply pending migrations and seed the demo catalogue; run once per deployment via the bootstrap command."""
     with get_connection() as conn:
         apply_schema(conn)
         seed_if_empty(conn)
 
 
 def apply_schema(conn) -> None:
+    """Apply all pending migrations; safe to call concurrently from several processes."""
     if hasattr(conn, "executescript"):
-        conn.executescript(SCHEMA_SQL)
-        conn.commit()
+        _migrate_sqlite(conn)
         return
+    _migrate_postgres(conn)
+
+
+def schema_version(conn) -> int:
+    """Return the highest applied migration version (``0`` for an empty database)."""
+    try:
+        row = conn.execute("SELECT MAX(version) AS version FROM schema_migrations;").fetchone()
+    except (sqlite3.Error, psycopg.Error):
+        return 0
+    return (_first_column(row) or 0) if row is not None else 0
 
-    statements = _split_statements(SCHEMA_SQL)
+
+def _migrate_sqlite(conn) -> None:
+    conn.executescript(SCHEMA_MIGRATIONS_SQL)
+    applied = {_first_column(row) for row in conn.execute("SELECT version FROM schema_migrations;")}
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            continue
+        description = migration.description.replace("'", "''")
+        now = datetime.now(timezone.utc).isoformat()
+        # executescript() cannot bind parameters; version/description are module constants.
+        conn.executescript(
+            "BEGIN IMMEDIATE;\n"
+            f"{migration.sql}\n"
+            "INSERT OR IGNORE INTO schema_migrations (version, description, applied_at)"
+            f" VALUES ({migration.version}, '{description}', '{now}');\n"
+            "COMMIT;"
+        )
+
+
+def _migrate_postgres(conn) -> None:
     with conn.cursor() as cur:
-        for statement in statements:
-            cur.execute(statement)
+        cur.execute("SELECT pg_advisory_lock(%s);", (_MIGRATION_LOCK_KEY,))
+        try:
+            cur.execute(SCHEMA_MIGRATIONS_SQL)
+            cur.execute("SELECT version FROM schema_migrations;")
+            applied = {_first_column(row) for row in cur.fetchall()}
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+                with conn.transaction():
+                    for statement in _split_statements(migration.sql):
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, description, applied_at)"
+                        " VALUES (%s, %s, %s);",
+                        (migration.version, migration.description, datetime.now(timezone.utc).isoformat()),
+                    )
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (_MIGRATION_LOCK_KEY,))
     conn.commit()
 
 
+def _first_column(row):
+    if isinstance(row, dict):
+        return next(iter(row.values()))
+    return row[0]
+
+
 def _split_statements(sql_blob: str) -> Iterable[str]:
     for statement in sql_blob.split(";"):
         stmt = statement.strip()
@@ -140,12 +301,8 @@ def seed_if_empty(conn) -> None:
         f" VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})"
     )
 
-    with conn.cursor() as cur:
+    # sqlite3 cursors are not context managers; closing() works for both drivers.
+    with closing(conn.cursor()) as cur:
         cur.executemany(insert_restaurants, restaurants)
         cur.executemany(insert_menu_items, menu_items)
     conn.commit()
-
-
-def _placeholder(conn) -> str:
-    module = conn.__class__.__module__
-    return "%s" if "psycopg" in module else "?"
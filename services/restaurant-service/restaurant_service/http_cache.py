@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def cache_control_header() -> str:
+    max_age = int(os.environ.get("CATALOGUE_HTTP_MAX_AGE", "30"))
+    stale = int(os.environ.get("CATALOGUE_HTTP_STALE_WHILE_REVALIDATE", "60"))
+    return f"public, max-age={max_age}, stale-while-revalidate={stale}"
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the serialized representation."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def conditional_json_response(request: Request, content: Any) -> Response:
+    """Serialize ``content`` and answer ``If-None-Match`` revalidations with 304."""
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control_header()}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,38 @@
+"""Prometheus metrics of the restaurant service; the metric types live in ``mifos_observability``."""
+
+from __future__ import annotations
+
+# The metric types and middleware are shared; re-exported for the app and tests.
+from mifos_observability.metrics import (  # noqa: F401
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    query_instrumentation,
+)
+from mifos_observability.tracing import TRACER
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION: Histogram = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Dauer der HTTP-Anfragen je Route",
+        ("method", "route", "status"),
+    )
+)
+DB_QUERY_DURATION: Histogram = REGISTRY.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Dauer der Repository-Aufrufe inklusive Verbindungsbezug",
+        ("repository", "method"),
+    )
+)
+DB_POOL_CONNECTIONS: Gauge = REGISTRY.register(
+    Gauge("db_pool_connections", "Verbindungen bzw. Wartende im DB-Connection-Pool", ("state",))
+)
+
+# Times every public repository method under ``db_query_duration_seconds`` and in a span.
+instrument_queries = query_instrumentation(DB_QUERY_DURATION, TRACER)
@@ -6,7 +6,12 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, Iterable, List, Sequence
 
-from .database import get_connection
+from mifos_db.sql import id_list as _id_list
+from mifos_db.sql import sql as _sql
+
+from .cache import ALL_RESTAURANTS, CatalogueCache, CatalogueEntry
+from .database import ConnectionPool, get_pool
+from .metrics import instrument_queries
 
 
 class RestaurantNotFoundError(Exception):
@@ -27,14 +32,91 @@ class OrderItem:
     quantity: int
 
 
+_UPSERT_CONFIRMED_ORDER_SQL = """
+INSERT INTO restaurant_orders (
+    order_id, restaurant_id, status, items_json, total_amount,
+    cancellation_reason, updated_at
+) VALUES ({p}, {p}, 'CONFIRMED',
+          {p}, {p}, NULL, {p})
+ON CONFLICT(order_id) DO UPDATE SET
+    restaurant_id=excluded.restaurant_id,
+    status=excluded.status,
+    items_json=excluded.items_json,
+    total_amount=excluded.total_amount,
+    cancellation_reason=excluded.cancellation_reason,
+    updated_at=excluded.updated_at;
+"""
+
+_SELECT_RESTAURANTS_SQL = "SELECT id, name, status FROM restaurants ORDER BY name ASC;"
+
+_SELECT_RESTAURANT_SQL = "SELECT id, name, status FROM restaurants WHERE id = {p};"
+
+_RESTAURANT_EXISTS_SQL = "SELECT 1 FROM restaurants WHERE id = {p};"
+
+_SELECT_MENU_SQL = """
+SELECT id, name, description, price, available
+FROM menu_items
+WHERE restaurant_id = {p}
+ORDER BY name ASC;
+"""
+
+# One statement for any number of requested items, see ``_id_list``.
+_SELECT_MENU_ITEMS_SQL = """
+SELECT id, name, price, available
+FROM menu_items
+WHERE restaurant_id = {p}
+  AND id {in_ids};
+"""
+
+_SELECT_ORDER_SQL = """
+SELECT order_id, restaurant_id, status, total_amount, items_json, updated_at
+FROM restaurant_orders
+WHERE order_id = {p} AND restaurant_id = {p};
+"""
+
+# One row per invalidated restaurant (``*`` for the whole catalogue); every
+# worker compares the generations with the ones it has applied, see CatalogueSync.
+_BUMP_CATALOGUE_GENERATION_SQL = """
+INSERT INTO catalogue_invalidations (scope, generation, updated_at)
+VALUES ({p}, 1, {p})
+ON CONFLICT(scope) DO UPDATE SET
+    generation = catalogue_invalidations.generation + 1,
+    updated_at = excluded.updated_at;
+"""
+
+_SELECT_CATALOGUE_GENERATIONS_SQL = "SELECT scope, generation FROM catalogue_invalidations;"
+
+_CANCEL_ORDER_SQL = """
+UPDATE restaurant_orders
+SET status = 'CANCELED',
+    cancellation_reason = {p},
+    updated_at = {p}
+WHERE order_id = {p};
+"""
+
+
+@instrument_queries
 class RestaurantRepository:
     """Thin data-access layer that hides direct SQL from the FastAPI handlers."""
 
-    def __init__(self, connection_factory=get_connection):
+    def __init__(
+        self,
+        connection_factory=None,
+        pool: ConnectionPool | None = None,
+        cache: CatalogueCache | None = None,
+    ):
+        if connection_factory is None and pool is None:
+            pool = get_pool()
         self._connection_factory = connection_factory
+        self._pool = pool
+        self._cache = cache if cache is not None and cache.enabled else None
 
     @contextmanager
     def _connection(self):
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
         conn = self._connection_factory()
         try:
             yield conn
@@ -42,128 +124,149 @@ class RestaurantRepository:
             conn.close()
 
     def list_restaurants(self) -> List[dict]:
+        if self._cache is not None:
+            cached = self._cache.get_restaurants()
+            if cached is not None:
+                return cached
         with self._connection() as conn:
-            rows = conn.execute(
-                "SELECT id, name, status FROM restaurants ORDER BY name ASC;"
-            ).fetchall()
-            return [dict(row) for row in rows]
+            rows = conn.execute(_sql(conn, _SELECT_RESTAURANTS_SQL)).fetchall()
+            restaurants = [dict(row) for row in rows]
+        if self._cache is not None:
+            self._cache.put_restaurants(restaurants)
+        return restaurants
 
     def get_menu(self, restaurant_id: str) -> List[dict]:
+        if self._cache is not None:
+            entry = self._cache.get_menu(restaurant_id)
+            if entry is None:
+                with self._connection() as conn:
+                    entry = self._load_catalogue_entry(conn, restaurant_id)
+            return [dict(item) for item in entry.items]
+
         with self._connection() as conn:
             self._assert_restaurant_exists(conn, restaurant_id)
-            placeholder = _placeholder(conn)
-            rows = conn.execute(
-                f"""
-                SELECT id, name, description, price, available
-                FROM menu_items
-                WHERE restaurant_id = {placeholder}
-                ORDER BY name ASC;
-                """,
-                (restaurant_id,),
-            ).fetchall()
+            rows = conn.execute(_sql(conn, _SELECT_MENU_SQL), (restaurant_id,)).fetchall()
             return [dict(row) for row in rows]
 
+    def invalidate_catalogue(self, restaurant_id: str | None = None) -> None:
+        """Drop the cached catalogue here and record the invalidation for all other workers."""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._connection() as conn:
+            conn.execute(
+                _sql(conn, _BUMP_CATALOGUE_GENERATION_SQL),
+                (restaurant_id or ALL_RESTAURANTS, now),
+            )
+            conn.commit()
+        if self._cache is not None:
+            self._cache.invalidate(restaurant_id)
+
+    def catalogue_generations(self) -> Dict[str, int]:
+        with self._connection() as conn:
+            rows = conn.execute(_SELECT_CATALOGUE_GENERATIONS_SQL).fetchall()
+        return {row["scope"]: row["generation"] for row in rows}
+
     def confirm_order(
         self, restaurant_id: str, order_id: str, items: Sequence[OrderItem]
     ) -> dict:
-        if not items:
-            raise MenuItemValidationError("Bestellung enthält keine Positionen.")
-
-        normalized: Dict[str, int] = {}
-        for item in items:
-            if item.quantity <= 0:
-                raise MenuItemValidationError("Mengen müssen größer als 0 sein.")
-            normalized[item.menu_item_id] = normalized.get(item.menu_item_id, 0) + item.quantity
+        normalized = _normalize_items(items)
 
         with self._connection() as conn:
-            self._assert_restaurant_exists(conn, restaurant_id)
-            db_items = self._fetch_menu_items(conn, restaurant_id, normalized.keys())
-
-            if len(db_items) != len(normalized):
-                missing = set(normalized.keys()) - {row["id"] for row in db_items}
-                raise MenuItemValidationError(
-                    f"Unbekannte Menüeinträge angefragt: {', '.join(sorted(missing))}"
-                )
-
-            unavailable = [row["id"] for row in db_items if row["available"] == 0]
-            if unavailable:
-                raise MenuItemValidationError(
-                    f"Nicht verfügbare Menüeinträge: {', '.join(unavailable)}"
-                )
-
-            payload = []
-            total = 0.0
-            for row in db_items:
-                quantity = normalized[row["id"]]
-                line_total = round(row["price"] * quantity, 2)
-                total += line_total
-                payload.append(
-                    {
-                        "menu_item_id": row["id"],
-                        "name": row["name"],
-                        "unit_price": row["price"],
-                        "quantity": quantity,
-                        "line_total": line_total,
-                    }
+            if self._cache is not None:
+                entry = self._cache.get_menu(restaurant_id) or self._load_catalogue_entry(
+                    conn, restaurant_id
                 )
+                db_items = [entry.by_id[item_id] for item_id in normalized if item_id in entry.by_id]
+            else:
+                self._assert_restaurant_exists(conn, restaurant_id)
+                db_items = self._fetch_menu_items(conn, restaurant_id, normalized.keys())
+            payload, total = _price_items(normalized, db_items)
 
             now = datetime.now(timezone.utc).isoformat()
-            placeholder = _placeholder(conn)
             conn.execute(
-                f"""
-                INSERT INTO restaurant_orders (
-                    order_id, restaurant_id, status, items_json, total_amount,
-                    cancellation_reason, updated_at
-                ) VALUES ({placeholder}, {placeholder}, 'CONFIRMED',
-                          {placeholder}, {placeholder}, NULL, {placeholder})
-                ON CONFLICT(order_id) DO UPDATE SET
-                    restaurant_id=excluded.restaurant_id,
-                    status=excluded.status,
-                    items_json=excluded.items_json,
-                    total_amount=excluded.total_amount,
-                    cancellation_reason=excluded.cancellation_reason,
-                    updated_at=excluded.updated_at;
-                """,
+                _sql(conn, _UPSERT_CONFIRMED_ORDER_SQL),
                 (order_id, restaurant_id, json.dumps(payload), total, now),
             )
             conn.commit()
 
-            return {
-                "order_id": order_id,
-                "restaurant_id": restaurant_id,
-                "status": "CONFIRMED",
-                "items": payload,
-                "total_amount": round(total, 2),
-                "updated_at": now,
-            }
+            return _confirmed(order_id, restaurant_id, payload, total, now)
+
+    def confirm_orders(
+        self, restaurant_id: str, orders: Sequence[tuple[str, Sequence[OrderItem]]]
+    ) -> List[dict]:
+        """Confirm several orders against one menu lookup and one ``executemany``.
+
+        Invalid orders do not fail the batch; each entry carries either a
+        ``decision`` or an ``error``.
+        """
+        order_ids = [order_id for order_id, _ in orders]
+        if len(set(order_ids)) != len(order_ids):
+            raise ValueError("Jede order_id darf im Batch nur einmal vorkommen.")
+
+        normalized: Dict[str, Dict[str, int] | MenuItemValidationError] = {}
+        for order_id, items in orders:
+            try:
+                normalized[order_id] = _normalize_items(items)
+            except MenuItemValidationError as exc:
+                normalized[order_id] = exc
+        requested = {
+            item_id
+            for order_items in normalized.values()
+            if isinstance(order_items, dict)
+            for item_id in order_items
+        }
+
+        with self._connection() as conn:
+            if self._cache is not None:
+                entry = self._cache.get_menu(restaurant_id) or self._load_catalogue_entry(
+                    conn, restaurant_id
+                )
+                menu = entry.by_id
+            else:
+                self._assert_restaurant_exists(conn, restaurant_id)
+                menu = {row["id"]: row for row in self._fetch_menu_items(conn, restaurant_id, requested)}
+
+            now = datetime.now(timezone.utc).isoformat()
+            results: List[dict] = []
+            rows: List[tuple] = []
+            for order_id, order_items in normalized.items():
+                try:
+                    if isinstance(order_items, MenuItemValidationError):
+                        raise order_items
+                    payload, total = _price_items(
+                        order_items, [menu[item_id] for item_id in order_items if item_id in menu]
+                    )
+                except MenuItemValidationError as exc:
+                    results.append({"order_id": order_id, "decision": None, "error": str(exc)})
+                    continue
+                rows.append((order_id, restaurant_id, json.dumps(payload), total, now))
+                results.append(
+                    {
+                        "order_id": order_id,
+                        "decision": _confirmed(order_id, restaurant_id, payload, total, now),
+                        "error": None,
+                    }
+                )
+
+            if rows:
+                cursor = conn.cursor()
+                try:
+                    cursor.executemany(_sql(conn, _UPSERT_CONFIRMED_ORDER_SQL), rows)
+                finally:
+                    cursor.close()
+                conn.commit()
+            return results
 
     def cancel_order(self, restaurant_id: str, order_id: str, reason: str | None) -> dict:
         with self._connection() as conn:
-            self._assert_restaurant_exists(conn, restaurant_id)
-            placeholder = _placeholder(conn)
-            row = conn.execute(
-                f"""
-                SELECT order_id, restaurant_id, status, total_amount, items_json, updated_at
-                FROM restaurant_orders
-                WHERE order_id = {placeholder} AND restaurant_id = {placeholder};
-                """,
-                (order_id, restaurant_id),
-            ).fetchone()
+            if self._cache is None or self._cache.get_menu(restaurant_id) is None:
+                self._assert_restaurant_exists(conn, restaurant_id)
+            row = conn.execute(_sql(conn, _SELECT_ORDER_SQL), (order_id, restaurant_id)).fetchone()
 
             if row is None:
                 raise OrderNotFoundError(f"Bestellung {order_id} ist unbekannt.")
 
             now = datetime.now(timezone.utc).isoformat()
-            conn.execute(
-                f"""
-                UPDATE restaurant_orders
-                SET status = 'CANCELED',
-                    cancellation_reason = {placeholder},
-                    updated_at = {placeholder}
-                WHERE order_id = {placeholder};
-                """,
-                (reason, now, order_id),
-            )
+            conn.execute(_sql(conn, _CANCEL_ORDER_SQL), (reason, now, order_id))
             conn.commit()
 
             return {
@@ -177,30 +280,79 @@ class RestaurantRepository:
             }
 
     def _assert_restaurant_exists(self, conn, restaurant_id: str) -> None:
-        placeholder = _placeholder(conn)
-        exists = conn.execute(
-            f"SELECT 1 FROM restaurants WHERE id = {placeholder};", (restaurant_id,)
-        ).fetchone()
+        exists = conn.execute(_sql(conn, _RESTAURANT_EXISTS_SQL), (restaurant_id,)).fetchone()
         if not exists:
             raise RestaurantNotFoundError(f"Restaurant {restaurant_id} ist nicht vorhanden.")
 
+    def _load_catalogue_entry(self, conn, restaurant_id: str) -> CatalogueEntry:
+        restaurant = conn.execute(_sql(conn, _SELECT_RESTAURANT_SQL), (restaurant_id,)).fetchone()
+        if restaurant is None:
+            raise RestaurantNotFoundError(f"Restaurant {restaurant_id} ist nicht vorhanden.")
+        rows = conn.execute(_sql(conn, _SELECT_MENU_SQL), (restaurant_id,)).fetchall()
+        entry = CatalogueEntry(restaurant=dict(restaurant), items=tuple(dict(row) for row in rows))
+        self._cache.put_menu(restaurant_id, entry)
+        return entry
+
     def _fetch_menu_items(
         self, conn, restaurant_id: str, menu_item_ids: Iterable[str]
     ):
         ids = list(menu_item_ids)
         if not ids:
             return []
-        placeholder = _placeholder(conn)
-        placeholders = ",".join(placeholder for _ in ids)
-        query = f"""
-            SELECT id, name, price, available
-            FROM menu_items
-            WHERE restaurant_id = {placeholder}
-              AND id IN ({placeholders});
-        """
-        return conn.execute(query, [restaurant_id, *ids]).fetchall()
-
-
-def _placeholder(conn) -> str:
-    module = conn.__class__.__module__
-    return "%s" if "psycopg" in module else "?"
+        return conn.execute(
+            _sql(conn, _SELECT_MENU_ITEMS_SQL), (restaurant_id, _id_list(conn, ids))
+        ).fetchall()
+
+
+def _normalize_items(items: Sequence[OrderItem]) -> Dict[str, int]:
+    if not items:
+        raise MenuItemValidationError("Bestellung enthält keine Positionen.")
+
+    normalized: Dict[str, int] = {}
+    for item in items:
+        if item.quantity <= 0:
+            raise MenuItemValidationError("Mengen müssen größer als 0 sein.")
+        normalized[item.menu_item_id] = normalized.get(item.menu_item_id, 0) + item.quantity
+    return normalized
+
+
+def _confirmed(order_id: str, restaurant_id: str, payload: list, total: float, now: str) -> dict:
+    return {
+        "order_id": order_id,
+        "restaurant_id": restaurant_id,
+        "status": "CONFIRMED",
+        "items": payload,
+        "total_amount": round(total, 2),
+        "updated_at": now,
+    }
+
+
+def _price_items(normalized: Dict[str, int], db_items) -> tuple[list, float]:
+    if len(db_items) != len(normalized):
+        missing = set(normalized.keys()) - {row["id"] for row in db_items}
+        raise MenuItemValidationError(
+            f"Unbekannte Menüeinträge angefragt: {', '.join(sorted(missing))}"
+        )
+
+    unavailable = [row["id"] for row in db_items if row["available"] == 0]
+    if unavailable:
+        raise MenuItemValidationError(
+            f"Nicht verfügbare Menüeinträge: {', '.join(unavailable)}"
+        )
+
+    payload = []
+    total = 0.0
+    for row in db_items:
+        quantity = normalized[row["id"]]
+        line_total = round(row["price"] * quantity, 2)
+        total += line_total
+        payload.append(
+            {
+                "menu_item_id": row["id"],
+                "name": row["name"],
+                "unit_price": row["price"],
+                "quantity": quantity,
+                "line_total": line_total,
+            }
+        )
+    return payload, total
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -9,6 +9,19 @@ class HealthResponse(BaseModel):
     status: Literal["ok"]
 
 
+class ReadinessCheck(BaseModel):
+    status: Literal["ok", "degraded", "unavailable"]
+    detail: Optional[str] = None
+
+
+class ReadinessResponse(BaseModel):
+    status: Literal["ready", "degraded", "unavailable"]
+    checks: Dict[str, ReadinessCheck]
+    schema_version: Optional[int] = None
+    expected_schema_version: int
+    checked_at: str
+
+
 class Restaurant(BaseModel):
     id: str
     name: str
@@ -51,7 +64,47 @@ class OrderDecision(BaseModel):
     cancellation_reason: Optional[str] = None
 
 
+class BatchOrderRequest(BaseModel):
+    orders: List[OrderRequest] = Field(..., min_length=1)
+
+
+class BatchOrderDecision(BaseModel):
+    order_id: str
+    status: Literal["CONFIRMED", "REJECTED"]
+    decision: Optional[OrderDecision] = None
+    error: Optional[str] = None
+
+
 class CancelRequest(BaseModel):
     reason: Optional[str] = Field(
         default=None, description="Optionaler Hinweis für die Kompensationsaktion"
     )
+
+
+class PoolStats(BaseModel):
+    min_size: int
+    max_size: int
+    size: int
+    idle: int
+    in_use: int
+    waiting: int
+    utilisation: float
+    requests_total: int
+    requests_waited: int
+    wait_time_total_ms: float
+    wait_time_max_ms: float
+    timeouts: int
+    connections_created: int
+    connections_discarded: int
+
+
+class CacheStats(BaseModel):
+    enabled: bool
+    ttl: float
+    max_entries: int
+    entries: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
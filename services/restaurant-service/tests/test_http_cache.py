@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from starlette.requests import Request
+
+from restaurant_service.http_cache import compute_etag, conditional_json_response, etag_matches
+
+
+def make_request(if_none_match: str | None = None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/restaurants", "headers": headers})
+
+
+def test_etag_is_stable_and_revalidates_with_304() -> None:
+    content = [{"id": "resto-test", "name": "Testaurant", "status": "ONLINE"}]
+
+    first = conditional_json_response(make_request(), content)
+    second = conditional_json_response(make_request(), list(content))
+    assert first.status_code == 200
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    revalidated = conditional_json_response(make_request(first.headers["etag"]), content)
+    assert revalidated.status_code == 304
+    assert revalidated.body == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+def test_etag_matching_rules() -> None:
+    etag = compute_etag(b"[]")
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
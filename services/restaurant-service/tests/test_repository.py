@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import sqlite3
 from typing import Iterator
 
 import pytest
 
-from restaurant_service.database import apply_schema
+from restaurant_service.cache import CatalogueCache, CatalogueEntry, CatalogueSync
+from restaurant_service.database import ConnectionPool, PoolSettings, apply_schema, seed_if_empty
 from restaurant_service.repository import (
+    _SELECT_MENU_ITEMS_SQL,
     MenuItemValidationError,
     OrderItem,
     OrderNotFoundError,
+    RestaurantNotFoundError,
     RestaurantRepository,
+    _sql,
 )
 
 
@@ -79,3 +84,170 @@ def test_cancel_order(repo: RestaurantRepository) -> None:
 
     with pytest.raises(OrderNotFoundError):
         repo.cancel_order("resto-test", "order-does-not-exist", None)
+
+
+def test_confirm_orders_batch_reports_each_order(repo: RestaurantRepository) -> None:
+    results = repo.confirm_orders(
+        "resto-test",
+        [
+            ("order-a", [OrderItem(menu_item_id="item-1", quantity=1)]),
+            ("order-b", [OrderItem(menu_item_id="unknown", quantity=1)]),
+            ("order-c", [OrderItem(menu_item_id="item-2", quantity=2)]),
+        ],
+    )
+
+    assert [result["order_id"] for result in results] == ["order-a", "order-b", "order-c"]
+    assert results[0]["decision"]["total_amount"] == 10.0
+    assert results[1]["decision"] is None
+    assert "unknown" in results[1]["error"]
+    assert results[2]["decision"]["total_amount"] == 24.0
+    assert repo.cancel_order("resto-test", "order-c", None)["total_amount"] == 24.0
+    with pytest.raises(OrderNotFoundError):
+        repo.cancel_order("resto-test", "order-b", None)
+
+    with pytest.raises(ValueError):
+        repo.confirm_orders("resto-test", [("order-d", []), ("order-d", [])])
+    with pytest.raises(RestaurantNotFoundError):
+        repo.confirm_orders("resto-unknown", [("order-e", [OrderItem(menu_item_id="item-1", quantity=1)])])
+
+
+def test_repository_borrows_from_pool(tmp_path) -> None:
+    db_path = tmp_path / "pooled.db"
+    opened = []
+
+    def connect() -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        opened.append(conn)
+        return conn
+
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+    pool = ConnectionPool(connect, PoolSettings(min_size=0, max_size=2))
+    repo = RestaurantRepository(pool=pool)
+
+    assert repo.list_restaurants() == []
+    assert repo.list_restaurants() == []
+    assert len(opened) == 1
+    assert pool.stats()["requests_total"] == 2
+
+
+def test_cached_catalogue_prices_orders_without_menu_queries(tmp_path) -> None:
+    db_path = tmp_path / "cached.db"
+    statements = []
+
+    def connect() -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    with sqlite3.connect(db_path) as conn:
+        apply_schema(conn)
+        conn.execute("INSERT INTO restaurants (id, name, status) VALUES ('resto-test', 'Testaurant', 'ONLINE');")
+        conn.execute(
+            "INSERT INTO menu_items (id, restaurant_id, name, price, available)"
+            " VALUES ('item-1', 'resto-test', 'Pizza', 10.0, 1);"
+        )
+    cache = CatalogueCache(ttl=60)
+    repo = RestaurantRepository(connection_factory=connect, cache=cache)
+
+    assert [item["id"] for item in repo.get_menu("resto-test")] == ["item-1"]
+    statements.clear()
+    decision = repo.confirm_order("resto-test", "order-1", [OrderItem(menu_item_id="item-1", quantity=3)])
+
+    assert decision["total_amount"] == 30.0
+    assert not any("menu_items" in sql or "FROM restaurants" in sql for sql in statements)
+    assert cache.stats()["hits"] == 1
+
+    with pytest.raises(MenuItemValidationError):
+        repo.confirm_order("resto-test", "order-2", [OrderItem(menu_item_id="unknown", quantity=1)])
+    with pytest.raises(RestaurantNotFoundError):
+        repo.get_menu("resto-unknown")
+
+
+def test_catalogue_cache_expiry_eviction_and_invalidation() -> None:
+    now = [0.0]
+    cache = CatalogueCache(ttl=10, max_entries=2, clock=lambda: now[0])
+    for restaurant_id in ("a", "b", "c"):
+        cache.put_menu(restaurant_id, CatalogueEntry(restaurant={"id": restaurant_id}, items=()))
+
+    assert cache.get_menu("a") is None
+    assert cache.get_menu("c") is not None
+    cache.invalidate("c")
+    assert cache.get_menu("c") is None
+    now[0] = 11
+    assert cache.get_menu("b") is None
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_invalidation_reaches_caches_of_other_workers(repo: RestaurantRepository) -> None:
+    worker_a = RestaurantRepository(connection_factory=repo._connection_factory, cache=CatalogueCache(ttl=60))
+    other_cache = CatalogueCache(ttl=60)
+    worker_b = RestaurantRepository(connection_factory=repo._connection_factory, cache=other_cache)
+    sync = CatalogueSync(other_cache, lambda: asyncio.to_thread(worker_b.catalogue_generations))
+
+    asyncio.run(sync.sync_once())
+    worker_b.get_menu("resto-test")
+    assert other_cache.get_menu("resto-test") is not None
+
+    asyncio.run(sync.sync_once())
+    assert other_cache.get_menu("resto-test") is not None
+
+    worker_a.invalidate_catalogue("resto-test")
+    asyncio.run(sync.sync_once())
+    assert other_cache.get_menu("resto-test") is None
+
+    worker_b.get_menu("resto-test")
+    worker_a.invalidate_catalogue()
+    asyncio.run(sync.sync_once())
+    assert other_cache.get_menu("resto-test") is None
+
+
+def test_menu_lookup_uses_restaurant_index(tmp_path) -> None:
+    conn = sqlite3.connect(tmp_path / "plan.db")
+    apply_schema(conn)
+
+    plan = " ".join(
+        str(row[-1])
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM menu_items WHERE restaurant_id = ? ORDER BY name;",
+            ("resto-test",),
+        )
+    )
+    assert "idx_menu_items_restaurant" in plan
+
+
+def test_seed_if_empty_runs_on_sqlite_and_only_once(tmp_path):
+    conn = sqlite3.connect(tmp_path / "restaurant.db")
+    apply_schema(conn)
+
+    seed_if_empty(conn)
+    seed_if_empty(conn)
+
+    assert conn.execute("SELECT COUNT(1) FROM restaurants;").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(1) FROM menu_items;").fetchone()[0] == 6
+
+
+def test_menu_item_lookup_has_one_statement_for_any_item_count(repo: RestaurantRepository) -> None:
+    class Connection:
+        __module__ = "psycopg"
+
+    with repo._connection() as conn:
+        one = repo._fetch_menu_items(conn, "resto-test", ["item-1"])
+        both = repo._fetch_menu_items(conn, "resto-test", ["item-1", "item-2", "unknown"])
+        plan = " ".join(
+            str(row[-1])
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN " + _sql(conn, _SELECT_MENU_ITEMS_SQL), ("resto-test", '["item-1"]')
+            )
+        )
+
+    assert [row["id"] for row in one] == ["item-1"]
+    assert sorted(row["id"] for row in both) == ["item-1", "item-2"]
+    assert "idx_menu_items_restaurant" in plan
+    assert "id = ANY(%s)" in _sql(Connection(), _SELECT_MENU_ITEMS_SQL)